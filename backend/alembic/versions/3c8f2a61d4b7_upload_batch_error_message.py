@@ -0,0 +1,25 @@
+"""Add error_message to upload_batches
+
+Revision ID: 3c8f2a61d4b7
+Revises: 211a133cae1d
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8f2a61d4b7'
+down_revision: Union[str, None] = '211a133cae1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_batches', sa.Column('error_message', sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_batches', 'error_message')
@@ -0,0 +1,45 @@
+"""Add upload_sessions for resumable chunked uploads
+
+Revision ID: 7d1e4b9a2c56
+Revises: 3c8f2a61d4b7
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+# revision identifiers, used by Alembic.
+revision: str = '7d1e4b9a2c56'
+down_revision: Union[str, None] = '3c8f2a61d4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', UUID(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('file_name', sa.String(length=500), nullable=False),
+        sa.Column('total_size', sa.Integer(), nullable=False),
+        sa.Column('received_bytes', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('status', sa.String(length=20), server_default='open', nullable=False),
+        sa.Column('uploader_id', UUID(), nullable=False),
+        sa.Column('batch_id', UUID(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.CheckConstraint("entity_type IN ('company', 'contact')"),
+        sa.CheckConstraint("status IN ('open', 'finalized')"),
+        sa.ForeignKeyConstraint(['batch_id'], ['upload_batches.id'], ),
+        sa.ForeignKeyConstraint(['uploader_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_upload_sessions_uploader', 'upload_sessions', ['uploader_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_upload_sessions_uploader', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
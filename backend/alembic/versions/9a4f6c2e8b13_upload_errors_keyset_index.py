@@ -0,0 +1,29 @@
+"""Index upload_errors for keyset pagination by row number
+
+Revision ID: 9a4f6c2e8b13
+Revises: 7d1e4b9a2c56
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f6c2e8b13'
+down_revision: Union[str, None] = '7d1e4b9a2c56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite index also serves plain batch_id lookups
+    op.create_index('idx_upload_errors_batch_row', 'upload_errors', ['batch_id', 'row_number', 'id'])
+    op.drop_index('idx_upload_errors_batch', table_name='upload_errors')
+
+
+def downgrade() -> None:
+    op.create_index('idx_upload_errors_batch', 'upload_errors', ['batch_id'])
+    op.drop_index('idx_upload_errors_batch_row', table_name='upload_errors')
@@ -0,0 +1,28 @@
+"""Add (updated_at, id) indexes for delta exports
+
+Revision ID: a7e4c2b9d635
+Revises: f2c7d5a9b481
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e4c2b9d635'
+down_revision: Union[str, None] = 'f2c7d5a9b481'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_companies_updated', 'companies', ['updated_at', 'id'])
+    op.create_index('idx_contacts_updated', 'contacts', ['updated_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_contacts_updated', table_name='contacts')
+    op.drop_index('idx_companies_updated', table_name='companies')
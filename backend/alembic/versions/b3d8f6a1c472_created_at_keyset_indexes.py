@@ -0,0 +1,28 @@
+"""Add (created_at, id) indexes for keyset pagination of the list endpoints
+
+Revision ID: b3d8f6a1c472
+Revises: a7e4c2b9d635
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8f6a1c472'
+down_revision: Union[str, None] = 'a7e4c2b9d635'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_companies_created', 'companies', ['created_at', 'id'])
+    op.create_index('idx_contacts_created', 'contacts', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_contacts_created', table_name='contacts')
+    op.drop_index('idx_companies_created', table_name='companies')
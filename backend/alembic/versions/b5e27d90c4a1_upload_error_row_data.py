@@ -0,0 +1,26 @@
+"""Keep the raw row with upload_errors so rows can be corrected
+
+Revision ID: b5e27d90c4a1
+Revises: 9a4f6c2e8b13
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e27d90c4a1'
+down_revision: Union[str, None] = '9a4f6c2e8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_errors', sa.Column('row_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_errors', 'row_data')
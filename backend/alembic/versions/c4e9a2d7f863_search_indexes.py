@@ -0,0 +1,40 @@
+"""Add full-text search vectors on companies and contacts
+
+Revision ID: c4e9a2d7f863
+Revises: b3d8f6a1c472
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2d7f863'
+down_revision: Union[str, None] = 'b3d8f6a1c472'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.utils.search.search_vector over the models' *_SEARCH_COLUMNS
+COMPANY_SEARCH_VECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(industry, ''))"
+CONTACT_SEARCH_VECTOR = (
+    "to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' "
+    "|| coalesce(replace(replace(email, '@', ' '), '.', ' '), ''))"
+)
+
+
+def upgrade() -> None:
+    # Adding a stored generated column rewrites the table
+    op.execute(f"ALTER TABLE companies ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({COMPANY_SEARCH_VECTOR}) STORED")
+    op.execute(f"ALTER TABLE contacts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({CONTACT_SEARCH_VECTOR}) STORED")
+    op.create_index('idx_companies_search', 'companies', ['search_vector'], postgresql_using='gin')
+    op.create_index('idx_contacts_search', 'contacts', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_contacts_search', table_name='contacts')
+    op.drop_index('idx_companies_search', table_name='companies')
+    op.drop_column('contacts', 'search_vector')
+    op.drop_column('companies', 'search_vector')
@@ -0,0 +1,32 @@
+"""Add content_hash and idempotency_key to upload_batches
+
+Revision ID: c81f3a5d92e7
+Revises: b5e27d90c4a1
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f3a5d92e7'
+down_revision: Union[str, None] = 'b5e27d90c4a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_batches', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('upload_batches', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.create_index('idx_upload_batches_content', 'upload_batches', ['uploader_id', 'entity_type', 'content_hash'])
+    op.create_index('uq_upload_batches_idempotency', 'upload_batches', ['uploader_id', 'idempotency_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_upload_batches_idempotency', table_name='upload_batches')
+    op.drop_index('idx_upload_batches_content', table_name='upload_batches')
+    op.drop_column('upload_batches', 'idempotency_key')
+    op.drop_column('upload_batches', 'content_hash')
@@ -0,0 +1,47 @@
+"""Add dedup_key to companies and contacts and duplicate_rows to upload_batches
+
+Revision ID: d4a9e1c7f350
+Revises: c81f3a5d92e7
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9e1c7f350'
+down_revision: Union[str, None] = 'c81f3a5d92e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('companies', sa.Column('dedup_key', sa.String(length=32), nullable=True))
+    op.add_column('contacts', sa.Column('dedup_key', sa.String(length=32), nullable=True))
+    op.add_column('upload_batches', sa.Column('duplicate_rows', sa.Integer(), server_default='0', nullable=True))
+
+    # Same keys as app.utils.dedup.dedup_key
+    op.execute("""
+        UPDATE companies SET dedup_key = md5(concat_ws('|',
+            coalesce(lower(trim(name)), ''), coalesce(lower(trim(website)), ''), coalesce(lower(trim(CAST(segment_id AS text))), '')
+        ))
+    """)
+    op.execute("""
+        UPDATE contacts SET dedup_key = md5(concat_ws('|',
+            coalesce(lower(trim(email)), ''), coalesce(lower(trim(CAST(company_id AS text))), '')
+        ))
+    """)
+
+    op.create_index('idx_companies_dedup_key', 'companies', ['dedup_key'])
+    op.create_index('idx_contacts_dedup_key', 'contacts', ['dedup_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_contacts_dedup_key', table_name='contacts')
+    op.drop_index('idx_companies_dedup_key', table_name='companies')
+    op.drop_column('upload_batches', 'duplicate_rows')
+    op.drop_column('contacts', 'dedup_key')
+    op.drop_column('companies', 'dedup_key')
@@ -0,0 +1,42 @@
+"""Add upload_groups for multi-file uploads
+
+Revision ID: e6b3f8a2d914
+Revises: d4a9e1c7f350
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3f8a2d914'
+down_revision: Union[str, None] = 'd4a9e1c7f350'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_groups',
+        sa.Column('id', UUID(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('file_count', sa.Integer(), nullable=False),
+        sa.Column('uploader_id', UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.CheckConstraint("entity_type IN ('company', 'contact')"),
+        sa.ForeignKeyConstraint(['uploader_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('upload_batches', sa.Column('group_id', UUID(), nullable=True))
+    op.create_foreign_key('upload_batches_group_id_fkey', 'upload_batches', 'upload_groups', ['group_id'], ['id'])
+    op.create_index('idx_upload_batches_group', 'upload_batches', ['group_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_upload_batches_group', table_name='upload_batches')
+    op.drop_constraint('upload_batches_group_id_fkey', 'upload_batches', type_='foreignkey')
+    op.drop_column('upload_batches', 'group_id')
+    op.drop_table('upload_groups')
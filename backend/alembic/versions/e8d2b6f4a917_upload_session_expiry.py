@@ -0,0 +1,38 @@
+"""Add expires_at and the expired status to upload_sessions
+
+Revision ID: e8d2b6f4a917
+Revises: c4e9a2d7f863
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8d2b6f4a917'
+down_revision: Union[str, None] = 'c4e9a2d7f863'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_sessions', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing sessions get the default UPLOAD_SESSION_EXPIRY_HOURS from their last chunk
+    op.execute("UPDATE upload_sessions SET expires_at = updated_at + interval '24 hours'")
+    op.alter_column('upload_sessions', 'expires_at', nullable=False)
+    op.create_index('idx_upload_sessions_expiry', 'upload_sessions', ['status', 'expires_at'])
+    op.drop_constraint('upload_sessions_status_check', 'upload_sessions', type_='check')
+    op.create_check_constraint(
+        'upload_sessions_status_check', 'upload_sessions', "status IN ('open', 'finalized', 'expired')"
+    )
+
+
+def downgrade() -> None:
+    # Expired sessions have no spool file left to resume from
+    op.execute("DELETE FROM upload_sessions WHERE status = 'expired'")
+    op.drop_constraint('upload_sessions_status_check', 'upload_sessions', type_='check')
+    op.create_check_constraint('upload_sessions_status_check', 'upload_sessions', "status IN ('open', 'finalized')")
+    op.drop_index('idx_upload_sessions_expiry', table_name='upload_sessions')
+    op.drop_column('upload_sessions', 'expires_at')
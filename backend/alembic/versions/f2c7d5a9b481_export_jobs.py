@@ -0,0 +1,47 @@
+"""Add export_jobs for background exports
+
+Revision ID: f2c7d5a9b481
+Revises: e6b3f8a2d914
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7d5a9b481'
+down_revision: Union[str, None] = 'e6b3f8a2d914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', UUID(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('watermark', sa.String(length=100), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+        sa.Column('file_name', sa.String(length=500), nullable=True),
+        sa.Column('file_size_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('row_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('error_message', sa.String(length=500), nullable=True),
+        sa.Column('requested_by', UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint("entity_type IN ('company', 'contact')"),
+        sa.CheckConstraint("status IN ('pending', 'running', 'completed', 'failed', 'expired')"),
+        sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_export_jobs_cache_key', 'export_jobs', ['cache_key'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_export_jobs_cache_key', table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -8,6 +8,31 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     CORS_ORIGINS: str = "http://localhost:3000"
     MAX_UPLOAD_SIZE_MB: int = 10
+    MAX_DECOMPRESSED_SIZE_MB: int = 200
+    MAX_COMPRESSION_RATIO: int = 100
+    UPLOAD_TEMP_DIR: str = "/tmp/uploads"
+    UPLOAD_CHUNK_MAX_MB: int = 16
+    # Chunked upload sessions with no new chunk in this window are removed
+    UPLOAD_SESSION_EXPIRY_HOURS: int = 24
+    UPLOAD_DEDUP_WINDOW_MINUTES: int = 60
+    UPLOAD_GROUP_MAX_FILES: int = 50
+    UPLOAD_GROUP_CONCURRENCY: int = 4
+    IMPORT_WORKERS: int = 2
+    IMPORT_PROCESS_WORKERS: int = 0
+    IMPORT_ABORT_ERROR_RATE: float = 0.9
+    IMPORT_ABORT_MIN_ROWS: int = 1000
+    EXPORT_DIR: str = "/tmp/exports"
+    EXPORT_WORKERS: int = 1
+    EXPORT_RETENTION_HOURS: int = 24
+    # Delta exports leave out rows changed in this window; keep it above the longest write transaction
+    EXPORT_SYNC_LAG_SECONDS: int = 300
+    # Internal nginx location serving EXPORT_DIR; empty to send files from the API
+    EXPORT_ACCEL_REDIRECT_PREFIX: str = ""
+    # List totals: filters expected to match more rows than this get the planner's estimate
+    COUNT_EXACT_MAX_ROWS: int = 10000
+    COUNT_CACHE_TTL_SECONDS: int = 60
+    # Searches matching more rows than this are listed newest first instead of by relevance
+    SEARCH_RANK_MAX_ROWS: int = 10000
 
     @property
     def cors_origins_list(self) -> List[str]:
@@ -0,0 +1,84 @@
+import os
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import select
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.export import ExportJob
+from ..services.export_service import EXPORT_FORMATS, ExportService, artifact_path, load_filters
+
+async def run_export_job(job_id: UUID, session_factory=AsyncSessionLocal):
+    """Writes the artifact of a pending export job to EXPORT_DIR, named after
+    its cache key so identical requests share it."""
+    async with session_factory() as db:
+        job = await db.get(ExportJob, job_id)
+        job.status = "running"
+        await db.commit()
+
+        fmt = job.params.get("format", "csv.gz")
+        file_name = f"{job.cache_key}.{EXPORT_FORMATS[fmt][1]}"
+        try:
+            columns = ",".join(job.params["columns"])
+            stmt, names = ExportService.query(job.entity_type, columns, load_filters(job.params["filters"]))
+            job.row_count = await ExportService.write_artifact(db, stmt, names, artifact_path(file_name), fmt)
+        except Exception:
+            await db.rollback()
+            job = await db.get(ExportJob, job_id)
+            job.status = "failed"
+            job.error_message = "Export failed"
+            await db.commit()
+            raise
+
+        job.file_name = file_name
+        job.file_size_bytes = os.path.getsize(artifact_path(file_name))
+        job.status = "completed"
+        job.completed_at = datetime.now(timezone.utc)
+        await db.commit()
+
+async def run_export_cleanup(session_factory=AsyncSessionLocal):
+    """Removes artifacts of jobs completed more than EXPORT_RETENTION_HOURS ago,
+    unless a job completed since then wrote the same file."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    async with session_factory() as db:
+        stmt = select(ExportJob).where(ExportJob.status == "completed", ExportJob.completed_at < cutoff)
+        jobs = (await db.execute(stmt)).scalars().all()
+        # Artifacts are named after the cache key, so a job re-queued after its
+        # file was removed writes the same name as the job it replaced
+        stmt = select(ExportJob.file_name).where(ExportJob.status == "completed", ExportJob.completed_at >= cutoff)
+        retained = set((await db.execute(stmt)).scalars().all())
+        removed = 0
+        for job in jobs:
+            job.status = "expired"
+            if job.file_name in retained:
+                continue
+            # Identical jobs share one artifact, so it may already be gone
+            try:
+                os.remove(artifact_path(job.file_name))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        await db.commit()
+        print(f"Export cleanup expired {len(jobs)} jobs and removed {removed} artifacts")
+
+async def recover_exports(session_factory=AsyncSessionLocal):
+    """Fails the export jobs a previous run of the server left pending or
+    running, so identical requests queue a new job instead of reusing one that
+    will never finish, and removes their partial artifacts."""
+    async with session_factory() as db:
+        stmt = select(ExportJob).where(ExportJob.status.in_(["pending", "running"]))
+        jobs = (await db.execute(stmt)).scalars().all()
+        for job in jobs:
+            job.status = "failed"
+            job.error_message = "Export was interrupted by a server restart"
+        await db.commit()
+
+    removed = 0
+    if os.path.isdir(settings.EXPORT_DIR):
+        for name in os.listdir(settings.EXPORT_DIR):
+            if name.endswith(".part"):
+                os.remove(os.path.join(settings.EXPORT_DIR, name))
+                removed += 1
+    if jobs or removed:
+        print(f"Export recovery failed {len(jobs)} interrupted jobs and removed {removed} partial artifacts")
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.upload import UploadBatch, UploadSession
+from ..services.csv_service import CSVService
+from ..services.sql_import_service import SQLImportService
+
+class ImportProgress:
+    """Live counters of an import running in this process."""
+    def __init__(self, bytes_total: int):
+        self.started_at = time.monotonic()
+        self.bytes_total = bytes_total
+        self.bytes_read = 0
+        self.total_rows = 0
+        self.valid_rows = 0
+        self.invalid_rows = 0
+
+    def update(self, batch: UploadBatch, bytes_read: int):
+        self.bytes_read = bytes_read
+        self.total_rows = batch.total_rows
+        self.valid_rows = batch.valid_rows
+        self.invalid_rows = batch.invalid_rows
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        byte_rate = self.bytes_read / elapsed
+        eta = (self.bytes_total - self.bytes_read) / byte_rate if byte_rate else None
+        return {
+            "total_rows": self.total_rows,
+            "valid_rows": self.valid_rows,
+            "invalid_rows": self.invalid_rows,
+            "bytes_processed": self.bytes_read,
+            "bytes_total": self.bytes_total,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(self.total_rows / elapsed, 1),
+            "eta_seconds": round(max(eta, 0), 1) if eta is not None else None,
+        }
+
+active_imports: Dict[UUID, ImportProgress] = {}
+
+def get_progress(batch_id: UUID) -> Optional[ImportProgress]:
+    return active_imports.get(batch_id)
+
+async def run_import_job(batch_id: UUID, path: str, engine: str = "python", session_factory=AsyncSessionLocal):
+    progress = ImportProgress(os.path.getsize(path))
+    active_imports[batch_id] = progress
+    try:
+        async with session_factory() as db:
+            batch = await db.get(UploadBatch, batch_id)
+            try:
+                with open(path, "rb") as fh:
+                    upload = UploadFile(fh, filename=batch.file_name)
+                    process_batch = SQLImportService.process_batch if engine == "sql" else CSVService.process_batch
+                    await process_batch(db, batch, upload, progress)
+            except Exception as e:
+                await db.rollback()
+                batch = await db.get(UploadBatch, batch_id)
+                batch.status = "failed"
+                batch.error_message = (e.detail if isinstance(e, HTTPException) else "Import failed")[:500]
+                await db.commit()
+                if not isinstance(e, HTTPException):
+                    raise
+    finally:
+        active_imports.pop(batch_id, None)
+        os.remove(path)
+
+async def run_import_group(jobs: List[Tuple[UUID, str]], engine: str = "python", session_factory=AsyncSessionLocal):
+    """Imports the (batch id, spooled path) pairs of an upload group, at most
+    UPLOAD_GROUP_CONCURRENCY at a time. Each file has its own session, so one
+    failing import does not affect the others."""
+    limit = asyncio.Semaphore(max(settings.UPLOAD_GROUP_CONCURRENCY, 1))
+
+    async def run(batch_id: UUID, path: str):
+        async with limit:
+            await run_import_job(batch_id, path, engine, session_factory)
+
+    results = await asyncio.gather(*(run(batch_id, path) for batch_id, path in jobs), return_exceptions=True)
+    for (batch_id, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"Import of batch {batch_id} failed: {result!r}")
+
+async def recover_imports(session_factory=AsyncSessionLocal):
+    """Fails the batches a previous run of the server left "processing" and
+    removes their spool files. The import queue only lives in process memory,
+    so at startup none of them is still running. Open upload sessions keep
+    their .part files."""
+    async with session_factory() as db:
+        stmt = select(UploadBatch).where(UploadBatch.status == "processing")
+        batches = (await db.execute(stmt)).scalars().all()
+        for batch in batches:
+            batch.status = "failed"
+            batch.error_message = "Import was interrupted by a server restart"
+        await db.commit()
+
+    removed = 0
+    if os.path.isdir(settings.UPLOAD_TEMP_DIR):
+        # {batch}.upload, {group}.{n}.upload and the entries unpacked next to them
+        for name in os.listdir(settings.UPLOAD_TEMP_DIR):
+            if ".upload" in name:
+                os.remove(os.path.join(settings.UPLOAD_TEMP_DIR, name))
+                removed += 1
+    if batches or removed:
+        print(f"Import recovery failed {len(batches)} interrupted batches and removed {removed} spool files")
+
+async def run_upload_session_cleanup(session_factory=AsyncSessionLocal):
+    """Expires open upload sessions that received no chunk for
+    UPLOAD_SESSION_EXPIRY_HOURS and removes their partial files."""
+    async with session_factory() as db:
+        stmt = select(UploadSession).where(
+            UploadSession.status == "open",
+            UploadSession.expires_at <= datetime.now(timezone.utc)
+        )
+        sessions = (await db.execute(stmt)).scalars().all()
+        for session in sessions:
+            try:
+                os.remove(os.path.join(settings.UPLOAD_TEMP_DIR, f"{session.id}.part"))
+            except FileNotFoundError:
+                pass
+            session.status = "expired"
+        await db.commit()
+        print(f"Upload session cleanup expired {len(sessions)} sessions")
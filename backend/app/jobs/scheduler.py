@@ -1,6 +1,8 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from .dedup_job import run_dedup_job
+from .export_job import run_export_cleanup
+from .import_job import run_upload_session_cleanup
 
 scheduler = AsyncIOScheduler()
 
@@ -12,4 +14,18 @@ def setup_scheduler():
         id="dedup_job",
         replace_existing=True
     )
+    # Expired export artifacts, every hour
+    scheduler.add_job(
+        run_export_cleanup,
+        CronTrigger(minute=30),
+        id="export_cleanup",
+        replace_existing=True
+    )
+    # Abandoned chunked upload sessions, every hour
+    scheduler.add_job(
+        run_upload_session_cleanup,
+        CronTrigger(minute=45),
+        id="upload_session_cleanup",
+        replace_existing=True
+    )
     scheduler.start()
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Awaitable, Callable, List
+
+class WorkerPool:
+    """Small in-process pool of asyncio workers draining a shared job queue."""
+    def __init__(self, name: str):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+
+    def start(self, size: int):
+        for i in range(max(size, 1)):
+            self.workers.append(asyncio.create_task(self._worker(), name=f"{self.name}-{i}"))
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, job: Callable[..., Awaitable], *args):
+        self.queue.put_nowait((job, args))
+
+    async def _worker(self):
+        while True:
+            job, args = await self.queue.get()
+            try:
+                await job(*args)
+            except Exception as e:
+                print(f"{self.name} job {job.__name__} failed: {e!r}")
+            finally:
+                self.queue.task_done()
+
+import_pool = WorkerPool("import")
+export_pool = WorkerPool("export")
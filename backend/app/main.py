@@ -3,14 +3,25 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from .config import settings
 from .routers import health, auth, segments, assignments, companies, approval_queue, contacts, uploads, users, collaterals, workbench, exports, audit_logs
+from .jobs.export_job import recover_exports
+from .jobs.import_job import recover_imports
 from .jobs.scheduler import setup_scheduler
+from .jobs.worker_pool import export_pool, import_pool
+from .utils.process_pool import shutdown_process_pool
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     setup_scheduler()
+    await recover_imports()
+    await recover_exports()
+    import_pool.start(settings.IMPORT_WORKERS)
+    export_pool.start(settings.EXPORT_WORKERS)
     yield
     # Shutdown
+    await import_pool.stop()
+    await export_pool.stop()
+    shutdown_process_pool()
 
 app = FastAPI(title="Spanner API", lifespan=lifespan)
 
@@ -20,6 +31,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the frontend to name downloaded export files
+    expose_headers=["Content-Disposition"],
 )
 
 app.include_router(health.router, prefix="/api", tags=["health"])
@@ -5,29 +5,33 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..database import get_db
 
-def require_permission(module: str, action: str = None):
+async def check_permission(db: AsyncSession, user: User, module: str, action: str = None):
+    """Raises 403 unless one of the user's roles grants `module:action`."""
     if action is None and ":" in module:
         module, action = module.split(":", 1)
 
-    async def permission_checker(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-        # Join User -> user_roles -> Role -> role_permissions -> Permission
-        query = (
-            select(Permission)
-            .join(role_permissions, Permission.id == role_permissions.c.permission_id)
-            .join(Role, Role.id == role_permissions.c.role_id)
-            .join(user_roles, Role.id == user_roles.c.role_id)
-            .where(user_roles.c.user_id == user.id)
-            .where(Permission.module == module)
-            .where(Permission.action == action)
-        )
+    # Join User -> user_roles -> Role -> role_permissions -> Permission
+    query = (
+        select(Permission)
+        .join(role_permissions, Permission.id == role_permissions.c.permission_id)
+        .join(Role, Role.id == role_permissions.c.role_id)
+        .join(user_roles, Role.id == user_roles.c.role_id)
+        .where(user_roles.c.user_id == user.id)
+        .where(Permission.module == module)
+        .where(Permission.action == action)
+    )
 
-        result = await db.execute(query)
-        permission = result.scalar_one_or_none()
+    result = await db.execute(query)
+    permission = result.scalar_one_or_none()
 
-        if not permission:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Operation not permitted"
-            )
+    if not permission:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operation not permitted"
+        )
+
+def require_permission(module: str, action: str = None):
+    async def permission_checker(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+        await check_permission(db, user, module, action)
         return True
     return permission_checker
@@ -3,6 +3,7 @@ from .segment import Segment, Offering, segment_offerings
 from .company import Company
 from .contact import Contact
 from .assignment import Assignment
-from .upload import UploadBatch, UploadError
+from .upload import UploadBatch, UploadError, UploadGroup, UploadSession
 from .audit import AuditLog
 from .collateral import MarketingCollateral
+from .export import ExportJob
@@ -1,8 +1,9 @@
-from sqlalchemy import String, Boolean, DateTime, func, Integer, ForeignKey, Text
+from sqlalchemy import Index, String, Boolean, DateTime, func, Integer, ForeignKey, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 import uuid
 from ..database import Base
+from ..utils.search import add_search_vector
 from ..utils.types import GUID
 
 class Company(Base):
@@ -28,6 +29,7 @@ class Company(Base):
     status: Mapped[str] = mapped_column(String(20), default="pending") # pending/approved/rejected
     rejection_reason: Mapped[str] = mapped_column(Text, nullable=True)
     is_duplicate: Mapped[bool] = mapped_column(Boolean, default=False)
+    dedup_key: Mapped[str] = mapped_column(String(32), nullable=True) # see utils.dedup.dedup_key
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     batch_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("upload_batches.id"), nullable=True)
     created_by: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=False)
@@ -36,3 +38,14 @@ class Company(Base):
 
     segment = relationship("Segment")
     uploader = relationship("User")
+
+    __table_args__ = (
+        Index("idx_companies_dedup_key", "dedup_key"),
+        Index("idx_companies_created", "created_at", "id"),
+        Index("idx_companies_updated", "updated_at", "id"),
+    )
+
+# Columns the list search matches words of
+COMPANY_SEARCH_COLUMNS = (Company.name, Company.industry)
+
+add_search_vector(Company.__table__, COMPANY_SEARCH_COLUMNS, "idx_companies_search")
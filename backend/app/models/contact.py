@@ -1,8 +1,9 @@
-from sqlalchemy import String, Boolean, DateTime, func, ForeignKey, Text
+from sqlalchemy import Index, String, Boolean, DateTime, func, ForeignKey, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 import uuid
 from ..database import Base
+from ..utils.search import add_search_vector, email_words
 from ..utils.types import GUID
 
 class Contact(Base):
@@ -33,6 +34,7 @@ class Contact(Base):
     status: Mapped[str] = mapped_column(String(30), default="uploaded") # uploaded/approved/assigned_to_sdr/meeting_scheduled
     assigned_sdr_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=True)
     is_duplicate: Mapped[bool] = mapped_column(Boolean, default=False)
+    dedup_key: Mapped[str] = mapped_column(String(32), nullable=True) # see utils.dedup.dedup_key
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     batch_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("upload_batches.id"), nullable=True)
     created_by: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=False)
@@ -41,5 +43,16 @@ class Contact(Base):
 
     company = relationship("Company")
     segment = relationship("Segment")
-    sdr = relationship("User", foreign_keys=[assigned_sdr_id])
+    assigned_sdr = relationship("User", foreign_keys=[assigned_sdr_id])
     creator = relationship("User", foreign_keys=[created_by])
+
+    __table_args__ = (
+        Index("idx_contacts_dedup_key", "dedup_key"),
+        Index("idx_contacts_created", "created_at", "id"),
+        Index("idx_contacts_updated", "updated_at", "id"),
+    )
+
+# Columns the list search matches words of
+CONTACT_SEARCH_COLUMNS = (Contact.first_name, Contact.last_name, email_words(Contact.email))
+
+add_search_vector(Contact.__table__, CONTACT_SEARCH_COLUMNS, "idx_contacts_search")
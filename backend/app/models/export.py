@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, String, DateTime, func, Integer, ForeignKey, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+import uuid
+from ..database import Base
+from ..utils.types import GUID
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(GUID, primary_key=True, default=uuid.uuid4)
+    entity_type: Mapped[str] = mapped_column(String(20), nullable=False) # company/contact
+    params: Mapped[dict] = mapped_column(JSON, nullable=False) # {"columns": [...], "filters": {...}}
+    watermark: Mapped[str] = mapped_column(String(100), nullable=False) # see ExportService.watermark
+    cache_key: Mapped[str] = mapped_column(String(64), nullable=False) # sha256 of entity, params and watermark
+    status: Mapped[str] = mapped_column(String(20), default="pending") # pending/running/completed/failed/expired
+    file_name: Mapped[str] = mapped_column(String(500), nullable=True) # artifact in EXPORT_DIR
+    file_size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    row_count: Mapped[int] = mapped_column(Integer, default=0)
+    error_message: Mapped[str] = mapped_column(String(500), nullable=True)
+    requested_by: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    completed_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    requester = relationship("User")
+
+    __table_args__ = (
+        Index("idx_export_jobs_cache_key", "cache_key"),
+    )
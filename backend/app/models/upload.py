@@ -1,10 +1,22 @@
-from sqlalchemy import String, DateTime, func, Integer, ForeignKey, Boolean
+from sqlalchemy import String, DateTime, func, Integer, ForeignKey, Boolean, CheckConstraint, Index, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 import uuid
 from ..database import Base
 from ..utils.types import GUID
 
+class UploadGroup(Base):
+    __tablename__ = "upload_groups"
+
+    id: Mapped[uuid.UUID] = mapped_column(GUID, primary_key=True, default=uuid.uuid4)
+    entity_type: Mapped[str] = mapped_column(String(20), nullable=False) # company/contact
+    file_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    uploader_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    uploader = relationship("User")
+    batches = relationship("UploadBatch", back_populates="group", order_by="UploadBatch.file_name")
+
 class UploadBatch(Base):
     __tablename__ = "upload_batches"
 
@@ -15,11 +27,23 @@ class UploadBatch(Base):
     total_rows: Mapped[int] = mapped_column(Integer, default=0)
     valid_rows: Mapped[int] = mapped_column(Integer, default=0)
     invalid_rows: Mapped[int] = mapped_column(Integer, default=0)
+    duplicate_rows: Mapped[int] = mapped_column(Integer, default=0) # valid rows flagged is_duplicate
     status: Mapped[str] = mapped_column(String(20), default="processing") # processing/completed/failed
+    error_message: Mapped[str] = mapped_column(String(500), nullable=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True) # sha256 of the uploaded bytes
+    idempotency_key: Mapped[str] = mapped_column(String(255), nullable=True)
     uploader_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=False)
+    group_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("upload_groups.id"), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     uploader = relationship("User")
+    group = relationship("UploadGroup", back_populates="batches")
+
+    __table_args__ = (
+        Index("idx_upload_batches_group", "group_id"),
+        Index("idx_upload_batches_content", "uploader_id", "entity_type", "content_hash"),
+        Index("uq_upload_batches_idempotency", "uploader_id", "idempotency_key", unique=True),
+    )
 
 class UploadError(Base):
     __tablename__ = "upload_errors"
@@ -31,6 +55,33 @@ class UploadError(Base):
     value: Mapped[str] = mapped_column(String, nullable=True)
     error_message: Mapped[str] = mapped_column(String(500), nullable=False)
     is_corrected: Mapped[bool] = mapped_column(Boolean, default=False)
+    row_data: Mapped[dict] = mapped_column(JSON, nullable=True) # raw row, keyed by lowercased header
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     batch = relationship("UploadBatch")
+
+    __table_args__ = (
+        Index("idx_upload_errors_batch_row", "batch_id", "row_number", "id"),
+    )
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[uuid.UUID] = mapped_column(GUID, primary_key=True, default=uuid.uuid4)
+    entity_type: Mapped[str] = mapped_column(String(20), nullable=False) # company/contact
+    file_name: Mapped[str] = mapped_column(String(500), nullable=False)
+    total_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    received_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    status: Mapped[str] = mapped_column(String(20), default="open") # open/finalized/expired
+    uploader_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("users.id"), nullable=False)
+    batch_id: Mapped[uuid.UUID] = mapped_column(GUID, ForeignKey("upload_batches.id"), nullable=True)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False) # pushed back by every chunk
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    uploader = relationship("User")
+
+    __table_args__ = (
+        Index("idx_upload_sessions_expiry", "status", "expires_at"),
+        CheckConstraint("status IN ('open', 'finalized', 'expired')", name="upload_sessions_status_check"),
+    )
@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Optional
 from uuid import UUID
 
 from ..database import get_db
 from ..middleware.auth import get_current_user
 from ..middleware.rbac import require_permission
-from ..schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse, RejectRequest
+from ..schemas.company import CompanyCreate, CompanyUpdate, CompanyResponse, CompanyPage, RejectRequest
 from ..services.company_service import CompanyService
 from ..models.user import User
 
 router = APIRouter(prefix="/companies", tags=["companies"])
 
-@router.get("", response_model=List[CompanyResponse], dependencies=[Depends(require_permission("companies:read"))])
+@router.get("", response_model=CompanyPage, dependencies=[Depends(require_permission("companies:read"))])
 async def list_companies(
     segment_id: Optional[UUID] = None,
     status: Optional[str] = None,
@@ -21,12 +21,13 @@ async def list_companies(
     is_active: bool = True,
     search: Optional[str] = None,
     limit: int = Query(20, le=100),
-    cursor: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     return await CompanyService.list_companies(
-        db, segment_id, status, created_by, is_duplicate, is_active, search, limit, cursor
+        db, segment_id, status, created_by, is_duplicate, is_active, search, limit, cursor, include_total
     )
 
 @router.post("", response_model=CompanyResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_permission("companies:create"))])
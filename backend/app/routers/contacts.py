@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Optional
 from uuid import UUID
 
 from ..database import get_db
 from ..middleware.auth import get_current_user
 from ..middleware.rbac import require_permission
-from ..schemas.contact import ContactCreate, ContactUpdate, ContactResponse, BulkApproveRequest, AssignSDRRequest
+from ..schemas.contact import ContactCreate, ContactUpdate, ContactResponse, ContactPage, BulkApproveRequest, AssignSDRRequest
 from ..services.contact_service import ContactService
 from ..models.user import User
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
-@router.get("", response_model=List[ContactResponse], dependencies=[Depends(require_permission("contacts:read"))])
+@router.get("", response_model=ContactPage, dependencies=[Depends(require_permission("contacts:read"))])
 async def list_contacts(
     company_id: Optional[UUID] = None,
     segment_id: Optional[UUID] = None,
@@ -23,12 +23,13 @@ async def list_contacts(
     is_active: bool = True,
     search: Optional[str] = None,
     limit: int = Query(20, le=100),
-    cursor: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     return await ContactService.list_contacts(
-        db, company_id, segment_id, status, assigned_sdr_id, created_by, is_duplicate, is_active, search, limit, cursor
+        db, company_id, segment_id, status, assigned_sdr_id, created_by, is_duplicate, is_active, search, limit, cursor, include_total
     )
 
 @router.post("", response_model=ContactResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_permission("contacts:create"))])
@@ -1,15 +1,123 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
 from ..database import get_db
+from ..middleware.auth import get_current_user
 from ..middleware.rbac import require_permission
+from ..models.user import User
+from ..schemas.export import ExportJobResponse
 from ..services.export_service import ExportService
+from ..services.export_job_service import ExportJobService
 
 router = APIRouter(prefix="/exports", tags=["exports"])
 
+STREAM_FORMATS = r"^(csv|csv\.gz|parquet|arrow)$"
+JOB_FORMATS = r"^(csv\.gz|parquet|arrow)$"
+
 @router.get("/companies", dependencies=[Depends(require_permission("exports:companies"))])
-async def export_companies(db: AsyncSession = Depends(get_db)):
-    return await ExportService.export_companies(db)
+async def export_companies(
+    segment_id: Optional[UUID] = None,
+    status: Optional[str] = None,
+    created_by: Optional[UUID] = None,
+    is_duplicate: bool = False,
+    is_active: bool = True,
+    search: Optional[str] = None,
+    columns: Optional[str] = None,
+    export_format: str = Query("csv", alias="format", pattern=STREAM_FORMATS),
+    since: Optional[datetime] = None,
+    sync_token: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    return await ExportService.export_companies(
+        db, columns, export_format, accept_encoding, since, sync_token, segment_id=segment_id, status=status,
+        created_by=created_by, is_duplicate=is_duplicate, is_active=is_active, search=search
+    )
 
 @router.get("/contacts", dependencies=[Depends(require_permission("exports:contacts"))])
-async def export_contacts(db: AsyncSession = Depends(get_db)):
-    return await ExportService.export_contacts(db)
+async def export_contacts(
+    company_id: Optional[UUID] = None,
+    segment_id: Optional[UUID] = None,
+    status: Optional[str] = None,
+    assigned_sdr_id: Optional[UUID] = None,
+    created_by: Optional[UUID] = None,
+    is_duplicate: bool = False,
+    is_active: bool = True,
+    search: Optional[str] = None,
+    columns: Optional[str] = None,
+    export_format: str = Query("csv", alias="format", pattern=STREAM_FORMATS),
+    since: Optional[datetime] = None,
+    sync_token: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    return await ExportService.export_contacts(
+        db, columns, export_format, accept_encoding, since, sync_token, company_id=company_id, segment_id=segment_id,
+        status=status, assigned_sdr_id=assigned_sdr_id, created_by=created_by, is_duplicate=is_duplicate,
+        is_active=is_active, search=search
+    )
+
+# Background exports: 202 when a job is queued, 200 when an identical one is reused
+
+@router.post("/companies/jobs", response_model=ExportJobResponse, dependencies=[Depends(require_permission("exports:companies"))])
+async def create_company_export_job(
+    response: Response,
+    segment_id: Optional[UUID] = None,
+    status: Optional[str] = None,
+    created_by: Optional[UUID] = None,
+    is_duplicate: bool = False,
+    is_active: bool = True,
+    search: Optional[str] = None,
+    columns: Optional[str] = None,
+    export_format: str = Query("csv.gz", alias="format", pattern=JOB_FORMATS),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job, created = await ExportJobService.request_export(
+        db, "company", current_user.id, columns, export_format, segment_id=segment_id, status=status, created_by=created_by,
+        is_duplicate=is_duplicate, is_active=is_active, search=search
+    )
+    response.status_code = 202 if created else 200
+    return job
+
+@router.post("/contacts/jobs", response_model=ExportJobResponse, dependencies=[Depends(require_permission("exports:contacts"))])
+async def create_contact_export_job(
+    response: Response,
+    company_id: Optional[UUID] = None,
+    segment_id: Optional[UUID] = None,
+    status: Optional[str] = None,
+    assigned_sdr_id: Optional[UUID] = None,
+    created_by: Optional[UUID] = None,
+    is_duplicate: bool = False,
+    is_active: bool = True,
+    search: Optional[str] = None,
+    columns: Optional[str] = None,
+    export_format: str = Query("csv.gz", alias="format", pattern=JOB_FORMATS),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job, created = await ExportJobService.request_export(
+        db, "contact", current_user.id, columns, export_format, company_id=company_id, segment_id=segment_id, status=status,
+        assigned_sdr_id=assigned_sdr_id, created_by=created_by, is_duplicate=is_duplicate, is_active=is_active, search=search
+    )
+    response.status_code = 202 if created else 200
+    return job
+
+@router.get("/companies/jobs/{job_id}", response_model=ExportJobResponse, dependencies=[Depends(require_permission("exports:companies"))])
+async def get_company_export_job(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    return await ExportJobService.get_job(db, "company", job_id)
+
+@router.get("/contacts/jobs/{job_id}", response_model=ExportJobResponse, dependencies=[Depends(require_permission("exports:contacts"))])
+async def get_contact_export_job(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    return await ExportJobService.get_job(db, "contact", job_id)
+
+@router.get("/companies/jobs/{job_id}/download", dependencies=[Depends(require_permission("exports:companies"))])
+async def download_company_export(job_id: UUID, range: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+    return await ExportJobService.download(db, "company", job_id, range)
+
+@router.get("/contacts/jobs/{job_id}/download", dependencies=[Depends(require_permission("exports:contacts"))])
+async def download_contact_export(job_id: UUID, range: Optional[str] = Header(None), db: AsyncSession = Depends(get_db)):
+    return await ExportJobService.download(db, "contact", job_id, range)
@@ -1,27 +1,28 @@
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Optional
 from uuid import UUID
 
 from ..database import get_db
 from ..middleware.auth import get_current_user
 from ..middleware.rbac import require_permission
-from ..schemas.segment import SegmentCreate, SegmentUpdate, SegmentResponse
+from ..schemas.segment import SegmentCreate, SegmentUpdate, SegmentResponse, SegmentPage
 from ..services.segment_service import SegmentService
 from ..models.user import User
 
 router = APIRouter(prefix="/segments", tags=["segments"])
 
-@router.get("", response_model=List[SegmentResponse], dependencies=[Depends(require_permission("segments:read"))])
+@router.get("", response_model=SegmentPage, dependencies=[Depends(require_permission("segments:read"))])
 async def list_segments(
     status: Optional[str] = "active",
     search: Optional[str] = None,
     limit: int = Query(20, le=100),
-    cursor: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await SegmentService.list_segments(db, status, search, limit, cursor)
+    return await SegmentService.list_segments(db, status, search, limit, cursor, include_total)
 
 @router.post("", response_model=SegmentResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_permission("segments:create"))])
 async def create_segment(
@@ -1,34 +1,151 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Query, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Header, Query, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 
 from ..database import get_db
 from ..middleware.auth import get_current_user
-from ..middleware.rbac import require_permission
-from ..schemas.upload import BatchResponse, ErrorResponse, BatchListResponse
+from ..middleware.rbac import check_permission, require_permission
+from ..schemas.upload import BatchResponse, ErrorPage, BatchListResponse, CorrectionRequest, CorrectionResult, ValidationPreview, UploadGroupResponse, UploadSessionCreate, UploadSessionResponse
+from ..services.upload_service import UploadService
 from ..services.csv_service import CSVService
 from ..models.user import User
-from ..models.upload import UploadBatch, UploadError
+from ..models.upload import UploadBatch, UploadSession
 from sqlalchemy import select, func, desc
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
-@router.post("/companies", response_model=BatchResponse, dependencies=[Depends(require_permission("companies:upload_csv"))])
+# Permission needed to import each entity type
+UPLOAD_PERMISSIONS = {"company": "companies:upload_csv", "contact": "contacts:upload_csv"}
+
+async def require_batch_upload_permission(
+    id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The upload permission for the entity type of batch `id`."""
+    entity_type = await db.scalar(select(UploadBatch.entity_type).where(UploadBatch.id == id))
+    if not entity_type:
+        raise HTTPException(404, "Batch not found")
+    await check_permission(db, current_user, UPLOAD_PERMISSIONS[entity_type])
+
+async def require_session_upload_permission(
+    id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The upload permission for the entity type of the user's session `id`."""
+    entity_type = await db.scalar(
+        select(UploadSession.entity_type).where(UploadSession.id == id, UploadSession.uploader_id == current_user.id)
+    )
+    if not entity_type:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    await check_permission(db, current_user, UPLOAD_PERMISSIONS[entity_type])
+
+@router.post("/companies", response_model=BatchResponse, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_permission("companies:upload_csv"))])
 async def upload_companies_csv(
     file: UploadFile = File(...),
+    engine: str = Query("python", pattern="^(python|sql)$"),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await CSVService.validate_and_import(file, "company", current_user.id, db)
+    return await UploadService.accept_upload(file, "company", current_user.id, db, engine, idempotency_key)
 
-@router.post("/contacts", response_model=BatchResponse, dependencies=[Depends(require_permission("contacts:upload_csv"))])
+@router.post("/contacts", response_model=BatchResponse, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_permission("contacts:upload_csv"))])
 async def upload_contacts_csv(
     file: UploadFile = File(...),
+    engine: str = Query("python", pattern="^(python|sql)$"),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.accept_upload(file, "contact", current_user.id, db, engine, idempotency_key)
+
+@router.post("/companies/groups", response_model=UploadGroupResponse, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_permission("companies:upload_csv"))])
+async def upload_companies_group(
+    files: List[UploadFile] = File(...),
+    engine: str = Query("python", pattern="^(python|sql)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.accept_group(files, "company", current_user.id, db, engine)
+
+@router.post("/contacts/groups", response_model=UploadGroupResponse, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_permission("contacts:upload_csv"))])
+async def upload_contacts_group(
+    files: List[UploadFile] = File(...),
+    engine: str = Query("python", pattern="^(python|sql)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.accept_group(files, "contact", current_user.id, db, engine)
+
+@router.get("/groups/{id}", response_model=UploadGroupResponse, dependencies=[Depends(require_permission("uploads:read"))])
+async def get_upload_group(
+    id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.get_group(db, id)
+
+@router.post("/companies/preview", response_model=ValidationPreview, dependencies=[Depends(require_permission("companies:upload_csv"))])
+async def preview_companies_csv(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await CSVService.validate_and_import(file, "company", current_user.id, db, dry_run=True)
+
+@router.post("/contacts/preview", response_model=ValidationPreview, dependencies=[Depends(require_permission("contacts:upload_csv"))])
+async def preview_contacts_csv(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await CSVService.validate_and_import(file, "contact", current_user.id, db, dry_run=True)
+
+@router.post("/companies/sessions", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_permission("companies:upload_csv"))])
+async def create_company_upload_session(
+    data: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.create_session(db, data, "company", current_user.id)
+
+@router.post("/contacts/sessions", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_permission("contacts:upload_csv"))])
+async def create_contact_upload_session(
+    data: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.create_session(db, data, "contact", current_user.id)
+
+@router.get("/sessions/{id}", response_model=UploadSessionResponse, dependencies=[Depends(require_session_upload_permission)])
+async def get_upload_session(
+    id: UUID,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return await CSVService.validate_and_import(file, "contact", current_user.id, db)
+    return await UploadService.get_session(db, id, current_user.id)
+
+@router.put("/sessions/{id}", response_model=UploadSessionResponse, dependencies=[Depends(require_session_upload_permission)])
+async def upload_session_chunk(
+    id: UUID,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.write_chunk(db, id, current_user.id, offset, request.stream())
+
+@router.post("/sessions/{id}/finalize", response_model=BatchResponse, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_session_upload_permission)])
+async def finalize_upload_session(
+    id: UUID,
+    engine: str = Query("python", pattern="^(python|sql)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.finalize_session(db, id, current_user.id, engine)
 
 @router.get("/batches", response_model=List[BatchResponse], dependencies=[Depends(require_permission("uploads:read"))])
 async def list_batches(
@@ -46,18 +163,33 @@ async def get_batch(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    stmt = select(UploadBatch).where(UploadBatch.id == id)
-    result = await db.execute(stmt)
-    batch = result.scalar_one_or_none()
-    if not batch: raise HTTPException(404, "Batch not found")
-    return batch
+    return await UploadService.get_batch(db, id)
 
-@router.get("/batches/{id}/errors", response_model=List[ErrorResponse], dependencies=[Depends(require_permission("uploads:read"))])
+@router.get("/batches/{id}/errors", response_model=ErrorPage, dependencies=[Depends(require_permission("uploads:read"))])
 async def get_batch_errors(
     id: UUID,
+    column_name: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    stmt = select(UploadError).where(UploadError.batch_id == id).order_by(UploadError.row_number)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    return await UploadService.list_errors(db, id, column_name, limit, cursor)
+
+@router.get("/batches/{id}/errors/export", dependencies=[Depends(require_permission("uploads:read"))])
+async def export_batch_errors(
+    id: UUID,
+    column_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.export_errors(db, id, column_name)
+
+@router.post("/batches/{id}/corrections", response_model=CorrectionResult, dependencies=[Depends(require_batch_upload_permission)])
+async def correct_batch_rows(
+    id: UUID,
+    data: CorrectionRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await UploadService.correct_rows(db, id, current_user.id, data)
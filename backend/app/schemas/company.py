@@ -64,6 +64,13 @@ class CompanyResponse(CompanyCreate):
 
     model_config = ConfigDict(from_attributes=True)
 
+class CompanyPage(BaseModel):
+    items: List[CompanyResponse]
+    next_cursor: Optional[str] = None
+    # Only with include_total; estimated totals are the planner's row estimate
+    total: Optional[int] = None
+    total_estimated: bool = False
+
 class CompanyBrief(BaseModel):
     id: UUID
     name: str
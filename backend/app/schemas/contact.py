@@ -71,6 +71,13 @@ class ContactResponse(ContactCreate):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ContactPage(BaseModel):
+    items: List[ContactResponse]
+    next_cursor: Optional[str] = None
+    # Only with include_total; estimated totals are the planner's row estimate
+    total: Optional[int] = None
+    total_estimated: bool = False
+
 class BulkApproveRequest(BaseModel):
     contact_ids: List[UUID] = Field(..., min_length=1)
 
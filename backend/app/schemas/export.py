@@ -0,0 +1,17 @@
+from pydantic import BaseModel, ConfigDict
+from uuid import UUID
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+class ExportJobResponse(BaseModel):
+    id: UUID
+    entity_type: str
+    status: str
+    params: Dict[str, Any]
+    row_count: int
+    file_size_bytes: Optional[int] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
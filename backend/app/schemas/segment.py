@@ -50,3 +50,10 @@ class SegmentResponse(BaseModel):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+class SegmentPage(BaseModel):
+    items: List[SegmentResponse]
+    next_cursor: Optional[str] = None
+    # Only with include_total; estimated totals are the planner's row estimate
+    total: Optional[int] = None
+    total_estimated: bool = False
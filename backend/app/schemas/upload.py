@@ -1,7 +1,7 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from .segment import UserBrief
 
 class UploadResponse(BaseModel):
@@ -12,6 +12,13 @@ class UploadResponse(BaseModel):
     invalid_rows: int
     status: str
 
+class BatchProgress(BaseModel):
+    bytes_processed: int
+    bytes_total: int
+    elapsed_seconds: float
+    rows_per_second: float
+    eta_seconds: Optional[float] = None
+
 class BatchResponse(BaseModel):
     id: UUID
     entity_type: str
@@ -20,12 +27,32 @@ class BatchResponse(BaseModel):
     total_rows: int
     valid_rows: int
     invalid_rows: int
+    duplicate_rows: int = 0
     status: str
+    error_message: Optional[str] = None
+    content_hash: Optional[str] = None
     uploader: Optional[UserBrief] = None
+    group_id: Optional[UUID] = None
     created_at: datetime
+    progress: Optional[BatchProgress] = None
 
     model_config = ConfigDict(from_attributes=True)
 
+class UploadGroupResponse(BaseModel):
+    id: UUID
+    entity_type: str
+    file_count: int
+    status: str
+    completed_files: int
+    failed_files: int
+    total_rows: int
+    valid_rows: int
+    invalid_rows: int
+    duplicate_rows: int
+    progress: Optional[BatchProgress] = None
+    batches: List[BatchResponse]
+    created_at: datetime
+
 class ErrorResponse(BaseModel):
     id: UUID
     row_number: int
@@ -36,6 +63,56 @@ class ErrorResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ErrorPage(BaseModel):
+    items: List[ErrorResponse]
+    next_cursor: Optional[str] = None
+
+class PreviewError(BaseModel):
+    row_number: int
+    column_name: str
+    value: Optional[str] = None
+    error_message: str
+
+class ValidationPreview(BaseModel):
+    entity_type: str
+    file_name: str
+    total_rows: int
+    valid_rows: int
+    invalid_rows: int
+    errors_by_column: Dict[str, int]
+    sample_errors: List[PreviewError]
+    aborted: bool
+    abort_reason: Optional[str] = None
+
+class RowCorrection(BaseModel):
+    row_number: int = Field(..., ge=2)
+    values: Dict[str, str]
+
+class CorrectionRequest(BaseModel):
+    rows: List[RowCorrection] = Field(..., min_length=1, max_length=1000)
+
+class CorrectionResult(BaseModel):
+    batch: BatchResponse
+    corrected_rows: int
+    errors: List[ErrorResponse]
+
 class BatchListResponse(BaseModel):
     items: List[BatchResponse]
     total: int
+
+class UploadSessionCreate(BaseModel):
+    file_name: str = Field(..., min_length=1, max_length=500)
+    total_size: int = Field(..., gt=0)
+
+class UploadSessionResponse(BaseModel):
+    id: UUID
+    entity_type: str
+    file_name: str
+    total_size: int
+    received_bytes: int
+    status: str
+    batch_id: Optional[UUID] = None
+    created_at: datetime
+    expires_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
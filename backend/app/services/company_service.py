@@ -1,14 +1,19 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_, desc
+from sqlalchemy import select, func, and_
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from fastapi import HTTPException, status
 
-from ..models.company import Company
+from ..models.company import Company, COMPANY_SEARCH_COLUMNS
 from ..models.segment import Segment
 from ..schemas.company import CompanyCreate, CompanyUpdate, RejectRequest
 from .audit_service import AuditService
+from .dedup_service import DedupService
+from ..utils.counts import list_total
+from ..utils.dedup import dedup_key
 from ..utils.normalizers import normalize_company_name, normalize_url
+from ..utils.search import rank_search, ranked_page, search_match, search_terms
 
 class CompanyService:
     @staticmethod
@@ -42,9 +47,10 @@ class CompanyService:
             segment_id=data.segment_id,
             status="pending",
             created_by=user_id,
-            is_active=True,
-            is_duplicate=False
+            is_active=True
         )
+        company.dedup_key = dedup_key(company.name, company.website, company.segment_id)
+        company.is_duplicate = await DedupService.is_duplicate(db, Company, company.dedup_key)
 
         db.add(company)
         await db.flush()
@@ -75,6 +81,11 @@ class CompanyService:
             else:
                 setattr(company, field, value)
 
+        key = dedup_key(company.name, company.website, company.segment_id)
+        if key != company.dedup_key:
+            company.dedup_key = key
+            company.is_duplicate = await DedupService.is_duplicate(db, Company, key, exclude_id=company.id)
+
         await AuditService.log_event(
             db, user_id, "update", "company", company.id,
             {"old": old_values, "new": data.model_dump(exclude_unset=True)}
@@ -120,24 +131,22 @@ class CompanyService:
         return company
 
     @staticmethod
-    async def list_companies(
-        db: AsyncSession,
+    def apply_filters(
+        stmt,
         segment_id: Optional[UUID] = None,
         status: Optional[str] = None,
         created_by: Optional[UUID] = None,
-        is_duplicate: bool = False,
-        is_active: bool = True,
-        search: Optional[str] = None,
-        limit: int = 20,
-        cursor: Optional[UUID] = None
-    ) -> List[Company]:
-        from ..utils.pagination import apply_cursor_pagination
-        from sqlalchemy.orm import selectinload
-
-        stmt = select(Company).options(selectinload(Company.segment))
-
-        stmt = stmt.where(Company.is_active == is_active)
-        stmt = stmt.where(Company.is_duplicate == is_duplicate)
+        is_duplicate: Optional[bool] = False,
+        is_active: Optional[bool] = True,
+        search: Optional[str] = None
+    ):
+        """The list filters, shared with the company export. `is_active=None`
+        matches active and deactivated records, `is_duplicate=None` both
+        duplicates and originals."""
+        if is_active is not None:
+            stmt = stmt.where(Company.is_active == is_active)
+        if is_duplicate is not None:
+            stmt = stmt.where(Company.is_duplicate == is_duplicate)
 
         if segment_id:
             stmt = stmt.where(Company.segment_id == segment_id)
@@ -146,17 +155,52 @@ class CompanyService:
         if created_by:
             stmt = stmt.where(Company.created_by == created_by)
 
-        if search:
-            stmt = stmt.where(or_(
-                Company.name.ilike(f"%{search}%"),
-                Company.industry.ilike(f"%{search}%")
-            ))
+        terms = search_terms(search) if search else []
+        if terms:
+            stmt = stmt.where(search_match(COMPANY_SEARCH_COLUMNS, terms))
+        return stmt
 
-        stmt = stmt.order_by(desc(Company.created_at))
-        stmt = apply_cursor_pagination(stmt, Company.id, limit, cursor)
+    @staticmethod
+    async def list_companies(
+        db: AsyncSession,
+        segment_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+        created_by: Optional[UUID] = None,
+        is_duplicate: bool = False,
+        is_active: bool = True,
+        search: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> dict:
+        """Newest first, or best match first for a `search` that `rank_search`
+        ranks; keyset page over (created_at, id) or (rank, id). With
+        `include_total` the page carries the total of matching companies
+        (see `list_total`)."""
+        from ..utils.pagination import apply_keyset_pagination, keyset_page
+        from sqlalchemy.orm import selectinload
 
-        result = await db.execute(stmt)
-        return result.scalars().all()
+        filters = dict(
+            segment_id=segment_id, status=status, created_by=created_by,
+            is_duplicate=is_duplicate, is_active=is_active, search=search
+        )
+        stmt = CompanyService.apply_filters(select(Company), **filters)
+
+        terms = search_terms(search) if search else []
+        if terms and await rank_search(db, stmt, terms, cursor):
+            page = await ranked_page(
+                db, stmt.options(selectinload(Company.segment)), Company, COMPANY_SEARCH_COLUMNS, terms, limit, cursor
+            )
+        else:
+            page_stmt = apply_keyset_pagination(
+                stmt.options(selectinload(Company.segment)),
+                (Company.created_at, Company.id), (datetime.fromisoformat, UUID), limit, cursor, descending=True
+            )
+            result = await db.execute(page_stmt)
+            page = keyset_page(result.scalars().all(), limit, lambda c: (c.created_at, c.id))
+        if include_total:
+            page["total"], page["total_estimated"] = await list_total(db, Company.__tablename__, stmt, filters)
+        return page
 
     @staticmethod
     async def get_company(db: AsyncSession, company_id: UUID) -> Company:
@@ -1,15 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_, update, desc
+from sqlalchemy import select, func, and_, update
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from fastapi import HTTPException, status
 
-from ..models.contact import Contact
+from ..models.contact import Contact, CONTACT_SEARCH_COLUMNS
 from ..models.company import Company
 from ..models.user import User
 from ..schemas.contact import ContactCreate, ContactUpdate, BulkApproveRequest, AssignSDRRequest
 from .audit_service import AuditService
+from .dedup_service import DedupService
+from ..utils.dedup import dedup_key
+from ..utils.counts import list_total
 from ..utils.normalizers import normalize_url
+from ..utils.search import rank_search, ranked_page, search_match, search_terms
 
 class ContactService:
     @staticmethod
@@ -48,9 +53,10 @@ class ContactService:
             data_requester_details=data.data_requester_details,
             status="uploaded",
             created_by=user_id,
-            is_active=True,
-            is_duplicate=False
+            is_active=True
         )
+        contact.dedup_key = dedup_key(contact.email, contact.company_id)
+        contact.is_duplicate = await DedupService.is_duplicate(db, Contact, contact.dedup_key)
 
         db.add(contact)
         await db.flush()
@@ -78,6 +84,11 @@ class ContactService:
                     value = normalize_url(value)
             setattr(contact, field, value)
 
+        key = dedup_key(contact.email, contact.company_id)
+        if key != contact.dedup_key:
+            contact.dedup_key = key
+            contact.is_duplicate = await DedupService.is_duplicate(db, Contact, key, exclude_id=contact.id)
+
         await AuditService.log_event(db, user_id, "update", "contact", contact.id)
         await db.commit()
         await db.refresh(contact)
@@ -144,30 +155,24 @@ class ContactService:
         return contact
 
     @staticmethod
-    async def list_contacts(
-        db: AsyncSession,
+    def apply_filters(
+        stmt,
         company_id: Optional[UUID] = None,
         segment_id: Optional[UUID] = None,
         status: Optional[str] = None,
         assigned_sdr_id: Optional[UUID] = None,
         created_by: Optional[UUID] = None,
-        is_duplicate: bool = False,
-        is_active: bool = True,
-        search: Optional[str] = None,
-        limit: int = 20,
-        cursor: Optional[UUID] = None
-    ) -> List[Contact]:
-        from ..utils.pagination import apply_cursor_pagination
-        from sqlalchemy.orm import selectinload
-
-        stmt = select(Contact).options(
-            selectinload(Contact.company),
-            selectinload(Contact.segment),
-            selectinload(Contact.assigned_sdr)
-        )
-
-        stmt = stmt.where(Contact.is_active == is_active)
-        stmt = stmt.where(Contact.is_duplicate == is_duplicate)
+        is_duplicate: Optional[bool] = False,
+        is_active: Optional[bool] = True,
+        search: Optional[str] = None
+    ):
+        """The list filters, shared with the contact export. `is_active=None`
+        matches active and deactivated records, `is_duplicate=None` both
+        duplicates and originals."""
+        if is_active is not None:
+            stmt = stmt.where(Contact.is_active == is_active)
+        if is_duplicate is not None:
+            stmt = stmt.where(Contact.is_duplicate == is_duplicate)
 
         if company_id:
             stmt = stmt.where(Contact.company_id == company_id)
@@ -180,18 +185,57 @@ class ContactService:
         if created_by:
             stmt = stmt.where(Contact.created_by == created_by)
 
-        if search:
-            stmt = stmt.where(or_(
-                Contact.first_name.ilike(f"%{search}%"),
-                Contact.last_name.ilike(f"%{search}%"),
-                Contact.email.ilike(f"%{search}%")
-            ))
+        terms = search_terms(search) if search else []
+        if terms:
+            stmt = stmt.where(search_match(CONTACT_SEARCH_COLUMNS, terms))
+        return stmt
+
+    @staticmethod
+    async def list_contacts(
+        db: AsyncSession,
+        company_id: Optional[UUID] = None,
+        segment_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+        assigned_sdr_id: Optional[UUID] = None,
+        created_by: Optional[UUID] = None,
+        is_duplicate: bool = False,
+        is_active: bool = True,
+        search: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> dict:
+        """Newest first, or best match first for a `search` that `rank_search`
+        ranks; keyset page over (created_at, id) or (rank, id). With
+        `include_total` the page carries the total of matching contacts
+        (see `list_total`)."""
+        from ..utils.pagination import apply_keyset_pagination, keyset_page
+        from sqlalchemy.orm import selectinload
 
-        stmt = stmt.order_by(desc(Contact.created_at))
-        stmt = apply_cursor_pagination(stmt, Contact.id, limit, cursor)
+        filters = dict(
+            company_id=company_id, segment_id=segment_id, status=status, assigned_sdr_id=assigned_sdr_id,
+            created_by=created_by, is_duplicate=is_duplicate, is_active=is_active, search=search
+        )
+        stmt = ContactService.apply_filters(select(Contact), **filters)
 
-        result = await db.execute(stmt)
-        return result.scalars().all()
+        stmt_with_relations = stmt.options(
+            selectinload(Contact.company),
+            selectinload(Contact.segment),
+            selectinload(Contact.assigned_sdr)
+        )
+        terms = search_terms(search) if search else []
+        if terms and await rank_search(db, stmt, terms, cursor):
+            page = await ranked_page(db, stmt_with_relations, Contact, CONTACT_SEARCH_COLUMNS, terms, limit, cursor)
+        else:
+            page_stmt = apply_keyset_pagination(
+                stmt_with_relations,
+                (Contact.created_at, Contact.id), (datetime.fromisoformat, UUID), limit, cursor, descending=True
+            )
+            result = await db.execute(page_stmt)
+            page = keyset_page(result.scalars().all(), limit, lambda c: (c.created_at, c.id))
+        if include_total:
+            page["total"], page["total_estimated"] = await list_total(db, Contact.__tablename__, stmt, filters)
+        return page
 
     @staticmethod
     async def get_contact(db: AsyncSession, contact_id: UUID) -> Contact:
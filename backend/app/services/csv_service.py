@@ -1,176 +1,339 @@
-import csv
-import io
+import asyncio
+from collections import Counter, deque
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, delete, and_
 from uuid import UUID, uuid4
 from fastapi import HTTPException, UploadFile
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
 
+from ..config import settings
 from ..models.upload import UploadBatch, UploadError
 from ..models.segment import Segment
 from ..models.company import Company
 from ..models.contact import Contact
-from ..utils.csv_validators import COMPANY_REQUIRED_COLUMNS, CONTACT_REQUIRED_COLUMNS, is_valid_email, is_valid_url, validate_founded_year
-from ..utils.normalizers import normalize_company_name, normalize_url
+from ..utils.bulk_insert import bulk_insert
+from ..utils.csv_stream import CSVRowStream
+from ..utils.csv_validators import COMPANY_REQUIRED_COLUMNS, CONTACT_REQUIRED_COLUMNS, get_validation_plan
+from ..utils.process_pool import get_process_pool
 from .audit_service import AuditService
+from .dedup_service import DedupService
+
+# Number of rows validated and written together
+IMPORT_FLUSH_ROWS = 1000
+
+# Errors returned with a dry-run preview
+PREVIEW_SAMPLE_ERRORS = 20
 
 class CSVService:
     @staticmethod
-    async def validate_and_import(file: UploadFile, entity_type: str, uploader_id: UUID, db: AsyncSession):
-        content = await file.read()
-        try:
-            decoded = content.decode("utf-8")
-        except UnicodeDecodeError:
-            raise HTTPException(status_code=422, detail="File must be UTF-8 encoded")
-
-        if len(content) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=422, detail="File size exceeds 10MB limit")
-
-        reader = csv.DictReader(io.StringIO(decoded))
-        headers = [h.strip() for h in reader.fieldnames] if reader.fieldnames else []
-        headers_lower = {h.lower(): h for h in headers}
+    async def validate_and_import(file: UploadFile, entity_type: str, uploader_id: UUID, db: AsyncSession, dry_run: bool = False):
+        """Imports `file` into a new batch, or with `dry_run` only validates it and
+        returns the preview from `preview` without writing anything."""
+        if dry_run:
+            return await CSVService.preview(db, file, entity_type, uploader_id)
 
-        required = COMPANY_REQUIRED_COLUMNS if entity_type == "company" else CONTACT_REQUIRED_COLUMNS
-        missing = [col for col in required if col.lower() not in headers_lower]
-
-        if missing:
-            raise HTTPException(status_code=422, detail=f"Missing required columns: {', '.join(missing)}")
+        batch = CSVService.new_batch(entity_type, file.filename, uploader_id)
+        db.add(batch)
+        await db.flush()
+        return await CSVService.process_batch(db, batch, file)
 
-        batch = UploadBatch(
+    @staticmethod
+    def new_batch(entity_type: str, file_name: str, uploader_id: UUID, file_size_bytes: int = 0) -> UploadBatch:
+        return UploadBatch(
             id=uuid4(),
             entity_type=entity_type,
-            file_name=file.filename,
-            file_size_bytes=len(content),
+            file_name=file_name,
+            file_size_bytes=file_size_bytes,
             status="processing",
             uploader_id=uploader_id,
             total_rows=0,
             valid_rows=0,
-            invalid_rows=0
+            invalid_rows=0,
+            duplicate_rows=0
         )
-        db.add(batch)
-        await db.flush()
 
-        valid_objects = []
-        errors = []
+    @staticmethod
+    async def check_headers(file: UploadFile, entity_type: str) -> List[str]:
+        """Reads only the header row so a bad file can be rejected before it is queued."""
+        stream = CSVService.row_stream(file)
+        header = await anext(stream.__aiter__(), None)
+        return CSVService._header_keys(header, entity_type)
 
-        row_num = 1
-        for row in reader:
-            row_num += 1
-            row_errors = []
+    @staticmethod
+    def row_stream(file: UploadFile) -> CSVRowStream:
+        """Row reader for an upload, which may be plain, gzip or zip compressed."""
+        return CSVRowStream(
+            file,
+            settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+            max_decompressed_bytes=settings.MAX_DECOMPRESSED_SIZE_MB * 1024 * 1024,
+            max_ratio=settings.MAX_COMPRESSION_RATIO
+        )
 
-            # Map headers back to actual row keys
-            mapped_row = {}
-            for k, v in row.items():
-                if k and k.strip():
-                    mapped_row[k.strip().lower()] = v.strip() if v else ""
+    @staticmethod
+    def _header_keys(header: List[str], entity_type: str) -> List[str]:
+        headers = [h.strip() for h in header] if header else []
+        headers_lower = {h.lower(): h for h in headers}
 
-            # Entity-specific validation
-            if entity_type == "company":
-                obj, row_errs = await CSVService._validate_company_row(mapped_row, row_num, uploader_id, batch.id, db)
-            else:
-                obj, row_errs = await CSVService._validate_contact_row(mapped_row, row_num, uploader_id, batch.id, db)
+        required = COMPANY_REQUIRED_COLUMNS if entity_type == "company" else CONTACT_REQUIRED_COLUMNS
+        missing = [col for col in required if col.lower() not in headers_lower]
 
-            if row_errs:
-                errors.extend(row_errs)
-            else:
-                valid_objects.append(obj)
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing required columns: {', '.join(missing)}")
 
-            batch.total_rows += 1
+        return [h.lower() for h in headers]
 
-        # Bulk insert valid rows
-        if valid_objects:
-            db.add_all(valid_objects)
-            batch.valid_rows = len(valid_objects)
+    @staticmethod
+    async def process_batch(db: AsyncSession, batch: UploadBatch, file: UploadFile, progress=None) -> UploadBatch:
+        """Imports the rows of `file` into an already flushed batch and commits.
 
-        # Store errors
-        if errors:
-            db.add_all([UploadError(**e, batch_id=batch.id) for e in errors])
-            batch.invalid_rows = len(errors)
+        `progress`, when given, is updated after every chunk with the batch
+        counters and the number of bytes read so far. The import is aborted with
+        a 422 once the error rate shows the file is not worth reading to the end.
+        """
+        stream = CSVService.row_stream(file)
+        async for result in CSVService._validated_chunks(db, batch, stream):
+            await CSVService._write_chunk(db, batch, result)
+            if progress:
+                progress.update(batch, stream.bytes_read)
+            reason = CSVService._abort_reason(batch)
+            if reason:
+                raise HTTPException(status_code=422, detail=reason)
 
+        batch.file_size_bytes = stream.bytes_read
         batch.status = "completed"
-        await AuditService.log_event(db, uploader_id, "upload", entity_type, batch.id, {"valid": batch.valid_rows, "invalid": batch.invalid_rows})
+        await AuditService.log_event(db, batch.uploader_id, "upload", batch.entity_type, batch.id, {
+            "valid": batch.valid_rows, "invalid": batch.invalid_rows, "duplicates": batch.duplicate_rows
+        })
         await db.commit()
 
         return batch
 
     @staticmethod
-    async def _validate_company_row(row: Dict, row_num: int, user_id: UUID, batch_id: UUID, db: AsyncSession):
-        errors = []
-        name = row.get("company name")
-        seg_name = row.get("segment name")
+    async def preview(db: AsyncSession, file: UploadFile, entity_type: str, uploader_id: UUID, sample_size: int = PREVIEW_SAMPLE_ERRORS) -> dict:
+        """Validates `file` without writing rows, errors or a batch.
 
-        if not name: errors.append({"row_number": row_num, "column_name": "Company Name", "error_message": "Required", "value": ""})
-        if not seg_name: errors.append({"row_number": row_num, "column_name": "Segment Name", "error_message": "Required", "value": ""})
+        Returns the row counters, error counts per column and the first
+        `sample_size` errors. Reading stops early under the same error-rate
+        rule as the import, with `aborted` set.
+        """
+        batch = CSVService.new_batch(entity_type, file.filename, uploader_id) # never added to the session
+        stream = CSVService.row_stream(file)
+        errors_by_column = Counter()
+        sample_errors = []
+        reason = None
 
-        website = row.get("company website")
-        if website and not is_valid_url(website):
-            errors.append({"row_number": row_num, "column_name": "Company Website", "error_message": "Invalid URL", "value": website})
+        async for result in CSVService._validated_chunks(db, batch, stream):
+            CSVService._count_chunk(batch, result)
+            errors = result[1]
+            errors_by_column.update(e["column_name"] for e in errors)
+            sample_errors.extend(errors[:sample_size - len(sample_errors)])
+            reason = CSVService._abort_reason(batch)
+            if reason:
+                break
 
-        year = row.get("founded year")
-        if year and not validate_founded_year(year):
-            errors.append({"row_number": row_num, "column_name": "Founded Year", "error_message": "Invalid year (1800-2024)", "value": year})
+        return {
+            "entity_type": entity_type,
+            "file_name": file.filename,
+            "total_rows": batch.total_rows,
+            "valid_rows": batch.valid_rows,
+            "invalid_rows": batch.invalid_rows,
+            "errors_by_column": dict(errors_by_column),
+            "sample_errors": sample_errors,
+            "aborted": reason is not None,
+            "abort_reason": reason
+        }
 
-        segment_id = None
-        if seg_name:
-            stmt = select(Segment).where(and_(Segment.name == seg_name, Segment.status == "active"))
-            res = await db.execute(stmt)
-            seg = res.scalar_one_or_none()
-            if not seg:
-                errors.append({"row_number": row_num, "column_name": "Segment Name", "error_message": f"Active segment '{seg_name}' not found", "value": seg_name})
-            else:
-                segment_id = seg.id
-
-        if errors: return None, errors
-
-        return Company(
-            name=normalize_company_name(name),
-            website=normalize_url(website) if website else None,
-            segment_id=segment_id,
-            status="pending",
-            created_by=user_id,
-            batch_id=batch_id,
-            is_active=True,
-            is_duplicate=False,
-            # ... map other fields from row ...
-            industry=row.get("company industry"),
-            description=row.get("company description")
-        ), []
+    @staticmethod
+    async def _validated_chunks(db: AsyncSession, batch: UploadBatch, stream: CSVRowStream) -> AsyncIterator[tuple]:
+        """Yields `validate_chunk` results for the rows of `stream`, in row order.
+
+        Chunks are validated in the process pool when IMPORT_PROCESS_WORKERS is
+        set (inline otherwise), with a bounded number in flight.
+        """
+        rows = stream.__aiter__()
+        keys = CSVService._header_keys(await anext(rows, None), batch.entity_type)
+        lookup = {}
+        chunk = []
+        in_flight = deque()
+        max_in_flight = max(settings.IMPORT_PROCESS_WORKERS, 1) * 2
+
+        row_num = 1
+        async for row in rows:
+            row_num += 1
+            chunk.append((row_num, row))
+
+            if len(chunk) >= IMPORT_FLUSH_ROWS:
+                in_flight.append(await CSVService._submit_chunk(db, batch, keys, chunk, lookup))
+                chunk = []
+                while len(in_flight) >= max_in_flight:
+                    yield await in_flight.popleft()
+
+        if chunk:
+            in_flight.append(await CSVService._submit_chunk(db, batch, keys, chunk, lookup))
+        while in_flight:
+            yield await in_flight.popleft()
+
+    @staticmethod
+    def _abort_reason(batch: UploadBatch) -> Optional[str]:
+        """Message explaining why the batch should stop, or None to keep going."""
+        if batch.total_rows < settings.IMPORT_ABORT_MIN_ROWS:
+            return None
+        if batch.invalid_rows <= batch.total_rows * settings.IMPORT_ABORT_ERROR_RATE:
+            return None
+        return (
+            f"Aborted after {batch.total_rows} rows: {batch.invalid_rows} are invalid. "
+            f"Check that the file matches the {batch.entity_type} template."
+        )
+
+    @staticmethod
+    async def _submit_chunk(db: AsyncSession, batch: UploadBatch, keys: List[str], chunk: List, lookup: Dict) -> asyncio.Future:
+        """Resolves the names used by a chunk and hands it to the validation pool.
+
+        Returns a future of `validate_chunk`'s result, already completed when no
+        pool is configured.
+        """
+        column = "segment name" if batch.entity_type == "company" else "company name"
+        index = max(i for i, k in enumerate(keys) if k == column)
+        names = {row[index].strip() for _, row in chunk if index < len(row)}
+        names.discard("")
+        await CSVService._resolve_names(db, batch.entity_type, names, lookup)
+        names_map = {name: lookup[name] for name in names}
+
+        args = (batch.entity_type, keys, chunk, names_map, batch.uploader_id, batch.id)
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        if pool:
+            return loop.run_in_executor(pool, CSVService.validate_chunk, *args)
+
+        future = loop.create_future()
+        future.set_result(CSVService.validate_chunk(*args))
+        return future
+
+    @staticmethod
+    def _count_chunk(batch: UploadBatch, result: tuple):
+        valid_rows, errors, invalid_count = result
+        batch.total_rows += len(valid_rows) + invalid_count
+        batch.valid_rows += len(valid_rows)
+        batch.invalid_rows += invalid_count
+
+    @staticmethod
+    async def _write_chunk(db: AsyncSession, batch: UploadBatch, result: tuple):
+        CSVService._count_chunk(batch, result)
+        valid_rows, errors, _ = result
+
+        # Rows go straight to the tables (COPY on PostgreSQL) instead of through
+        # ORM objects; each chunk is written as soon as it is validated, so
+        # later chunks see its rows when they are checked for duplicates.
+        model = Company if batch.entity_type == "company" else Contact
+        batch.duplicate_rows += await DedupService.flag_rows(db, model, valid_rows)
+        await bulk_insert(db, model.__table__, valid_rows)
+        await bulk_insert(db, UploadError.__table__, [dict(e, id=uuid4(), batch_id=batch.id) for e in errors])
+
+    @staticmethod
+    def validate_chunk(entity_type: str, keys: List[str], chunk: List, lookup: Dict, user_id: UUID, batch_id: UUID) -> tuple:
+        """Validates and normalizes a chunk of raw rows. Pure CPU work with no session,
+        so it can run in a worker process.
+
+        Returns (valid row dicts, error dicts, number of invalid rows).
+        """
+        plan = get_validation_plan(entity_type, tuple(keys))
+        return plan.validate(chunk, lookup, user_id, batch_id)
+
+    @staticmethod
+    async def apply_corrections(db: AsyncSession, batch: UploadBatch, corrections: Dict[int, Dict[str, str]]) -> tuple:
+        """Revalidates only the corrected rows of a completed batch.
+
+        `corrections` maps a row number to new values by column name. The values
+        are merged over the row stored with its errors and run through the same
+        validators as the import. Rows that pass are inserted into the batch and
+        their errors marked corrected; rows that still fail get their errors
+        replaced. Returns (number of rows fixed, new errors).
+        """
+        if batch.status != "completed":
+            raise HTTPException(status_code=409, detail="Only completed batches can be corrected")
+
+        stmt = select(UploadError).where(
+            UploadError.batch_id == batch.id,
+            UploadError.row_number.in_(corrections.keys()),
+            UploadError.is_corrected == False
+        )
+        result = await db.execute(stmt)
+        stored = {}
+        for error in result.scalars():
+            stored.setdefault(error.row_number, error.row_data or {})
+
+        missing = sorted(corrections.keys() - stored.keys())
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Rows without open errors: {', '.join(map(str, missing))}")
+
+        mapped_rows = []
+        for row_num, values in sorted(corrections.items()):
+            mapped_row = dict(stored[row_num])
+            mapped_row.update({k.strip().lower(): v.strip() if v else "" for k, v in values.items()})
+            mapped_rows.append((row_num, mapped_row))
+
+        # Back to raw rows over the union of their headers, as the import sees them
+        keys = list(dict.fromkeys(k for _, row in mapped_rows for k in row))
+        chunk = [(row_num, [row.get(k, "") for k in keys]) for row_num, row in mapped_rows]
+
+        column = "segment name" if batch.entity_type == "company" else "company name"
+        names = {row.get(column, "") for _, row in mapped_rows}
+        names.discard("")
+        lookup = {}
+        await CSVService._resolve_names(db, batch.entity_type, names, lookup)
+
+        valid_rows, errors, _ = CSVService.validate_chunk(batch.entity_type, keys, chunk, lookup, batch.uploader_id, batch.id)
+        failed = {e["row_number"] for e in errors}
+        fixed = [row_num for row_num, _ in chunk if row_num not in failed]
+
+        if fixed:
+            await db.execute(
+                update(UploadError)
+                .where(UploadError.batch_id == batch.id, UploadError.row_number.in_(fixed))
+                .values(is_corrected=True)
+            )
+        if failed:
+            await db.execute(
+                delete(UploadError)
+                .where(UploadError.batch_id == batch.id, UploadError.row_number.in_(failed), UploadError.is_corrected == False)
+            )
+
+        model = Company if batch.entity_type == "company" else Contact
+        duplicates = await DedupService.flag_rows(db, model, valid_rows)
+        await bulk_insert(db, model.__table__, valid_rows)
+        errors = [dict(e, id=uuid4(), batch_id=batch.id) for e in errors]
+        await bulk_insert(db, UploadError.__table__, errors)
+
+        batch.valid_rows += len(fixed)
+        batch.invalid_rows -= len(fixed)
+        batch.duplicate_rows += duplicates
+        await AuditService.log_event(db, batch.uploader_id, "correct", batch.entity_type, batch.id, {"corrected": len(fixed), "invalid": len(failed)})
+        await db.commit()
+        await db.refresh(batch)
+
+        return len(fixed), errors
 
     @staticmethod
-    async def _validate_contact_row(row: Dict, row_num: int, user_id: UUID, batch_id: UUID, db: AsyncSession):
-        errors = []
-        fname = row.get("first name")
-        lname = row.get("last name")
-        email = row.get("email")
-        cname = row.get("company name")
-
-        if not fname: errors.append({"row_number": row_num, "column_name": "First Name", "error_message": "Required", "value": ""})
-        if not lname: errors.append({"row_number": row_num, "column_name": "Last Name", "error_message": "Required", "value": ""})
-        if not email: errors.append({"row_number": row_num, "column_name": "Email", "error_message": "Required", "value": ""})
-        elif not is_valid_email(email): errors.append({"row_number": row_num, "column_name": "Email", "error_message": "Invalid email format", "value": email})
-
-        if not cname: errors.append({"row_number": row_num, "column_name": "Company Name", "error_message": "Required", "value": ""})
-
-        company = None
-        if cname:
-            stmt = select(Company).where(and_(Company.name == cname, Company.status == "approved"))
+    async def _resolve_names(db: AsyncSession, entity_type: str, names: set, lookup: Dict):
+        """Resolves segment (company files) or company (contact files) names with a
+        single query. Results, including misses, are cached in `lookup` for the
+        rest of the batch."""
+        names = names - lookup.keys()
+        if not names:
+            return
+
+        if entity_type == "company":
+            stmt = select(Segment.name, Segment.id).where(and_(Segment.name.in_(names), Segment.status == "active"))
             res = await db.execute(stmt)
-            company = res.scalar_one_or_none()
-            if not company:
-                errors.append({"row_number": row_num, "column_name": "Company Name", "error_message": f"Approved company '{cname}' not found", "value": cname})
-
-        if errors: return None, errors
-
-        return Contact(
-            first_name=fname,
-            last_name=lname,
-            email=email.lower(),
-            company_id=company.id,
-            segment_id=company.segment_id,
-            status="uploaded",
-            created_by=user_id,
-            batch_id=batch_id,
-            is_active=True,
-            is_duplicate=False,
-            job_title=row.get("job title")
-        ), []
+            for name, segment_id in res:
+                lookup[name] = segment_id
+        else:
+            stmt = select(Company.name, Company.id, Company.segment_id).where(
+                and_(Company.name.in_(names), Company.status == "approved")
+            ).order_by(Company.created_at)
+            res = await db.execute(stmt)
+            for name, company_id, segment_id in res:
+                lookup.setdefault(name, (company_id, segment_id))
+
+        for name in names:
+            lookup.setdefault(name, None)
@@ -1,8 +1,51 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import String, any_, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Dict, List, Optional, Set
+from uuid import UUID
 from .audit_service import AuditService
+from ..utils.counts import mark_written
 
 class DedupService:
+    @staticmethod
+    async def existing_keys(db: AsyncSession, model, keys: Set[str]) -> Set[str]:
+        """The subset of `keys` already used by active records of `model`."""
+        if not keys:
+            return set()
+        if db.bind.dialect.name == "postgresql":
+            # One array parameter: with an IN list of bound values the cached
+            # generic plan of a growing table ends up comparing every row with
+            # every key
+            match = model.dedup_key == any_(literal(list(keys), ARRAY(String)))
+        else:
+            match = model.dedup_key.in_(keys)
+        stmt = select(model.dedup_key).where(match, model.is_active == True).distinct()
+        result = await db.execute(stmt)
+        return set(result.scalars())
+
+    @staticmethod
+    async def is_duplicate(db: AsyncSession, model, key: str, exclude_id: Optional[UUID] = None) -> bool:
+        stmt = select(model.id).where(model.dedup_key == key, model.is_active == True)
+        if exclude_id:
+            stmt = stmt.where(model.id != exclude_id)
+        result = await db.execute(stmt.limit(1))
+        return result.first() is not None
+
+    @staticmethod
+    async def flag_rows(db: AsyncSession, model, rows: List[Dict]) -> int:
+        """Sets `is_duplicate` on row dicts about to be inserted: a row is a
+        duplicate when its `dedup_key` is used by an active record, including
+        rows of the same batch already written, or by an earlier row in `rows`.
+        Returns the number flagged."""
+        seen = await DedupService.existing_keys(db, model, {row["dedup_key"] for row in rows})
+        flagged = 0
+        for row in rows:
+            row["is_duplicate"] = row["dedup_key"] in seen
+            if row["is_duplicate"]:
+                flagged += 1
+            seen.add(row["dedup_key"])
+        return flagged
+
     @staticmethod
     async def run_dedup_job(db: AsyncSession):
         # Company dedup: name + website within same segment
@@ -12,8 +55,8 @@ class DedupService:
         # Mark duplicates for companies
         company_sql = text("""
             UPDATE companies
-            SET is_duplicate = true
-            WHERE id IN (
+            SET is_duplicate = true, updated_at = now()
+            WHERE is_duplicate = false AND id IN (
                 SELECT id FROM (
                     SELECT id, ROW_NUMBER() OVER(
                         PARTITION BY LOWER(TRIM(name)), COALESCE(LOWER(TRIM(website)), ''), segment_id
@@ -28,8 +71,8 @@ class DedupService:
         # Mark duplicates for contacts
         contact_sql = text("""
             UPDATE contacts
-            SET is_duplicate = true
-            WHERE id IN (
+            SET is_duplicate = true, updated_at = now()
+            WHERE is_duplicate = false AND id IN (
                 SELECT id FROM (
                     SELECT id, ROW_NUMBER() OVER(
                         PARTITION BY LOWER(TRIM(email)), company_id
@@ -43,6 +86,7 @@ class DedupService:
 
         c_res = await db.execute(company_sql)
         ct_res = await db.execute(contact_sql)
+        mark_written(db, "companies", "contacts")
 
         await AuditService.log_event(db, None, "dedup_job", "system", None, {
             "companies_flagged": c_res.rowcount,
@@ -0,0 +1,85 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc
+from uuid import UUID
+from fastapi import HTTPException
+from fastapi.responses import Response
+from typing import Optional, Tuple
+import os
+
+from ..config import settings
+from ..models.export import ExportJob
+from ..jobs.worker_pool import export_pool
+from ..jobs.export_job import run_export_job
+from ..utils.file_range import ranged_file_response
+from .export_service import EXPORT_ENTITIES, EXPORT_FORMATS, ExportService, artifact_path, dump_filters
+
+class ExportJobService:
+    @staticmethod
+    async def request_export(
+        db: AsyncSession,
+        entity_type: str,
+        requested_by: UUID,
+        columns: Optional[str] = None,
+        fmt: str = "csv.gz",
+        **filters
+    ) -> Tuple[ExportJob, bool]:
+        """Queues a background export, unless a job for the same format, columns,
+        filters and data watermark is already queued, running or has its
+        artifact on disk; that job is returned instead. The flag tells whether
+        the job is new.
+        """
+        _, names = ExportService.query(entity_type, columns, filters)
+        params = {"format": fmt, "columns": names, "filters": dump_filters(filters)}
+        watermark = await ExportService.watermark(db, entity_type, filters)
+        cache_key = ExportService.cache_key(entity_type, params, watermark)
+
+        stmt = select(ExportJob).where(
+            ExportJob.cache_key == cache_key,
+            ExportJob.status.in_(["pending", "running", "completed"])
+        ).order_by(desc(ExportJob.created_at)).limit(1)
+        existing = (await db.execute(stmt)).scalar_one_or_none()
+        if existing and (existing.status != "completed" or os.path.exists(artifact_path(existing.file_name))):
+            return existing, False
+
+        job = ExportJob(
+            entity_type=entity_type,
+            params=params,
+            watermark=watermark,
+            cache_key=cache_key,
+            status="pending",
+            row_count=0,
+            requested_by=requested_by
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        export_pool.submit(run_export_job, job.id)
+        return job, True
+
+    @staticmethod
+    async def get_job(db: AsyncSession, entity_type: str, job_id: UUID) -> ExportJob:
+        job = await db.get(ExportJob, job_id, populate_existing=True)
+        if not job or job.entity_type != entity_type:
+            raise HTTPException(404, "Export job not found")
+        return job
+
+    @staticmethod
+    async def download(db: AsyncSession, entity_type: str, job_id: UUID, range_header: Optional[str] = None) -> Response:
+        """The artifact of a completed job. With EXPORT_ACCEL_REDIRECT_PREFIX set,
+        nginx sends the file (with Range support) from its internal location;
+        otherwise it is sent from here, honouring a single-range Range header."""
+        job = await ExportJobService.get_job(db, entity_type, job_id)
+        if job.status != "completed":
+            raise HTTPException(409, f"Export job is {job.status}")
+        path = artifact_path(job.file_name)
+        if not os.path.exists(path):
+            raise HTTPException(410, "Export artifact has expired")
+
+        media_type, extension = EXPORT_FORMATS[job.params.get("format", "csv.gz")]
+        download_name = f"{EXPORT_ENTITIES[entity_type][3]}_export.{extension}"
+        headers = {"Content-Disposition": f"attachment; filename={download_name}", "ETag": f'"{job.cache_key}"'}
+        if settings.EXPORT_ACCEL_REDIRECT_PREFIX:
+            headers["X-Accel-Redirect"] = settings.EXPORT_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + job.file_name
+            return Response(media_type=media_type, headers=headers)
+        return ranged_file_response(path, range_header, media_type, headers)
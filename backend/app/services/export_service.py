@@ -1,48 +1,247 @@
-import csv
-import io
+import hashlib
+import json
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import DateTime, func, select
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
-from typing import Any, List
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
+from ..config import settings
 from ..models.company import Company
 from ..models.contact import Contact
+from ..utils.columnar import arrow_schema, stream_columnar
+from ..utils.csv_export import accepts_gzip, stream_csv, stream_gzip
+from ..utils.pagination import decode_cursor, encode_cursor
+from .company_service import CompanyService
+from .contact_service import ContactService
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_FETCH_ROWS = 1000
+
+# Internal bookkeeping columns that are never exported
+HIDDEN_COLUMNS = {"dedup_key"}
+
+DEFAULT_COMPANY_COLUMNS = ["id", "name", "website", "status", "industry", "created_at"]
+DEFAULT_CONTACT_COLUMNS = ["id", "first_name", "last_name", "email", "status", "created_at"]
+
+# Columns every delta export carries, so a sync can apply updates, deactivations
+# and rows later flagged as duplicates
+DELTA_COLUMNS = ["updated_at", "is_active", "is_duplicate"]
+
+# entity type -> (model, list filters, default columns, file name stem)
+EXPORT_ENTITIES = {
+    "company": (Company, CompanyService.apply_filters, DEFAULT_COMPANY_COLUMNS, "companies"),
+    "contact": (Contact, ContactService.apply_filters, DEFAULT_CONTACT_COLUMNS, "contacts"),
+}
+
+# format -> (media type, file extension); csv.gz is CSV as a gzip file
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+# Filters holding ids, converted back from their JSON form by `load_filters`
+UUID_FILTERS = {"segment_id", "company_id", "assigned_sdr_id", "created_by"}
+
+def column_header(name: str) -> str:
+    """CSV header of an exported column: "segment_id" -> "Segment ID"."""
+    return " ".join(word.upper() if word in ("id", "url") else word.capitalize() for word in name.split("_"))
+
+def exportable_columns(model) -> Dict[str, object]:
+    return {c.key: c for c in model.__table__.columns if c.key not in HIDDEN_COLUMNS}
+
+def artifact_path(name: str) -> str:
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    return os.path.join(settings.EXPORT_DIR, name)
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def dump_filters(filters: dict) -> dict:
+    """JSON form of a filter set, without the unset filters."""
+    return jsonable_encoder({k: v for k, v in filters.items() if v is not None})
+
+def load_filters(filters: dict) -> dict:
+    return {k: UUID(v) if k in UUID_FILTERS else v for k, v in filters.items()}
+
+async def _export_rows(result, datetime_positions: List[int]) -> AsyncIterator[tuple]:
+    """CSV rows with datetimes rendered as ISO 8601."""
+    async for row in result:
+        if datetime_positions:
+            row = list(row)
+            for i in datetime_positions:
+                row[i] = row[i].isoformat() if row[i] else ""
+        yield row
 
 class ExportService:
     @staticmethod
-    async def export_companies(db: AsyncSession) -> StreamingResponse:
-        stmt = select(Company)
-        result = await db.execute(stmt)
-        companies = result.scalars().all()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["ID", "Name", "Website", "Status", "Industry", "Created At"])
-        for c in companies:
-            writer.writerow([str(c.id), c.name, c.website, c.status, c.industry, c.created_at.isoformat()])
-
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=companies_export.csv"}
-        )
-
-    @staticmethod
-    async def export_contacts(db: AsyncSession) -> StreamingResponse:
-        stmt = select(Contact)
-        result = await db.execute(stmt)
-        contacts = result.scalars().all()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["ID", "First Name", "Last Name", "Email", "Status", "Created At"])
-        for c in contacts:
-            writer.writerow([str(c.id), c.first_name, c.last_name, c.email, c.status, c.created_at.isoformat()])
-
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=contacts_export.csv"}
-        )
+    def query(entity_type: str, columns: Optional[str], filters: dict, delta: bool = False) -> Tuple[object, List[str]]:
+        """SELECT of the requested columns only, in the requested order, with the
+        list filters applied; `columns` is a comma-separated list of column names.
+
+        A `delta` query also matches deactivated and duplicate records, always
+        carries the DELTA_COLUMNS and is ordered by (updated_at, id); see
+        `delta_window`.
+        """
+        model, apply_filters, default, _ = EXPORT_ENTITIES[entity_type]
+        available = exportable_columns(model)
+        names = [c.strip() for c in columns.split(",") if c.strip()] if columns else list(default)
+        unknown = [name for name in names if name not in available]
+        if unknown or not names:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown export columns: {', '.join(unknown)}. Available: {', '.join(available)}"
+            )
+        if delta:
+            names += [name for name in DELTA_COLUMNS if name not in names]
+            filters = {**filters, "is_active": None, "is_duplicate": None}
+        stmt = apply_filters(select(*(available[name] for name in names)), **filters)
+        if delta:
+            stmt = stmt.order_by(model.updated_at, model.id)
+        return stmt, names
+
+    @staticmethod
+    async def delta_window(
+        db: AsyncSession,
+        entity_type: str,
+        stmt,
+        since: Optional[datetime] = None,
+        sync_token: Optional[str] = None
+    ) -> Tuple[object, str]:
+        """Limits a delta query to rows changed after `since`, or after the time
+        in a `sync_token`, and returns the sync token for the next export.
+
+        Rows stamped in the last EXPORT_SYNC_LAG_SECONDS are left for the next
+        export: updated_at is the start time of the writing transaction, so a
+        row can become visible after later-stamped ones were already exported.
+        """
+        model = EXPORT_ENTITIES[entity_type][0]
+        if sync_token:
+            [since] = decode_cursor(sync_token, datetime.fromisoformat)
+        since = _utc(since)
+        now = (await db.execute(select(func.now()))).scalar_one()
+        until = max(_utc(now) - timedelta(seconds=settings.EXPORT_SYNC_LAG_SECONDS), since)
+        stmt = stmt.where(model.updated_at > since, model.updated_at <= until)
+        return stmt, encode_cursor(until)
+
+    @staticmethod
+    async def watermark(db: AsyncSession, entity_type: str, filters: dict) -> str:
+        """Changes whenever a row matching `filters` is added, updated or removed:
+        the matching row count and their latest updated_at."""
+        model, apply_filters, _, _ = EXPORT_ENTITIES[entity_type]
+        stmt = apply_filters(select(func.count(), func.max(model.updated_at)).select_from(model), **filters)
+        count, latest = (await db.execute(stmt)).one()
+        return f"{count}:{latest.isoformat() if latest else ''}"
+
+    @staticmethod
+    def cache_key(entity_type: str, params: dict, watermark: str) -> str:
+        raw = json.dumps({"entity": entity_type, "params": params, "watermark": watermark}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def _result(db: AsyncSession, stmt):
+        # Server-side cursor: rows are fetched while they are being written out,
+        # so memory stays at one fetch plus one chunk whatever the table size
+        return await db.stream(stmt.execution_options(yield_per=EXPORT_FETCH_ROWS))
+
+    @staticmethod
+    def encode(stmt, names: List[str], fmt: str, rows: AsyncIterator) -> AsyncIterator:
+        """Chunks of the export of `rows` (selected by `stmt`) in one of EXPORT_FORMATS."""
+        if fmt in ("parquet", "arrow"):
+            return stream_columnar(fmt, arrow_schema(names, stmt.selected_columns), rows)
+        datetime_positions = [
+            i for i, column in enumerate(stmt.selected_columns) if isinstance(column.type, DateTime)
+        ]
+        chunks = stream_csv([column_header(name) for name in names], _export_rows(rows, datetime_positions))
+        return stream_gzip(chunks) if fmt == "csv.gz" else chunks
+
+    @staticmethod
+    async def write_artifact(db: AsyncSession, stmt, names: List[str], path: str, fmt: str = "csv.gz") -> int:
+        """Writes the export to `path` and returns the number of rows. The file
+        only appears at `path` once it is complete; until then each call writes
+        its own temp file, so jobs sharing an artifact name do not collide."""
+        count = 0
+        async def counted(rows):
+            nonlocal count
+            async for row in rows:
+                count += 1
+                yield row
+
+        partial = f"{path}.{uuid4().hex}.part"
+        out = open(partial, "wb")
+        try:
+            rows = counted(await ExportService._result(db, stmt))
+            async for chunk in ExportService.encode(stmt, names, fmt, rows):
+                await run_in_threadpool(out.write, chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            out.close()
+            os.replace(partial, path)
+        except BaseException:
+            out.close()
+            os.remove(partial)
+            raise
+        return count
+
+    @staticmethod
+    async def _stream(
+        db: AsyncSession,
+        entity_type: str,
+        columns: Optional[str],
+        filters: dict,
+        fmt: str = "csv",
+        accept_encoding: Optional[str] = None,
+        since: Optional[datetime] = None,
+        sync_token: Optional[str] = None
+    ) -> StreamingResponse:
+        """Streams the export in `fmt`. Plain CSV is gzip-encoded on the wire
+        when the client accepts it.
+
+        With `since` or `sync_token` only the rows changed since then are sent,
+        and the X-Sync-Token header carries the token for the next delta.
+        """
+        delta = since is not None or sync_token is not None
+        stmt, names = ExportService.query(entity_type, columns, filters, delta)
+        media_type, extension = EXPORT_FORMATS[fmt]
+        headers = {"Content-Disposition": f"attachment; filename={EXPORT_ENTITIES[entity_type][3]}_export.{extension}"}
+        if delta:
+            stmt, headers["X-Sync-Token"] = await ExportService.delta_window(db, entity_type, stmt, since, sync_token)
+        if fmt == "csv":
+            headers["Vary"] = "Accept-Encoding"
+            if accepts_gzip(accept_encoding):
+                headers["Content-Encoding"] = "gzip"
+                fmt = "csv.gz"
+
+        rows = await ExportService._result(db, stmt)
+        return StreamingResponse(ExportService.encode(stmt, names, fmt, rows), media_type=media_type, headers=headers)
+
+    @staticmethod
+    async def export_companies(
+        db: AsyncSession,
+        columns: Optional[str] = None,
+        fmt: str = "csv",
+        accept_encoding: Optional[str] = None,
+        since: Optional[datetime] = None,
+        sync_token: Optional[str] = None,
+        **filters
+    ) -> StreamingResponse:
+        """Companies matching the `CompanyService.list_companies` filters."""
+        return await ExportService._stream(db, "company", columns, filters, fmt, accept_encoding, since, sync_token)
+
+    @staticmethod
+    async def export_contacts(
+        db: AsyncSession,
+        columns: Optional[str] = None,
+        fmt: str = "csv",
+        accept_encoding: Optional[str] = None,
+        since: Optional[datetime] = None,
+        sync_token: Optional[str] = None,
+        **filters
+    ) -> StreamingResponse:
+        """Contacts matching the `ContactService.list_contacts` filters."""
+        return await ExportService._stream(db, "contact", columns, filters, fmt, accept_encoding, since, sync_token)
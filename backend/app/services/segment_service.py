@@ -1,12 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from fastapi import HTTPException, status
 
 from ..models.segment import Segment, Offering
 from ..schemas.segment import SegmentCreate, SegmentUpdate, OfferingCreate
 from .audit_service import AuditService
+from ..utils.counts import list_total
 
 class SegmentService:
     @staticmethod
@@ -139,9 +141,13 @@ class SegmentService:
         status: Optional[str] = "active",
         search: Optional[str] = None,
         limit: int = 20,
-        cursor: Optional[UUID] = None
-    ) -> List[Segment]:
-        from ..utils.pagination import apply_cursor_pagination
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> dict:
+        """Newest first; keyset page over (created_at, id). With `include_total`
+        the page carries the total of matching segments (see `list_total`)."""
+        from ..utils.pagination import apply_keyset_pagination, keyset_page
+        from sqlalchemy.orm import selectinload
 
         stmt = select(Segment)
 
@@ -154,9 +160,16 @@ class SegmentService:
                 Segment.description.ilike(f"%{search}%")
             ))
 
-        stmt = apply_cursor_pagination(stmt, Segment.id, limit, cursor)
-        result = await db.execute(stmt)
-        return result.scalars().all()
+        page_stmt = apply_keyset_pagination(
+            stmt.options(selectinload(Segment.offerings)),
+            (Segment.created_at, Segment.id), (datetime.fromisoformat, UUID), limit, cursor, descending=True
+        )
+        result = await db.execute(page_stmt)
+        page = keyset_page(result.scalars().all(), limit, lambda s: (s.created_at, s.id))
+        if include_total:
+            filters = {"status": status, "search": search}
+            page["total"], page["total_estimated"] = await list_total(db, Segment.__tablename__, stmt, filters)
+        return page
 
     @staticmethod
     async def get_segment(db: AsyncSession, segment_id: UUID) -> Segment:
@@ -0,0 +1,222 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from fastapi import HTTPException, UploadFile
+from typing import Dict, List
+
+from ..models.upload import UploadBatch, UploadError
+from ..models.company import Company
+from ..models.contact import Contact
+from ..utils.counts import mark_written
+from ..utils.csv_validators import get_validation_plan
+from ..utils.dedup import dedup_key_sql
+from ..utils.validation_plan import ValidationPlan
+from .audit_service import AuditService
+from .csv_service import CSVService
+
+# Rows sent to the staging table per COPY
+STAGING_COPY_ROWS = 10000
+
+class SQLImportService:
+    """Staging-table import engine for PostgreSQL.
+
+    Raw rows are COPYed into a temporary per-batch table. Resolution against
+    segments/companies and the column checks then run as one set-based
+    statement, and the writes to the entity table and upload_errors as one
+    INSERT ... SELECT each. The rules come from the same entity schemas as the
+    Python engine.
+    """
+    @staticmethod
+    def check_available(db: AsyncSession):
+        if db.bind.dialect.name != "postgresql":
+            raise HTTPException(status_code=422, detail="The sql import engine requires PostgreSQL")
+
+    @staticmethod
+    async def process_batch(db: AsyncSession, batch: UploadBatch, file: UploadFile, progress=None) -> UploadBatch:
+        """Same contract as `CSVService.process_batch`."""
+        stream = CSVService.row_stream(file)
+        rows = stream.__aiter__()
+        keys = CSVService._header_keys(await anext(rows, None), batch.entity_type)
+        plan = get_validation_plan(batch.entity_type, tuple(keys))
+        staging = f"import_{batch.id.hex}"
+        width = len(keys)
+        # (order, index, normalize) of the columns normalized in Python, copied as n{order}
+        normalized = SQLImportService._python_normalized(plan)
+
+        await db.execute(text(
+            f"CREATE TEMPORARY TABLE {staging}_raw (row_number integer, "
+            + ", ".join([f"c{i} text" for i in range(width)] + [f"n{order} text" for order, _, _ in normalized])
+            + ") ON COMMIT DROP"
+        ))
+
+        conn = await db.connection()
+        raw = (await conn.get_raw_connection()).driver_connection
+        columns = ["row_number"] + [f"c{i}" for i in range(width)] + [f"n{order}" for order, _, _ in normalized]
+        records = []
+        row_num = 1
+        async for row in rows:
+            row_num += 1
+            values = [v.strip() for v in row[:width]]
+            values += [None] * (width - len(values))
+            for _, index, normalize in normalized:
+                values.append(normalize(values[index]) if values[index] else None)
+            records.append((row_num, *values))
+            if len(records) >= STAGING_COPY_ROWS:
+                await raw.copy_records_to_table(f"{staging}_raw", records=records, columns=columns)
+                batch.total_rows += len(records)
+                records = []
+                if progress:
+                    progress.update(batch, stream.bytes_read)
+        if records:
+            await raw.copy_records_to_table(f"{staging}_raw", records=records, columns=columns)
+            batch.total_rows += len(records)
+
+        await SQLImportService._resolve_and_flag(db, plan, staging)
+
+        counts = await db.execute(text(f"SELECT count(*) FILTER (WHERE NOT invalid), count(*) FILTER (WHERE invalid) FROM {staging}"))
+        batch.valid_rows, batch.invalid_rows = counts.one()
+        reason = CSVService._abort_reason(batch)
+        if reason:
+            raise HTTPException(status_code=422, detail=reason)
+
+        await SQLImportService._insert_errors(db, plan, staging, batch)
+        await SQLImportService._insert_valid(db, plan, staging, batch)
+
+        batch.file_size_bytes = stream.bytes_read
+        batch.status = "completed"
+        await AuditService.log_event(db, batch.uploader_id, "upload", batch.entity_type, batch.id, {
+            "valid": batch.valid_rows, "invalid": batch.invalid_rows, "duplicates": batch.duplicate_rows, "engine": "sql"
+        })
+        await db.commit()
+
+        return batch
+
+    @staticmethod
+    def _python_normalized(plan: ValidationPlan) -> List[tuple]:
+        return [
+            (order, index, column.normalize)
+            for order, (column, index) in enumerate(zip(plan.schema.columns, plan.indices))
+            if column.field and column.normalize and not column.sql_normalize and index is not None
+        ]
+
+    @staticmethod
+    def _value(plan: ValidationPlan, position: int) -> str:
+        index = plan.indices[position]
+        return "NULL::text" if index is None else f"s.c{index}"
+
+    @staticmethod
+    def _failures(plan: ValidationPlan) -> List[tuple]:
+        """(order, column, message SQL, value SQL, failed predicate) for every rule,
+        in the same order as `ValidationPlan.validate` reports them."""
+        schema = plan.schema
+        failures = []
+        for order, column in enumerate(schema.columns):
+            value = SQLImportService._value(plan, order)
+            if column.required:
+                failures.append((order, column.header, f":m{order}r", "''", f"coalesce({value}, '') = ''"))
+            if column.sql_check:
+                check = column.sql_check.replace("{value}", value)
+                failures.append((order, column.header, f":m{order}c", value, f"{value} <> '' AND NOT ({check})"))
+
+        ref = SQLImportService._value(plan, schema.columns.index(schema.reference))
+        first_field = schema.reference_fields[0]
+        failures.append((
+            len(schema.columns), schema.reference.header, f":ref_prefix || {ref} || :ref_suffix", ref,
+            f"{ref} <> '' AND s.{first_field} IS NULL"
+        ))
+        return failures
+
+    @staticmethod
+    def _messages(plan: ValidationPlan) -> Dict:
+        params = {}
+        for order, column in enumerate(plan.schema.columns):
+            params[f"m{order}r"] = "Required"
+            params[f"m{order}c"] = column.message
+        params["ref_prefix"], params["ref_suffix"] = plan.schema.reference_message.split("{}")
+        return params
+
+    @staticmethod
+    async def _resolve_and_flag(db: AsyncSession, plan: ValidationPlan, staging: str):
+        """Builds the staging table from the raw copy in one pass: reference ids
+        joined in and every row flagged valid or invalid."""
+        schema = plan.schema
+        ref = SQLImportService._value(plan, schema.columns.index(schema.reference)).replace("s.", "raw.")
+        ref_fields = ", ".join(f"r.{field}" for field in schema.reference_fields)
+        predicates = " OR ".join(f"({f[4]})" for f in SQLImportService._failures(plan))
+        await db.execute(text(
+            f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT s.*, coalesce({predicates}, false) AS invalid FROM ("
+            f"SELECT raw.*, {ref_fields} FROM {staging}_raw raw LEFT JOIN ({schema.reference_sql}) r ON r.name = {ref}"
+            ") s"
+        ))
+        await db.execute(text(f"DROP TABLE {staging}_raw"))
+
+    @staticmethod
+    async def _insert_errors(db: AsyncSession, plan: ValidationPlan, staging: str, batch: UploadBatch):
+        rules = ",\n".join(
+            f"({order}, :h{i}, {message}, {value}, {failed})"
+            for i, (order, _, message, value, failed) in enumerate(SQLImportService._failures(plan))
+        )
+        params = SQLImportService._messages(plan)
+        params.update({f"h{i}": f[1] for i, f in enumerate(SQLImportService._failures(plan))})
+
+        # row_data as the Python engine stores it: non-empty headers, last one wins
+        named = [(k, i) for i, k in enumerate(plan.keys) if k]
+        params["row_keys"] = [k for k, _ in named]
+        row_values = ", ".join(f"s.c{i}" for _, i in named)
+        params["batch_id"] = batch.id
+
+        await db.execute(text(
+            f"INSERT INTO {UploadError.__tablename__} "
+            "(id, batch_id, row_number, column_name, error_message, value, is_corrected, row_data) "
+            "SELECT gen_random_uuid(), CAST(:batch_id AS uuid), s.row_number, e.column_name, e.error_message, e.value, false, "
+            f"jsonb_strip_nulls(jsonb_object(CAST(:row_keys AS text[]), ARRAY[{row_values}])) "
+            f"FROM {staging} s CROSS JOIN LATERAL (VALUES {rules}) AS e(ord, column_name, error_message, value, failed) "
+            "WHERE s.invalid AND e.failed ORDER BY s.row_number, e.ord"
+        ), params)
+
+    @staticmethod
+    async def _insert_valid(db: AsyncSession, plan: ValidationPlan, staging: str, batch: UploadBatch):
+        schema = plan.schema
+        fields = []
+        values = []
+        for order, column in enumerate(schema.columns):
+            if not column.field:
+                continue
+            value = SQLImportService._value(plan, order)
+            if column.sql_normalize:
+                normalized = column.sql_normalize.replace("{value}", value)
+                value = f"CASE WHEN coalesce({value}, '') = '' THEN NULL ELSE {normalized} END"
+            elif column.normalize and plan.indices[order] is not None:
+                value = f"s.n{order}"
+            fields.append(column.field)
+            values.append(value)
+
+        fields.extend(schema.reference_fields)
+        values.extend(f"s.{field}" for field in schema.reference_fields)
+
+        params = {"created_by": batch.uploader_id, "batch_id": batch.id}
+        for name, default in schema.defaults.items():
+            fields.append(name)
+            values.append(f"CAST(:d_{name} AS {'boolean' if isinstance(default, bool) else 'text'})")
+            params[f"d_{name}"] = default
+
+        # Duplicates of active records, or of an earlier row of the file, are
+        # flagged as the Python engine does
+        table = Company.__tablename__ if batch.entity_type == "company" else Contact.__tablename__
+        key = dedup_key_sql(*(f"v.{field}" for field in schema.dedup_fields))
+        selected = ", ".join(f"{value} AS {field}" for field, value in zip(fields, values))
+        await db.execute(text(
+            f"INSERT INTO {table} (id, {', '.join(fields)}, created_by, batch_id, dedup_key, is_duplicate) "
+            f"SELECT gen_random_uuid(), {', '.join(f'v.{field}' for field in fields)}, "
+            "CAST(:created_by AS uuid), CAST(:batch_id AS uuid), k.dedup_key, "
+            "row_number() OVER (PARTITION BY k.dedup_key ORDER BY v.row_number) > 1 "
+            f"OR EXISTS (SELECT 1 FROM {table} t WHERE t.dedup_key = k.dedup_key AND t.is_active) "
+            f"FROM (SELECT s.row_number, {selected} FROM {staging} s WHERE NOT s.invalid) v "
+            f"CROSS JOIN LATERAL (SELECT {key} AS dedup_key) k"
+        ), params)
+        mark_written(db, table)
+        result = await db.execute(
+            text(f"SELECT count(*) FROM {table} WHERE batch_id = CAST(:batch_id AS uuid) AND is_duplicate"),
+            {"batch_id": batch.id}
+        )
+        batch.duplicate_rows = result.scalar_one()
@@ -0,0 +1,417 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from uuid import UUID, uuid4
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+import os
+
+from ..config import settings
+from ..models.upload import UploadBatch, UploadError, UploadGroup, UploadSession
+from ..jobs.worker_pool import import_pool
+from ..jobs.import_job import run_import_group, run_import_job, get_progress
+from ..schemas.upload import BatchResponse, BatchProgress, CorrectionRequest, UploadSessionCreate
+from ..utils.csv_export import stream_csv
+from ..utils.pagination import apply_keyset_pagination, keyset_page
+from ..utils.upload_spool import file_digest, spool_path, spool_upload, unpack_archive
+from .csv_service import CSVService
+from .sql_import_service import SQLImportService
+
+class UploadService:
+    @staticmethod
+    async def accept_upload(
+        file: UploadFile,
+        entity_type: str,
+        uploader_id: UUID,
+        db: AsyncSession,
+        engine: str = "python",
+        idempotency_key: Optional[str] = None
+    ) -> UploadBatch:
+        """Spools the upload to the temp volume, checks its header and queues the
+        import with the given engine. The batch is returned in the "processing" state.
+
+        A repeated `idempotency_key`, or the same content uploaded again by the
+        same user within UPLOAD_DEDUP_WINDOW_MINUTES, returns the earlier batch
+        instead of importing again. A key reused for other content is rejected.
+        """
+        if engine == "sql":
+            SQLImportService.check_available(db)
+        keyed = None
+        if idempotency_key:
+            keyed = await UploadService._find_by_idempotency_key(db, uploader_id, idempotency_key)
+            if keyed and keyed.entity_type != entity_type:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for another upload")
+
+        batch = CSVService.new_batch(entity_type, file.filename, uploader_id)
+        batch.idempotency_key = idempotency_key
+        path = spool_path(f"{batch.id}.upload")
+        batch.file_size_bytes, batch.content_hash = await spool_upload(file, path, settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024)
+
+        existing = keyed or await UploadService._find_recent_duplicate(db, batch)
+        if existing:
+            os.remove(path)
+            return UploadService._check_same_upload(existing, batch)
+
+        try:
+            return await UploadService._queue_import(db, batch, path, engine)
+        except IntegrityError:
+            await db.rollback()
+            os.remove(path)
+            # The same key was committed by a concurrent request
+            existing = await UploadService._find_by_idempotency_key(db, uploader_id, idempotency_key) if idempotency_key else None
+            if not existing:
+                raise
+            return UploadService._check_same_upload(existing, batch)
+
+    @staticmethod
+    def _check_same_upload(existing: UploadBatch, batch: UploadBatch) -> UploadBatch:
+        """`existing`, if it imports the same entity type and content as `batch`."""
+        if existing.entity_type != batch.entity_type or existing.content_hash != batch.content_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for another upload")
+        return existing
+
+    @staticmethod
+    async def _find_by_idempotency_key(db: AsyncSession, uploader_id: UUID, key: str) -> Optional[UploadBatch]:
+        stmt = select(UploadBatch).where(
+            UploadBatch.uploader_id == uploader_id,
+            UploadBatch.idempotency_key == key
+        ).options(selectinload(UploadBatch.uploader))
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def _find_recent_duplicate(db: AsyncSession, batch: UploadBatch) -> Optional[UploadBatch]:
+        """Latest batch of the same user, entity type and content hash inside the
+        dedup window that has not failed."""
+        if settings.UPLOAD_DEDUP_WINDOW_MINUTES <= 0:
+            return None
+        since = datetime.now(timezone.utc) - timedelta(minutes=settings.UPLOAD_DEDUP_WINDOW_MINUTES)
+        stmt = select(UploadBatch).where(
+            UploadBatch.uploader_id == batch.uploader_id,
+            UploadBatch.entity_type == batch.entity_type,
+            UploadBatch.content_hash == batch.content_hash,
+            UploadBatch.status != "failed",
+            UploadBatch.created_at >= since
+        ).order_by(desc(UploadBatch.created_at)).limit(1).options(selectinload(UploadBatch.uploader))
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def _queue_import(db: AsyncSession, batch: UploadBatch, path: str, engine: str = "python") -> UploadBatch:
+        try:
+            await UploadService._check_headers(batch, path)
+        except HTTPException:
+            os.remove(path)
+            raise
+
+        db.add(batch)
+        await db.commit()
+        await db.refresh(batch, ["uploader"])
+
+        import_pool.submit(run_import_job, batch.id, path, engine)
+        return batch
+
+    @staticmethod
+    async def _check_headers(batch: UploadBatch, path: str):
+        with open(path, "rb") as fh:
+            await CSVService.check_headers(UploadFile(fh, filename=batch.file_name), batch.entity_type)
+
+    @staticmethod
+    async def accept_group(files: List[UploadFile], entity_type: str, uploader_id: UUID, db: AsyncSession, engine: str = "python") -> dict:
+        """Spools several uploads, or the files of a single zip, as the batches of
+        a new upload group and queues them as one group import.
+
+        Every file's header is checked before anything is queued; one bad file
+        rejects the whole request.
+        """
+        if engine == "sql":
+            SQLImportService.check_available(db)
+        max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+        group = UploadGroup(id=uuid4(), entity_type=entity_type, uploader_id=uploader_id, file_count=0)
+
+        spooled = [] # (file name, path, size, hash)
+        batches = []
+        try:
+            for index, file in enumerate(files):
+                path = spool_path(f"{group.id}.{index}.upload")
+                size, content_hash = await spool_upload(file, path, max_bytes)
+                spooled.append((file.filename, path, size, content_hash))
+            if len(spooled) == 1:
+                entries = await run_in_threadpool(
+                    unpack_archive,
+                    spooled[0][1],
+                    max_bytes,
+                    settings.UPLOAD_GROUP_MAX_FILES,
+                    settings.MAX_DECOMPRESSED_SIZE_MB * 1024 * 1024,
+                    settings.MAX_COMPRESSION_RATIO
+                )
+                if entries:
+                    os.remove(spooled[0][1])
+                    spooled = entries
+
+            if len(spooled) > settings.UPLOAD_GROUP_MAX_FILES:
+                raise HTTPException(status_code=422, detail=f"At most {settings.UPLOAD_GROUP_MAX_FILES} files can be uploaded together")
+
+            for file_name, path, size, content_hash in spooled:
+                batch = CSVService.new_batch(entity_type, file_name, uploader_id, size)
+                batch.content_hash = content_hash
+                batch.group_id = group.id
+                try:
+                    await UploadService._check_headers(batch, path)
+                except HTTPException as e:
+                    raise HTTPException(status_code=e.status_code, detail=f"{file_name}: {e.detail}")
+                batches.append((batch, path))
+        except BaseException:
+            for _, path, _, _ in spooled:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+
+        group.file_count = len(batches)
+        db.add(group)
+        db.add_all(batch for batch, _ in batches)
+        await db.commit()
+
+        import_pool.submit(run_import_group, [(batch.id, path) for batch, path in batches], engine)
+        return await UploadService.get_group(db, group.id)
+
+    @staticmethod
+    async def get_group(db: AsyncSession, group_id: UUID) -> dict:
+        """The group's batches with live progress, plus their aggregate counters.
+
+        The group is "processing" while any file is, "failed" if every file
+        failed and "completed" otherwise.
+        """
+        stmt = select(UploadGroup).where(UploadGroup.id == group_id).options(
+            selectinload(UploadGroup.batches).selectinload(UploadBatch.uploader)
+        ).execution_options(populate_existing=True)
+        result = await db.execute(stmt)
+        group = result.scalar_one_or_none()
+        if not group:
+            raise HTTPException(404, "Upload group not found")
+
+        batches = [UploadService._batch_response(batch) for batch in group.batches]
+        statuses = [b.status for b in batches]
+        if "processing" in statuses:
+            status = "processing"
+        elif statuses and all(s == "failed" for s in statuses):
+            status = "failed"
+        else:
+            status = "completed"
+
+        progress = None
+        if status == "processing":
+            running = [b.progress for b in batches if b.progress]
+            bytes_total = sum(b.progress.bytes_total if b.progress else b.file_size_bytes for b in batches)
+            bytes_processed = sum(
+                b.progress.bytes_processed if b.progress else (0 if b.status == "processing" else b.file_size_bytes)
+                for b in batches
+            )
+            byte_rate = sum(p.bytes_processed / p.elapsed_seconds for p in running if p.elapsed_seconds)
+            progress = BatchProgress(
+                bytes_processed=bytes_processed,
+                bytes_total=bytes_total,
+                elapsed_seconds=max((p.elapsed_seconds for p in running), default=0.0),
+                rows_per_second=round(sum(p.rows_per_second for p in running), 1),
+                eta_seconds=round(max(bytes_total - bytes_processed, 0) / byte_rate, 1) if byte_rate else None
+            )
+
+        return {
+            "id": group.id,
+            "entity_type": group.entity_type,
+            "file_count": group.file_count,
+            "status": status,
+            "completed_files": statuses.count("completed"),
+            "failed_files": statuses.count("failed"),
+            "total_rows": sum(b.total_rows for b in batches),
+            "valid_rows": sum(b.valid_rows for b in batches),
+            "invalid_rows": sum(b.invalid_rows for b in batches),
+            "duplicate_rows": sum(b.duplicate_rows for b in batches),
+            "progress": progress,
+            "batches": batches,
+            "created_at": group.created_at
+        }
+
+    @staticmethod
+    async def get_batch(db: AsyncSession, batch_id: UUID) -> BatchResponse:
+        stmt = select(UploadBatch).where(UploadBatch.id == batch_id).options(selectinload(UploadBatch.uploader))
+        result = await db.execute(stmt)
+        batch = result.scalar_one_or_none()
+        if not batch:
+            raise HTTPException(404, "Batch not found")
+        return UploadService._batch_response(batch)
+
+    @staticmethod
+    def _batch_response(batch: UploadBatch) -> BatchResponse:
+        """The batch with live counters and progress while its import runs here."""
+        response = BatchResponse.model_validate(batch)
+        progress = get_progress(batch.id) if batch.status == "processing" else None
+        if progress:
+            snapshot = progress.snapshot()
+            response.total_rows = snapshot.pop("total_rows")
+            response.valid_rows = snapshot.pop("valid_rows")
+            response.invalid_rows = snapshot.pop("invalid_rows")
+            response.progress = BatchProgress(**snapshot)
+        return response
+
+    @staticmethod
+    async def list_errors(
+        db: AsyncSession,
+        batch_id: UUID,
+        column_name: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """Keyset page over (row_number, id); `next_cursor` is None on the last page."""
+        stmt = select(UploadError).where(UploadError.batch_id == batch_id)
+        if column_name:
+            stmt = stmt.where(UploadError.column_name == column_name)
+        stmt = apply_keyset_pagination(stmt, (UploadError.row_number, UploadError.id), (int, UUID), limit, cursor)
+        result = await db.execute(stmt)
+        return keyset_page(result.scalars().all(), limit, lambda e: (e.row_number, e.id))
+
+    @staticmethod
+    async def export_errors(db: AsyncSession, batch_id: UUID, column_name: Optional[str] = None) -> StreamingResponse:
+        batch = await db.get(UploadBatch, batch_id)
+        if not batch:
+            raise HTTPException(404, "Batch not found")
+
+        stmt = select(
+            UploadError.row_number, UploadError.column_name, UploadError.value, UploadError.error_message
+        ).where(UploadError.batch_id == batch_id)
+        if column_name:
+            stmt = stmt.where(UploadError.column_name == column_name)
+        stmt = stmt.order_by(UploadError.row_number, UploadError.id).execution_options(yield_per=1000)
+
+        # Server-side cursor: rows are fetched while the response is being sent
+        result = await db.stream(stmt)
+        return StreamingResponse(
+            stream_csv(["Row", "Column", "Value", "Error"], result),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=batch_{batch_id}_errors.csv"}
+        )
+
+    @staticmethod
+    async def correct_rows(db: AsyncSession, batch_id: UUID, uploader_id: UUID, data: CorrectionRequest) -> dict:
+        stmt = select(UploadBatch).where(UploadBatch.id == batch_id, UploadBatch.uploader_id == uploader_id)
+        result = await db.execute(stmt)
+        batch = result.scalar_one_or_none()
+        if not batch:
+            raise HTTPException(404, "Batch not found")
+
+        corrections = {row.row_number: row.values for row in data.rows}
+        corrected, errors = await CSVService.apply_corrections(db, batch, corrections)
+        await db.refresh(batch, ["uploader"])
+        return {
+            "batch": batch,
+            "corrected_rows": corrected,
+            "errors": [dict(e, is_corrected=False) for e in errors]
+        }
+
+    @staticmethod
+    async def create_session(db: AsyncSession, data: UploadSessionCreate, entity_type: str, uploader_id: UUID) -> UploadSession:
+        if data.total_size > settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+            raise HTTPException(status_code=422, detail=f"File size exceeds {settings.MAX_UPLOAD_SIZE_MB}MB limit")
+
+        session = UploadSession(
+            entity_type=entity_type,
+            file_name=data.file_name,
+            total_size=data.total_size,
+            received_bytes=0,
+            status="open",
+            uploader_id=uploader_id,
+            expires_at=UploadService._session_expiry()
+        )
+        db.add(session)
+        await db.commit()
+        await db.refresh(session)
+        return session
+
+    @staticmethod
+    def _session_expiry() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_EXPIRY_HOURS)
+
+    @staticmethod
+    async def get_session(db: AsyncSession, session_id: UUID, uploader_id: UUID) -> UploadSession:
+        stmt = select(UploadSession).where(UploadSession.id == session_id, UploadSession.uploader_id == uploader_id)
+        result = await db.execute(stmt)
+        session = result.scalar_one_or_none()
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        # An open session past its expiry waits for run_upload_session_cleanup
+        expires_at = session.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if session.status == "expired" or (session.status == "open" and expires_at <= datetime.now(timezone.utc)):
+            raise HTTPException(status_code=410, detail="Upload session has expired")
+
+        # The spool file is the source of truth: a dropped connection can leave
+        # more bytes on disk than the last committed count.
+        path = spool_path(f"{session.id}.part")
+        if session.status == "open":
+            session.received_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+        return session
+
+    @staticmethod
+    async def write_chunk(db: AsyncSession, session_id: UUID, uploader_id: UUID, offset: int, body: AsyncIterator[bytes]) -> UploadSession:
+        """Writes one chunk at `offset`. Re-sending from an earlier offset overwrites
+        what follows it; skipping ahead of the received bytes is rejected."""
+        session = await UploadService.get_session(db, session_id, uploader_id)
+        if session.status != "open":
+            raise HTTPException(status_code=409, detail="Upload session is already finalized")
+        if offset > session.received_bytes:
+            raise HTTPException(status_code=409, detail=f"Expected offset <= {session.received_bytes}")
+
+        max_chunk = settings.UPLOAD_CHUNK_MAX_MB * 1024 * 1024
+        written = 0
+        path = spool_path(f"{session.id}.part")
+        with open(path, "r+b" if os.path.exists(path) else "wb") as out:
+            out.seek(offset)
+            out.truncate()
+            async for data in body:
+                written += len(data)
+                if written > max_chunk:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Chunk exceeds {settings.UPLOAD_CHUNK_MAX_MB}MB limit")
+                if offset + written > session.total_size:
+                    raise HTTPException(status_code=422, detail="Chunk extends past the declared file size")
+                out.write(data)
+
+        session.received_bytes = offset + written
+        session.expires_at = UploadService._session_expiry()
+        await db.commit()
+        await db.refresh(session)
+        return session
+
+    @staticmethod
+    async def finalize_session(db: AsyncSession, session_id: UUID, uploader_id: UUID, engine: str = "python") -> UploadBatch:
+        if engine == "sql":
+            SQLImportService.check_available(db)
+        session = await UploadService.get_session(db, session_id, uploader_id)
+        if session.status != "open":
+            raise HTTPException(status_code=409, detail="Upload session is already finalized")
+        if session.received_bytes != session.total_size:
+            raise HTTPException(status_code=409, detail=f"Received {session.received_bytes} of {session.total_size} bytes")
+
+        batch = CSVService.new_batch(session.entity_type, session.file_name, uploader_id, session.total_size)
+        part = spool_path(f"{session.id}.part")
+        # Checked before the move, so a rejected file stays in the open
+        # session and can be overwritten from offset 0
+        await UploadService._check_headers(batch, part)
+        path = spool_path(f"{batch.id}.upload")
+        os.replace(part, path)
+        batch.content_hash = await run_in_threadpool(file_digest, path)
+
+        session.status = "finalized"
+        existing = await UploadService._find_recent_duplicate(db, batch)
+        if existing:
+            os.remove(path)
+            session.batch_id = existing.id
+            await db.commit()
+            return existing
+
+        session.batch_id = batch.id
+        return await UploadService._queue_import(db, batch, path, engine)
@@ -0,0 +1,48 @@
+import json
+from sqlalchemy import JSON, Table
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+
+from .counts import mark_written
+
+async def bulk_insert(db: AsyncSession, table: Table, rows: List[Dict]):
+    """Writes plain row dicts straight to `table`, bypassing the ORM unit of work.
+
+    On PostgreSQL (asyncpg) the rows are sent with COPY via copy_records_to_table,
+    inside the session's current transaction; JSON values are serialized first
+    since COPY takes them as text. Other dialects get a single
+    compiled INSERT run as executemany. Every row must have the same keys, and
+    columns left out fall back to their defaults (Python-side or server).
+    """
+    if not rows:
+        return
+    mark_written(db, table.name)
+
+    conn = await db.connection()
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+        columns = list(rows[0].keys())
+        # COPY bypasses SQLAlchemy, so Python-side column defaults are filled here
+        defaults = [
+            c for c in table.columns
+            if c.name not in rows[0] and c.default is not None and (c.default.is_scalar or c.default.is_callable)
+        ]
+        if defaults:
+            rows = [
+                dict(row, **{c.name: c.default.arg if c.default.is_scalar else c.default.arg(None) for c in defaults})
+                for row in rows
+            ]
+            columns += [c.name for c in defaults]
+        json_columns = {c.name for c in table.columns if isinstance(c.type, JSON)}
+        records = [
+            tuple(json.dumps(row[c]) if c in json_columns and row[c] is not None else row[c] for c in columns)
+            for row in rows
+        ]
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name,
+            records=records,
+            columns=columns,
+        )
+        return
+
+    await conn.execute(table.insert(), rows)
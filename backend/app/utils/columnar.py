@@ -0,0 +1,91 @@
+from typing import AsyncIterator, Iterable, List
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer
+from starlette.concurrency import run_in_threadpool
+
+# Rows per Parquet row group / Arrow record batch
+COLUMNAR_BATCH_ROWS = 50000
+
+# Codec of Parquet pages and Arrow record batches; every pyarrow build reads it
+COLUMNAR_COMPRESSION = "zstd"
+
+def arrow_type(column_type) -> pa.DataType:
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, BigInteger):
+        return pa.int64()
+    if isinstance(column_type, Integer):
+        return pa.int32()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    return pa.string()
+
+def arrow_schema(names: List[str], columns: Iterable) -> pa.Schema:
+    """Arrow schema of the selected model columns; ids become strings."""
+    return pa.schema([pa.field(name, arrow_type(column.type)) for name, column in zip(names, columns)])
+
+class _ChunkSink:
+    """Write-only file object that keeps what was written until it is taken,
+    so a writer's output can be sent while the rest is still being produced."""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def stream_columnar(fmt: str, schema: pa.Schema, rows: AsyncIterator[Iterable]) -> AsyncIterator[bytes]:
+    """Renders rows as a Parquet ("parquet") or Arrow IPC file ("arrow"), one
+    row group / record batch of COLUMNAR_BATCH_ROWS rows at a time. Encoding
+    runs in a threadpool and each batch is yielded as soon as it is written."""
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=COLUMNAR_COMPRESSION)
+    else:
+        writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION))
+    # Ids arrive as UUIDs and are written as strings
+    text_positions = {i for i, field in enumerate(schema) if pa.types.is_string(field.type)}
+
+    def write(columns: List[list]):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+        )
+        writer.write_batch(batch)
+
+    columns: List[list] = [[] for _ in schema]
+    count = 0
+    async for row in rows:
+        for i, value in enumerate(row):
+            if i in text_positions and value is not None and not isinstance(value, str):
+                value = str(value)
+            columns[i].append(value)
+        count += 1
+        if count >= COLUMNAR_BATCH_ROWS:
+            await run_in_threadpool(write, columns)
+            columns, count = [[] for _ in schema], 0
+            yield sink.take()
+    if count:
+        await run_in_threadpool(write, columns)
+    await run_in_threadpool(writer.close)
+    yield sink.take()
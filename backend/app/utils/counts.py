@@ -0,0 +1,105 @@
+import json
+import time
+from itertools import chain
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from ..config import settings
+
+# session.info key of the tables written in the current transaction
+WRITTEN_TABLES = "written_tables"
+
+class CountCache:
+    """List totals per (table, filters), kept for COUNT_CACHE_TTL_SECONDS and
+    dropped when a transaction writing the table commits."""
+    def __init__(self):
+        self.entries: Dict[Tuple[str, str], Tuple[float, int, bool]] = {}
+        self.generations: Dict[str, int] = {}
+
+    def get(self, table: str, key: str) -> Optional[Tuple[int, bool]]:
+        entry = self.entries.get((table, key))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1], entry[2]
+
+    def put(self, table: str, key: str, generation: int, total: int, estimated: bool):
+        # A write committed while counting makes the count stale before it is cached
+        if self.generations.get(table, 0) == generation:
+            self.entries[(table, key)] = (time.monotonic() + settings.COUNT_CACHE_TTL_SECONDS, total, estimated)
+
+    def invalidate(self, *tables: str):
+        for table in tables:
+            self.generations[table] = self.generations.get(table, 0) + 1
+        self.entries = {k: v for k, v in self.entries.items() if k[0] not in tables}
+
+count_cache = CountCache()
+
+def mark_written(db, *tables: str):
+    """Records writes the ORM does not see (Core inserts, COPY, raw SQL), so the
+    cached totals of `tables` are dropped when the transaction commits."""
+    db.info.setdefault(WRITTEN_TABLES, set()).update(tables)
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    mark_written(session, *{type(obj).__table__.name for obj in chain(session.new, session.dirty, session.deleted)})
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_dml_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_written(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    count_cache.invalidate(*session.info.pop(WRITTEN_TABLES, ()))
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop(WRITTEN_TABLES, None)
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+async def estimate_rows(db: AsyncSession, stmt) -> Optional[int]:
+    """The planner's row estimate for `stmt` on PostgreSQL; None elsewhere."""
+    if db.bind.dialect.name != "postgresql":
+        return None
+    plan = (await db.execute(_Explain(stmt))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+async def list_total(db: AsyncSession, table: str, stmt, filters: dict) -> Tuple[int, bool]:
+    """(total, estimated) for the rows of filtered `stmt`, cached per filter set.
+
+    Filters the planner expects to match at most COUNT_EXACT_MAX_ROWS rows are
+    counted exactly; broader ones get the planner's estimate on PostgreSQL,
+    where a COUNT(*) would scan most of the table.
+    """
+    key = json.dumps(filters, sort_keys=True, default=str)
+    cached = count_cache.get(table, key)
+    if cached is not None:
+        return cached
+
+    generation = count_cache.generations.get(table, 0)
+    # Only the matching rows matter; the untyped column also keeps the EXPLAIN
+    # output away from the selected columns' result processors
+    stmt = stmt.with_only_columns(literal_column("1"), maintain_column_froms=True).order_by(None)
+    estimate = await estimate_rows(db, stmt)
+    if estimate is not None and estimate > settings.COUNT_EXACT_MAX_ROWS:
+        total, estimated = estimate, True
+    else:
+        total = (await db.execute(select(func.count()).select_from(stmt.subquery()))).scalar_one()
+        estimated = False
+    count_cache.put(table, key, generation, total, estimated)
+    return total, estimated
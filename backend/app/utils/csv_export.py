@@ -0,0 +1,38 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Iterable, List, Optional
+from starlette.concurrency import run_in_threadpool
+
+# Rows are buffered until roughly this many characters before a chunk is sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
+async def stream_csv(header: List[str], rows: AsyncIterator[Iterable]) -> AsyncIterator[str]:
+    """Renders rows as CSV text chunks while they are being fetched."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+async def stream_gzip(chunks: AsyncIterator) -> AsyncIterator[bytes]:
+    """Compresses text or byte chunks into one gzip stream as they arrive."""
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    async for chunk in chunks:
+        data = await run_in_threadpool(compressor.compress, chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip (and not with q=0)."""
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
@@ -0,0 +1,343 @@
+import codecs
+import csv
+import os
+import zipfile
+import zlib
+from collections import deque
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+from openpyxl import load_workbook
+from starlette.concurrency import run_in_threadpool
+
+READ_CHUNK_SIZE = 64 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+
+# A zip containing this entry is read as an Excel workbook
+XLSX_WORKBOOK = "xl/workbook.xml"
+
+# Sheet rows read per trip to the thread pool
+XLSX_BATCH_ROWS = 1000
+
+# The compression ratio is only checked past this much output, so small files
+# of repetitive rows are not mistaken for bombs
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+class _LineFeed:
+    """Line source for csv.reader that is refilled between reads.
+
+    Only complete records are pushed into it, so the reader never runs dry
+    in the middle of a quoted multi-line field.
+    """
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+def _ends_quoted(line: str, quoted: bool) -> bool:
+    """Whether a record is inside a quoted field at the end of `line`, given
+    whether it was at its start. As in the csv module, a quote only opens a
+    quoted field as the first character of the field; elsewhere it is text."""
+    if not quoted and '"' not in line:
+        return False
+    pos = 0
+    while True:
+        if not quoted:
+            if line.startswith('"', pos):
+                quoted = True
+                pos += 1
+            else:
+                pos = line.find(",", pos)
+                if pos < 0:
+                    return False
+                pos += 1
+                continue
+        end = line.find('"', pos)
+        if end < 0:
+            return True
+        if line.startswith('"', end + 1):
+            # "" is an escaped quote
+            pos = end + 2
+            continue
+        quoted = False
+        pos = line.find(",", end + 1)
+        if pos < 0:
+            return False
+        pos += 1
+
+def _ignored_entry(name: str) -> bool:
+    # Folders and metadata that archivers add next to the real files
+    return name.startswith("__MACOSX/") or os.path.basename(name).startswith(".")
+
+def _cell_text(value) -> str:
+    """A worksheet value as the text a CSV export of the sheet would hold."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime) and value.time() == datetime.min.time():
+        return value.date().isoformat()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+class CSVRowStream:
+    """Reads an upload in chunks and yields parsed CSV rows as they arrive.
+
+    gzip and single-entry zip files are recognised by their magic bytes and
+    decompressed on the fly. `max_bytes` limits the bytes read from `file` and
+    `max_decompressed_bytes` (default: `max_bytes`) the CSV text a compressed
+    file expands to; output more than `max_ratio` times the input is rejected
+    as a zip bomb. Plain CSV is only limited by `max_bytes`.
+
+    Excel (.xlsx) workbooks are zips too: the rows of their first sheet are
+    streamed with openpyxl's read-only iterator, with cells converted to text.
+
+    The first row yielded is the header. `bytes_read` is updated while reading
+    and limits are enforced before a chunk is decoded.
+    """
+    def __init__(
+        self,
+        file,
+        max_bytes: int,
+        chunk_size: int = READ_CHUNK_SIZE,
+        max_decompressed_bytes: Optional[int] = None,
+        max_ratio: int = 100
+    ):
+        self.file = file
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_decompressed_bytes = max_decompressed_bytes or max_bytes
+        self.max_ratio = max_ratio
+        self.bytes_read = 0
+        self.bytes_decompressed = 0
+
+    def __aiter__(self) -> AsyncIterator[List[str]]:
+        return self._rows()
+
+    async def _rows(self) -> AsyncIterator[List[str]]:
+        head = await self._read()
+        if head.startswith(ZIP_MAGIC):
+            archive = self._open_zip()
+            if XLSX_WORKBOOK in archive.namelist():
+                source = self._xlsx_rows(archive)
+            else:
+                source = self._csv_rows(self._zip_chunks(archive))
+        elif head.startswith(GZIP_MAGIC):
+            source = self._csv_rows(self._gzip_chunks(head))
+        else:
+            source = self._csv_rows(self._plain_chunks(head))
+
+        async for row in source:
+            yield row
+
+    async def _read(self) -> bytes:
+        chunk = await self.file.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise HTTPException(status_code=422, detail=f"File size exceeds {self.max_bytes // (1024 * 1024)}MB limit")
+        return chunk
+
+    def _count_decompressed(self, size: int):
+        self.bytes_decompressed += size
+        if self.bytes_decompressed > self.max_decompressed_bytes:
+            limit_mb = self.max_decompressed_bytes // (1024 * 1024)
+            raise HTTPException(status_code=422, detail=f"Decompressed file exceeds {limit_mb}MB limit")
+        if self.bytes_decompressed > RATIO_CHECK_MIN_BYTES and self.bytes_decompressed > self.bytes_read * self.max_ratio:
+            raise HTTPException(status_code=422, detail=f"Compression ratio exceeds {self.max_ratio}:1")
+
+    async def _plain_chunks(self, chunk: bytes) -> AsyncIterator[bytes]:
+        while chunk:
+            yield chunk
+            chunk = await self._read()
+
+    async def _gzip_chunks(self, data: bytes) -> AsyncIterator[bytes]:
+        # Output is capped at chunk_size per call; the rest of the input waits
+        # in unconsumed_tail, so memory stays flat whatever the ratio.
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while data:
+            try:
+                chunk = decompressor.decompress(data, self.chunk_size)
+            except zlib.error:
+                raise HTTPException(status_code=422, detail="Invalid gzip file")
+            if chunk:
+                self._count_decompressed(len(chunk))
+                yield chunk
+
+            if decompressor.eof:
+                # Concatenated gzip members are valid and read as one file
+                data = decompressor.unused_data or await self._read()
+                if data:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                data = decompressor.unconsumed_tail or await self._read()
+                if not data:
+                    chunk = decompressor.flush()
+                    if chunk:
+                        self._count_decompressed(len(chunk))
+                        yield chunk
+
+        if not decompressor.eof:
+            raise HTTPException(status_code=422, detail="Compressed file is truncated")
+
+    def _open_zip(self) -> zipfile.ZipFile:
+        # The central directory is at the end, so the archive is read in place
+        # from the (seekable) upload file rather than from the stream.
+        fh = self.file.file
+        fh.seek(0, 2)
+        if fh.tell() > self.max_bytes:
+            raise HTTPException(status_code=422, detail=f"File size exceeds {self.max_bytes // (1024 * 1024)}MB limit")
+
+        try:
+            return zipfile.ZipFile(fh)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=422, detail="Invalid zip file")
+
+    async def _zip_chunks(self, archive: zipfile.ZipFile) -> AsyncIterator[bytes]:
+        fh = self.file.file
+        entries = [info for info in archive.infolist() if not info.is_dir() and not _ignored_entry(info.filename)]
+        if len(entries) != 1:
+            raise HTTPException(status_code=422, detail="Zip file must contain exactly one CSV file")
+
+        try:
+            with archive.open(entries[0]) as member:
+                while True:
+                    chunk = await run_in_threadpool(member.read, self.chunk_size)
+                    self.bytes_read = fh.tell()
+                    if not chunk:
+                        break
+                    self._count_decompressed(len(chunk))
+                    yield chunk
+        except (zipfile.BadZipFile, NotImplementedError, RuntimeError, zlib.error):
+            raise HTTPException(status_code=422, detail="Unsupported or corrupt zip entry")
+
+    async def _xlsx_rows(self, archive: zipfile.ZipFile) -> AsyncIterator[List[str]]:
+        # The limits apply to the sizes the entries declare, before anything
+        # is inflated; openpyxl then parses the sheet XML incrementally, so
+        # only the current batch of rows and the shared strings are in memory.
+        fh = self.file.file
+        size = fh.seek(0, 2)
+        self.bytes_read = size
+        self._count_decompressed(sum(info.file_size for info in archive.infolist()))
+        archive.close()
+
+        fh.seek(0)
+        try:
+            workbook = await run_in_threadpool(load_workbook, fh, read_only=True, data_only=True)
+        except Exception:
+            raise HTTPException(status_code=422, detail="Invalid xlsx file")
+
+        try:
+            sheet = workbook.worksheets[0]
+            # Saved dimensions are often wrong; read every row that is there
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+
+            def next_batch() -> List[List[str]]:
+                batch = []
+                for values in rows:
+                    row = [_cell_text(v) for v in values]
+                    if any(row):
+                        batch.append(row)
+                    if len(batch) >= XLSX_BATCH_ROWS:
+                        break
+                return batch
+
+            while True:
+                try:
+                    batch = await run_in_threadpool(next_batch)
+                except (zipfile.BadZipFile, zlib.error, KeyError, ValueError):
+                    raise HTTPException(status_code=422, detail="Invalid xlsx file")
+                if not batch:
+                    break
+                self.bytes_read = fh.tell()
+                for row in batch:
+                    yield row
+            self.bytes_read = size
+        finally:
+            workbook.close()
+
+    async def _csv_rows(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        feed = _LineFeed()
+        reader = csv.reader(feed)
+        # Text after the last newline, kept as fragments so a long line is
+        # not copied again with every chunk
+        pending = []
+        pending_size = 0
+        record = []
+        record_size = 0
+        in_quotes = False
+
+        def push(line: str):
+            nonlocal record, record_size, in_quotes
+            record.append(line)
+            record_size += len(line)
+            # A record is complete once a line leaves it outside quotes
+            in_quotes = _ends_quoted(line, in_quotes)
+            if not in_quotes:
+                feed.lines.extend(record)
+                record, record_size = [], 0
+            elif record_size > csv.field_size_limit():
+                # An unterminated quote would otherwise hold the rest of the file
+                line_num = reader.line_num + len(record)
+                raise HTTPException(status_code=422, detail=f"Malformed CSV at line {line_num}: unterminated quoted field")
+
+        async for chunk in chunks:
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError:
+                raise HTTPException(status_code=422, detail="File must be UTF-8 encoded")
+
+            lines = text.split("\n")
+            tail = lines.pop()
+            if lines:
+                pending.append(lines[0])
+                lines[0] = "".join(pending)
+                for line in lines:
+                    push(line + "\n")
+                pending, pending_size = [], 0
+            if tail:
+                pending.append(tail)
+                pending_size += len(tail)
+            if pending_size > csv.field_size_limit():
+                # Without a newline (or with CR-only line endings) the rest
+                # of the file would pile up here
+                line_num = reader.line_num + len(record) + 1
+                raise HTTPException(status_code=422, detail=f"Malformed CSV at line {line_num}: line exceeds {csv.field_size_limit()} characters")
+
+            while feed.lines:
+                row = self._next_row(reader)
+                if row:
+                    yield row
+
+        try:
+            pending.append(decoder.decode(b"", final=True))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=422, detail="File must be UTF-8 encoded")
+
+        last = "".join(pending)
+        if last:
+            push(last)
+        feed.lines.extend(record)
+
+        while feed.lines:
+            row = self._next_row(reader)
+            if row:
+                yield row
+
+    @staticmethod
+    def _next_row(reader) -> List[str]:
+        try:
+            return next(reader)
+        except csv.Error as e:
+            raise HTTPException(status_code=422, detail=f"Malformed CSV at line {reader.line_num}: {e}")
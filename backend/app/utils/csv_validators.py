@@ -1,16 +1,22 @@
 import re
 from datetime import datetime
+from functools import lru_cache
 
-COMPANY_REQUIRED_COLUMNS = ["Company Name", "Segment Name"]
-CONTACT_REQUIRED_COLUMNS = ["First Name", "Last Name", "Company Name", "Email"]
+from .normalizers import normalize_company_name, normalize_url
+from .validation_plan import Column, EntitySchema, ValidationPlan
+
+EMAIL_REGEX = r"[^@]+@[^@]+\.[^@]+"
+URL_REGEX = r"https?://|[a-z0-9]+\.[a-z]{2,}"
+EMAIL_PATTERN = re.compile(EMAIL_REGEX)
+URL_PATTERN = re.compile(URL_REGEX)
 
 def is_valid_email(email: str) -> bool:
     if not email: return False
-    return bool(re.match(r"[^@]+@[^@]+\.[^@]+", email))
+    return bool(EMAIL_PATTERN.match(email))
 
 def is_valid_url(url: str) -> bool:
     if not url: return True # Optional
-    return bool(re.match(r"https?://", url)) or bool(re.match(r"[a-z0-9]+\.[a-z]{2,}", url))
+    return bool(URL_PATTERN.match(url))
 
 def validate_founded_year(year: any) -> bool:
     if not year: return True
@@ -19,3 +25,59 @@ def validate_founded_year(year: any) -> bool:
         return 1800 <= y <= datetime.now().year
     except:
         return False
+
+COMPANY_SCHEMA = EntitySchema(
+    columns=[
+        Column("Company Name", "name", required=True, normalize=normalize_company_name),
+        Column("Segment Name", required=True),
+        Column(
+            "Company Website", "website", check=URL_PATTERN.match, message="Invalid URL", normalize=normalize_url,
+            sql_check=f"{{value}} ~ '^({URL_REGEX})'",
+            sql_normalize="CASE WHEN lower({value}) ~ '^https?://' THEN lower({value}) ELSE 'https://' || lower({value}) END"
+        ),
+        Column(
+            "Founded Year", check=validate_founded_year, message="Invalid year (1800-2024)",
+            sql_check="CASE WHEN {value} ~ '^[+-]?[0-9]+$' THEN {value}::numeric BETWEEN 1800 AND extract(year FROM now()) ELSE false END"
+        ),
+        Column("Company Industry", "industry"),
+        Column("Company Description", "description"),
+    ],
+    reference="Segment Name",
+    reference_fields=("segment_id",),
+    reference_message="Active segment '{}' not found",
+    defaults={"status": "pending", "is_active": True},
+    reference_sql="SELECT name, id AS segment_id FROM segments WHERE status = 'active'",
+    dedup_fields=("name", "website", "segment_id")
+)
+
+CONTACT_SCHEMA = EntitySchema(
+    columns=[
+        Column("First Name", "first_name", required=True),
+        Column("Last Name", "last_name", required=True),
+        Column(
+            "Email", "email", required=True, check=EMAIL_PATTERN.match, message="Invalid email format", normalize=str.lower,
+            sql_check=f"{{value}} ~ '^({EMAIL_REGEX})'", sql_normalize="lower({value})"
+        ),
+        Column("Company Name", required=True),
+        Column("Job Title", "job_title"),
+    ],
+    reference="Company Name",
+    reference_fields=("company_id", "segment_id"),
+    reference_message="Approved company '{}' not found",
+    defaults={"status": "uploaded", "is_active": True},
+    reference_sql=(
+        "SELECT DISTINCT ON (name) name, id AS company_id, segment_id FROM companies "
+        "WHERE status = 'approved' ORDER BY name, created_at"
+    ),
+    dedup_fields=("email", "company_id")
+)
+
+ENTITY_SCHEMAS = {"company": COMPANY_SCHEMA, "contact": CONTACT_SCHEMA}
+
+COMPANY_REQUIRED_COLUMNS = COMPANY_SCHEMA.required_columns
+CONTACT_REQUIRED_COLUMNS = CONTACT_SCHEMA.required_columns
+
+@lru_cache(maxsize=64)
+def get_validation_plan(entity_type: str, keys: tuple) -> ValidationPlan:
+    """Plan for a file header, compiled once per process."""
+    return ENTITY_SCHEMAS[entity_type].compile(keys)
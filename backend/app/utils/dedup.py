@@ -0,0 +1,14 @@
+import hashlib
+
+def dedup_key(*values) -> str:
+    """Key of the duplicate group a record falls into: the md5 of its values,
+    trimmed, lowercased and joined with "|". Companies are keyed on
+    (name, website, segment_id) and contacts on (email, company_id), the same
+    partitions as the weekly dedup job."""
+    text = "|".join("" if v is None else str(v).strip().lower() for v in values)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+def dedup_key_sql(*expressions: str) -> str:
+    """`dedup_key` as a PostgreSQL expression over SQL `expressions`."""
+    parts = ", ".join(f"coalesce(lower(trim(CAST({e} AS text))), '')" for e in expressions)
+    return f"md5(concat_ws('|', {parts}))"
@@ -0,0 +1,57 @@
+import os
+import re
+from typing import Iterator, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# Bytes read from disk per chunk of a file response
+FILE_CHUNK_SIZE = 256 * 1024
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) byte positions of a single-range Range header, or None to
+    send the whole file (no header, or a multi-range one we do not serve).
+    Raises 416 when the range lies outside the file."""
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _read(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def ranged_file_response(path: str, range_header: Optional[str], media_type: str, headers: dict) -> StreamingResponse:
+    """Sends a file, or the part of it named by `range_header` with status 206.
+    The file is read in a threadpool while it is being sent."""
+    size = os.path.getsize(path)
+    byte_range = parse_range(range_header, size)
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_read(path, start, end - start + 1), status_code=status_code, media_type=media_type, headers=headers)
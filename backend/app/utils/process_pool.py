@@ -0,0 +1,26 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from ..config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared pool for CPU-bound import work, or None when IMPORT_PROCESS_WORKERS is 0."""
+    global _pool
+    if settings.IMPORT_PROCESS_WORKERS <= 0:
+        return None
+    if _pool is None:
+        # spawn rather than fork: the parent runs an event loop and DB driver threads
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMPORT_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,130 @@
+import operator
+import re
+from functools import reduce
+from typing import List, Optional, Sequence
+from uuid import UUID
+from sqlalchemy import DDL, Boolean, Float, and_, case, event, func, literal, literal_column, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+
+from ..config import settings
+from .pagination import apply_keyset_pagination, decode_cursor, keyset_page
+
+# Text search configuration: no stemming or stop words, names and emails are not prose
+SEARCH_CONFIG = "simple"
+
+# PostgreSQL-only column holding search_vector() of a table's search columns
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+# Words of a search, split as the text search parser splits them
+TERM_PATTERN = re.compile(r"[^\W_]+")
+
+# Shorter prefixes match too much of a table to rank
+SEARCH_RANK_MIN_CHARS = 3
+
+def _sql_text(value: str):
+    # Inlined rather than bound, so the expression can be a column definition
+    return text("'" + value.replace("'", "''") + "'")
+
+def search_terms(search: str) -> List[str]:
+    return TERM_PATTERN.findall(search.lower())
+
+def email_words(column):
+    """An email address as the words of its local part and domain."""
+    return func.replace(func.replace(column, _sql_text("@"), _sql_text(" ")), _sql_text("."), _sql_text(" "))
+
+def search_document(*columns):
+    document = func.coalesce(columns[0], _sql_text(""))
+    for column in columns[1:]:
+        document = document.concat(_sql_text(" ")).concat(func.coalesce(column, _sql_text("")))
+    return document
+
+def search_vector(*columns):
+    """tsvector of `columns` as one document."""
+    return func.to_tsvector(_sql_text(SEARCH_CONFIG), search_document(*columns))
+
+def add_search_vector(table, columns: Sequence, index_name: str):
+    """Gives `table`, when created on PostgreSQL, the stored generated column
+    SEARCH_VECTOR_COLUMN over `columns` and a GIN index on it. PostgreSQL keeps
+    it current on every write, COPY and raw SQL included."""
+    expression = search_vector(*columns).compile(dialect=postgresql.dialect(), compile_kwargs={"include_table": False})
+    event.listen(table, "after_create", DDL(
+        f"ALTER TABLE {table.name} ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS ({expression}) STORED"
+    ).execute_if(dialect="postgresql"))
+    event.listen(table, "after_create", DDL(
+        f"CREATE INDEX {index_name} ON {table.name} USING gin ({SEARCH_VECTOR_COLUMN})"
+    ).execute_if(dialect="postgresql"))
+
+class _Search(ColumnElement):
+    """Match (or, with `rank`, relevance) of a row for every term of a search
+    as a word prefix in `columns`: a full-text query of the table's
+    SEARCH_VECTOR_COLUMN on PostgreSQL and LIKE patterns elsewhere."""
+    # The rendered SQL depends on the number of terms
+    inherit_cache = False
+
+    def __init__(self, columns: Sequence, terms: List[str], rank: bool = False):
+        self.columns = [column.__clause_element__() if hasattr(column, "__clause_element__") else column for column in columns]
+        self.table = self.columns[0].table
+        self.terms = terms
+        self.rank = rank
+        self.type = Float() if rank else Boolean()
+
+    @property
+    def _from_objects(self):
+        return [self.table]
+
+@compiles(_Search, "postgresql")
+def _compile_postgresql(element, compiler, **kw):
+    vector = literal_column(f"{element.table.name}.{SEARCH_VECTOR_COLUMN}")
+    query = func.to_tsquery(_sql_text(SEARCH_CONFIG), " & ".join(f"{term}:*" for term in element.terms))
+    expression = func.ts_rank(vector, query, type_=Float) if element.rank else vector.op("@@")(query)
+    return compiler.process(expression, **kw)
+
+@compiles(_Search)
+def _compile_default(element, compiler, **kw):
+    # " document ", lowercased, so a word prefix is "% prefix"
+    words = literal(" ").concat(func.lower(search_document(*element.columns))).concat(" ")
+    if element.rank:
+        # A whole word scores 1, a prefix of one 0.5
+        scores = [case((words.like(f"% {term} %"), 1.0), else_=0.5) for term in element.terms]
+        expression = reduce(operator.add, scores)
+    else:
+        expression = and_(*(words.like(f"% {term}%") for term in element.terms))
+    return "(" + compiler.process(expression, **kw) + ")"
+
+def search_match(columns: Sequence, terms: List[str]) -> ColumnElement:
+    return _Search(columns, terms)
+
+def search_rank(columns: Sequence, terms: List[str]) -> ColumnElement:
+    return _Search(columns, terms, rank=True)
+
+async def rank_search(db: AsyncSession, stmt, terms: List[str], cursor: Optional[str] = None) -> bool:
+    """Whether the results of search `stmt` are ordered by relevance.
+
+    Ranking reads every match, so a broad search (a term shorter than
+    SEARCH_RANK_MIN_CHARS, or more than SEARCH_RANK_MAX_ROWS matches) is
+    listed newest first instead. Later pages keep the order of the page their
+    cursor came from.
+    """
+    if cursor:
+        first, _ = decode_cursor(cursor, lambda value: value, str)
+        return isinstance(first, float)
+    if min(len(term) for term in terms) < SEARCH_RANK_MIN_CHARS:
+        return False
+    # Counting stops one past the limit, whatever the number of matches
+    matches = stmt.with_only_columns(literal_column("1"), maintain_column_froms=True).order_by(None)
+    probe = select(func.count()).select_from(matches.limit(settings.SEARCH_RANK_MAX_ROWS + 1).subquery())
+    return (await db.execute(probe)).scalar_one() <= settings.SEARCH_RANK_MAX_ROWS
+
+async def ranked_page(db: AsyncSession, stmt, model, columns: Sequence, terms: List[str], limit: int, cursor=None) -> dict:
+    """Keyset page of `stmt` (a select of `model`) ordered by relevance to
+    `terms`, best first, over (rank, id)."""
+    rank = search_rank(columns, terms)
+    stmt = apply_keyset_pagination(stmt.add_columns(rank), (rank, model.id), (float, UUID), limit, cursor, descending=True)
+    rows = (await db.execute(stmt)).all()
+    page = keyset_page(rows, limit, lambda row: (row[1], row[0].id))
+    page["items"] = [row[0] for row in page["items"]]
+    return page
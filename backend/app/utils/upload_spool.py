@@ -0,0 +1,116 @@
+import hashlib
+import os
+import zipfile
+import zlib
+from typing import List, Tuple
+from fastapi import HTTPException, UploadFile
+
+from ..config import settings
+from .csv_stream import RATIO_CHECK_MIN_BYTES, READ_CHUNK_SIZE, XLSX_WORKBOOK, ZIP_MAGIC, _ignored_entry
+
+def spool_path(name: str) -> str:
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    return os.path.join(settings.UPLOAD_TEMP_DIR, name)
+
+async def spool_upload(file: UploadFile, path: str, max_bytes: int) -> Tuple[int, str]:
+    """Copies an upload to `path` in chunks so it outlives the request.
+
+    Returns the number of bytes written and their SHA-256 hex digest, computed
+    on the way through; the partial file is removed if the size limit is
+    exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        try:
+            while True:
+                chunk = await file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    limit_mb = max_bytes // (1024 * 1024)
+                    raise HTTPException(status_code=422, detail=f"File size exceeds {limit_mb}MB limit")
+                digest.update(chunk)
+                out.write(chunk)
+        except BaseException:
+            out.close()
+            os.remove(path)
+            raise
+    return size, digest.hexdigest()
+
+def file_digest(path: str) -> str:
+    """SHA-256 hex digest of a file already on disk."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(READ_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def unpack_archive(
+    path: str,
+    max_bytes: int,
+    max_files: int,
+    max_decompressed_bytes: int,
+    max_ratio: int
+) -> List[Tuple[str, str, int, str]]:
+    """Extracts the files of a multi-file zip upload next to it.
+
+    Returns (entry name, path, size, SHA-256 hex digest) per file, or an empty
+    list when `path` is not a zip of several files: a single-file zip or an
+    Excel workbook is imported as it is. The entries are counted against
+    `max_files` before anything is written. They are copied in chunks under
+    `max_bytes` each, whatever size they declare, and together under
+    `max_decompressed_bytes` and `max_ratio` times the archive's size.
+    """
+    with open(path, "rb") as fh:
+        if fh.read(len(ZIP_MAGIC)) != ZIP_MAGIC:
+            return []
+
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=422, detail="Invalid zip file")
+
+    archive_size = os.path.getsize(path)
+    extracted = []
+    targets = []
+    with archive:
+        if XLSX_WORKBOOK in archive.namelist():
+            return []
+        entries = [info for info in archive.infolist() if not info.is_dir() and not _ignored_entry(info.filename)]
+        if len(entries) < 2:
+            return []
+        if len(entries) > max_files:
+            raise HTTPException(status_code=422, detail=f"At most {max_files} files can be uploaded together")
+
+        total = 0
+        try:
+            for index, info in enumerate(entries):
+                target = f"{path}.{index}"
+                targets.append(target)
+                digest = hashlib.sha256()
+                size = 0
+                with archive.open(info) as member, open(target, "wb") as out:
+                    for chunk in iter(lambda: member.read(READ_CHUNK_SIZE), b""):
+                        size += len(chunk)
+                        total += len(chunk)
+                        if size > max_bytes:
+                            limit_mb = max_bytes // (1024 * 1024)
+                            raise HTTPException(status_code=422, detail=f"{info.filename}: file size exceeds {limit_mb}MB limit")
+                        if total > max_decompressed_bytes:
+                            limit_mb = max_decompressed_bytes // (1024 * 1024)
+                            raise HTTPException(status_code=422, detail=f"Decompressed files exceed {limit_mb}MB limit")
+                        if total > RATIO_CHECK_MIN_BYTES and total > archive_size * max_ratio:
+                            raise HTTPException(status_code=422, detail=f"Compression ratio exceeds {max_ratio}:1")
+                        digest.update(chunk)
+                        out.write(chunk)
+                extracted.append((os.path.basename(info.filename), target, size, digest.hexdigest()))
+        except BaseException as e:
+            for target in targets:
+                if os.path.exists(target):
+                    os.remove(target)
+            if isinstance(e, (zipfile.BadZipFile, NotImplementedError, RuntimeError, zlib.error)):
+                raise HTTPException(status_code=422, detail="Unsupported or corrupt zip entry")
+            raise
+    return extracted
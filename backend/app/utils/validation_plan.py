@@ -0,0 +1,170 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from .dedup import dedup_key
+
+class Column:
+    """One CSV column of an entity schema.
+
+    `field` is the model column the value is written to, if any. `check` runs
+    on non-empty values and fails with `message`; `normalize` is applied to
+    non-empty values, and empty ones are stored as None.
+
+    `sql_check` and `sql_normalize` are the same rules as PostgreSQL
+    expressions over `{value}`, used by the staging-table import engine. A
+    rule SQL cannot reproduce exactly is left to `normalize`, which that
+    engine then applies while copying rows into the staging table.
+    """
+    def __init__(
+        self,
+        header: str,
+        field: Optional[str] = None,
+        required: bool = False,
+        check: Optional[Callable[[str], object]] = None,
+        message: Optional[str] = None,
+        normalize: Optional[Callable[[str], object]] = None,
+        sql_check: Optional[str] = None,
+        sql_normalize: Optional[str] = None
+    ):
+        self.header = header
+        self.key = header.lower()
+        self.field = field
+        self.required = required
+        self.check = check
+        self.message = message
+        self.normalize = normalize
+        self.sql_check = sql_check
+        self.sql_normalize = sql_normalize
+
+class EntitySchema:
+    """Declarative description of an importable entity.
+
+    The `reference` column is resolved through the lookup passed to
+    `ValidationPlan.validate`; its result is written to `reference_fields`
+    (a lookup value is a tuple when there is more than one field). `defaults`
+    are added to every valid row. `reference_sql` selects the same lookup as
+    rows of (name, *reference_fields), one per name. `dedup_fields` are the
+    written fields a valid row's `dedup_key` is computed from.
+    """
+    def __init__(
+        self,
+        columns: List[Column],
+        reference: str,
+        reference_fields: Tuple[str, ...],
+        reference_message: str,
+        defaults: Dict,
+        reference_sql: Optional[str] = None,
+        dedup_fields: Tuple[str, ...] = ()
+    ):
+        self.columns = columns
+        self.reference = next(c for c in columns if c.header == reference)
+        self.reference_fields = reference_fields
+        self.reference_message = reference_message
+        self.defaults = defaults
+        self.reference_sql = reference_sql
+        self.dedup_fields = dedup_fields
+
+    @property
+    def required_columns(self) -> List[str]:
+        return [c.header for c in self.columns if c.required]
+
+    def compile(self, keys: Sequence[str]) -> "ValidationPlan":
+        return ValidationPlan(self, keys)
+
+class ValidationPlan:
+    """An `EntitySchema` bound to the header of one file.
+
+    Column positions are resolved once; `validate` then works column by column
+    over a whole chunk instead of building a dict per row.
+    """
+    def __init__(self, schema: EntitySchema, keys: Sequence[str]):
+        self.schema = schema
+        self.keys = list(keys)
+        # With repeated headers the last occurrence wins, as with a dict
+        positions = {k: i for i, k in enumerate(self.keys) if k}
+        self.indices = [positions.get(c.key) for c in schema.columns]
+
+    def validate(self, chunk: List, lookup: Dict, user_id: UUID, batch_id: UUID) -> tuple:
+        """Validates and normalizes (row number, raw row) pairs.
+
+        Returns (valid row dicts, error dicts, number of invalid rows). Errors
+        are ordered by row and then by schema column, and keep their row in
+        `row_data` keyed by lowercased header.
+        """
+        if not chunk:
+            return [], [], 0
+
+        rows = [row for _, row in chunk]
+        schema = self.schema
+        found = []
+        columns = {}
+        # Transposed once; only columns that some rows are too short for are
+        # read row by row
+        transposed = list(zip(*rows))
+
+        for order, (column, index) in enumerate(zip(schema.columns, self.indices)):
+            if index is None:
+                values = [None] * len(rows)
+            elif index < len(transposed):
+                values = [v.strip() for v in transposed[index]]
+            else:
+                values = [row[index].strip() if index < len(row) else None for row in rows]
+            columns[column.key] = values
+
+            if column.required:
+                found.extend((i, order, column.header, "Required", "") for i, v in enumerate(values) if not v)
+            if column.check:
+                check = column.check
+                found.extend((i, order, column.header, column.message, v) for i, v in enumerate(values) if v and not check(v))
+
+        names = columns[schema.reference.key]
+        resolved = [lookup.get(name) if name else None for name in names]
+        order = len(schema.columns)
+        found.extend(
+            (i, order, schema.reference.header, schema.reference_message.format(name), name)
+            for i, (name, ref) in enumerate(zip(names, resolved)) if name and ref is None
+        )
+
+        found.sort(key=lambda e: (e[0], e[1]))
+        errors = []
+        row_data = {}
+        for i, _, header, message, value in found:
+            if i not in row_data:
+                row_data[i] = {k: v.strip() for k, v in zip(self.keys, rows[i]) if k}
+            errors.append({
+                "row_number": chunk[i][0],
+                "column_name": header,
+                "error_message": message,
+                "value": value,
+                "row_data": row_data[i]
+            })
+
+        fields = []
+        field_values = []
+        for column in schema.columns:
+            if not column.field:
+                continue
+            values = columns[column.key]
+            if column.normalize:
+                normalize = column.normalize
+                values = [normalize(v) if v else None for v in values]
+            fields.append(column.field)
+            field_values.append(values)
+
+        fields.extend(schema.reference_fields)
+        if len(schema.reference_fields) == 1:
+            field_values.append(resolved)
+        else:
+            empty = (None,) * len(schema.reference_fields)
+            field_values.extend(zip(*(ref or empty for ref in resolved)))
+
+        base = dict(schema.defaults, created_by=user_id, batch_id=batch_id)
+        valid_rows = [
+            {"id": uuid4(), **dict(zip(fields, values)), **base}
+            for i, values in enumerate(zip(*field_values)) if i not in row_data
+        ]
+        if schema.dedup_fields:
+            for row in valid_rows:
+                row["dedup_key"] = dedup_key(*(row[f] for f in schema.dedup_fields))
+
+        return valid_rows, errors, len(row_data)
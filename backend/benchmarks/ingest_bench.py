@@ -0,0 +1,228 @@
+"""Measures upload ingest throughput end to end.
+
+    cd backend && python -m benchmarks.ingest_bench [options]
+
+Synthetic company and contact CSVs are written to a temp directory and
+imported with `CSVService.validate_and_import` (or the staging-table engine
+with --engine sql), once per database, entity and size. Each run happens in
+a fresh process so its peak RSS is its own. Reported per run:
+
+    rows/s      rows read from the file per second of import
+    peak RSS    maximum resident set size of the importing process
+    statements  SQL statements sent through SQLAlchemy (COPY is not counted)
+    commit      seconds spent in the final commit
+
+The databases are recreated with `Base.metadata.create_all`, so point
+--postgres (or BENCH_POSTGRES_URL) at a scratch database. SQLite runs on a
+file in the temp directory unless --skip-sqlite is given or the engine is sql.
+
+--min-rows-per-second and --max-seconds turn the run into a check: the exit
+status is 1 if any run misses them, so the weekly 1M-row load can be gated:
+
+    python -m benchmarks.ingest_bench --rows 1000000 --postgres $URL --min-rows-per-second 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+SEGMENT = "Benchmark Segment"
+
+# Approved companies that contact files refer to
+REFERENCE_COMPANIES = 1000
+
+def company_row(i: int, rng: random.Random, error_rate: float) -> list:
+    row = [f"company {i}", SEGMENT, f"company{i}.com", str(1950 + i % 70), "Software"]
+    if rng.random() < error_rate:
+        fault = rng.randrange(3)
+        if fault == 0:
+            row[0] = ""
+        elif fault == 1:
+            row[2] = "not a url"
+        else:
+            row[3] = "1700"
+    return row
+
+def contact_row(i: int, rng: random.Random, error_rate: float) -> list:
+    row = [f"First{i}", f"Last{i}", f"person{i}@example.com", f"Reference {i % REFERENCE_COMPANIES}", "Engineer"]
+    if rng.random() < error_rate:
+        fault = rng.randrange(3)
+        if fault == 0:
+            row[1] = ""
+        elif fault == 1:
+            row[2] = "not an email"
+        else:
+            row[3] = "Unknown Company"
+    return row
+
+HEADERS = {
+    "company": ["Company Name", "Segment Name", "Company Website", "Founded Year", "Company Industry"],
+    "contact": ["First Name", "Last Name", "Email", "Company Name", "Job Title"],
+}
+ROW_MAKERS = {"company": company_row, "contact": contact_row}
+
+def write_csv(path: str, entity_type: str, rows: int, error_rate: float, duplicate_rate: float, seed: int = 7):
+    """Writes `rows` data rows; a `duplicate_rate` share repeats an earlier
+    row, and an `error_rate` share of the others has one invalid value."""
+    rng = random.Random(seed)
+    make_row = ROW_MAKERS[entity_type]
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        out.write(",".join(HEADERS[entity_type]) + "\n")
+        for i in range(rows):
+            if i and rng.random() < duplicate_rate:
+                row = make_row(rng.randrange(i), random.Random(0), 0)
+            else:
+                row = make_row(i, rng, error_rate)
+            out.write(",".join(row) + "\n")
+
+async def _seed(db, entity_type: str):
+    from app.models import Company, Segment, User
+
+    user = User(email="bench@example.com", name="Benchmark", password_hash="x", is_active=True)
+    db.add(user)
+    await db.flush()
+    segment = Segment(name=SEGMENT, status="active", created_by=user.id)
+    db.add(segment)
+    await db.flush()
+    if entity_type == "contact":
+        db.add_all(
+            Company(name=f"Reference {i}", segment_id=segment.id, status="approved", created_by=user.id)
+            for i in range(REFERENCE_COMPANIES)
+        )
+    await db.commit()
+    return user
+
+async def _import(url: str, entity_type: str, path: str, engine_name: str) -> dict:
+    from fastapi import UploadFile
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.config import settings
+    from app.database import Base
+    from app.services.csv_service import CSVService
+    from app.services.sql_import_service import SQLImportService
+
+    size_mb = os.path.getsize(path) // (1024 * 1024) + 1
+    settings.MAX_UPLOAD_SIZE_MB = max(settings.MAX_UPLOAD_SIZE_MB, size_mb)
+
+    engine = create_async_engine(url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    statements = 0
+    def count(conn, cursor, statement, *args):
+        nonlocal statements
+        statements += 1
+
+    try:
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            user = await _seed(db, entity_type)
+
+            commit_seconds = 0.0
+            commit = db.commit
+            async def timed_commit():
+                nonlocal commit_seconds
+                start = time.perf_counter()
+                await commit()
+                commit_seconds += time.perf_counter() - start
+            db.commit = timed_commit
+
+            event.listen(engine.sync_engine, "before_cursor_execute", count)
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            with open(path, "rb") as fh:
+                upload = UploadFile(fh, filename=os.path.basename(path))
+                if engine_name == "sql":
+                    SQLImportService.check_available(db)
+                    batch = CSVService.new_batch(entity_type, upload.filename, user.id)
+                    db.add(batch)
+                    await db.flush()
+                    batch = await SQLImportService.process_batch(db, batch, upload)
+                else:
+                    batch = await CSVService.validate_and_import(upload, entity_type, user.id, db)
+            elapsed = time.perf_counter() - start
+            event.remove(engine.sync_engine, "before_cursor_execute", count)
+    finally:
+        await engine.dispose()
+
+    return {
+        "seconds": elapsed,
+        "rows": batch.total_rows,
+        "valid": batch.valid_rows,
+        "invalid": batch.invalid_rows,
+        "duplicates": batch.duplicate_rows,
+        "statements": statements,
+        "commit_seconds": commit_seconds,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+    }
+
+def run_once(url: str, entity_type: str, path: str, engine_name: str) -> dict:
+    return asyncio.run(_import(url, entity_type, path, engine_name))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Upload ingest throughput benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--entity", choices=["company", "contact", "both"], default="both")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--duplicate-rate", type=float, default=0.02)
+    parser.add_argument("--engine", choices=["python", "sql"], default="python")
+    parser.add_argument("--postgres", default=os.environ.get("BENCH_POSTGRES_URL"), help="postgresql+asyncpg:// URL of a scratch database")
+    parser.add_argument("--skip-sqlite", action="store_true")
+    parser.add_argument("--min-rows-per-second", type=float)
+    parser.add_argument("--max-seconds", type=float)
+    args = parser.parse_args(argv)
+
+    entities = ["company", "contact"] if args.entity == "both" else [args.entity]
+    workdir = tempfile.mkdtemp(prefix="ingest_bench_")
+    databases = []
+    if not args.skip_sqlite and args.engine == "python":
+        databases.append(("sqlite", f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"))
+    if args.postgres:
+        databases.append(("postgresql", args.postgres))
+    if not databases:
+        parser.error("nothing to run: the sql engine needs --postgres")
+
+    print(f"{'database':<11} {'entity':<8} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'peak RSS':>9} {'statements':>10} {'commit':>7}  valid/invalid/dup")
+    failures = []
+    spawn = get_context("spawn")
+    for entity_type in entities:
+        for rows in args.rows:
+            path = os.path.join(workdir, f"{entity_type}_{rows}.csv")
+            write_csv(path, entity_type, rows, args.error_rate, args.duplicate_rate)
+            for db_name, url in databases:
+                with ProcessPoolExecutor(1, mp_context=spawn) as pool:
+                    result = pool.submit(run_once, url, entity_type, path, args.engine).result()
+                rate = result["rows"] / result["seconds"]
+                print(
+                    f"{db_name:<11} {entity_type:<8} {result['rows']:>9,} {result['seconds']:>8.2f} {rate:>9,.0f} "
+                    f"{result['peak_rss_mb']:>7.0f}MB {result['statements']:>10,} {result['commit_seconds']:>6.2f}s  "
+                    f"{result['valid']}/{result['invalid']}/{result['duplicates']}"
+                )
+                if args.min_rows_per_second and rate < args.min_rows_per_second:
+                    failures.append(f"{db_name} {entity_type} {rows:,}: {rate:,.0f} rows/s < {args.min_rows_per_second:,.0f}")
+                if args.max_seconds and result["seconds"] > args.max_seconds:
+                    failures.append(f"{db_name} {entity_type} {rows:,}: {result['seconds']:.2f}s > {args.max_seconds:.2f}s")
+            os.remove(path)
+
+    for failure in failures:
+        print(f"SLO missed: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
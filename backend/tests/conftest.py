@@ -3,6 +3,8 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
 from app.main import app
+from app.models import User, Role, Permission, Segment
+from app.utils.security import hash_password
 from httpx import AsyncClient, ASGITransport
 
 # Use in-memory SQLite for testing
@@ -42,3 +44,28 @@ async def client(db_session):
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
     app.dependency_overrides.clear()
+
+async def make_user(db_session, email: str) -> User:
+    user = User(email=email, name="Uploader", password_hash=hash_password("password123"), is_active=True)
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+async def auth_headers(client, db_session, email: str, permissions: list) -> dict:
+    role = Role(name=f"role-{email}")
+    for perm in permissions:
+        module, action = perm.split(":")
+        role.permissions.append(Permission(module=module, action=action))
+    user = User(email=email, name="Uploader", password_hash=hash_password("password123"), is_active=True)
+    user.roles.append(role)
+    db_session.add(user)
+    await db_session.commit()
+
+    login_res = await client.post("/api/auth/login", json={"email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+async def make_segment(db_session, name: str, user: User) -> Segment:
+    segment = Segment(name=name, status="active", created_by=user.id)
+    db_session.add(segment)
+    await db_session.commit()
+    return segment
@@ -0,0 +1,272 @@
+import csv
+import gzip
+import io
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+
+from app.config import settings
+from app.jobs.export_job import recover_exports, run_export_cleanup
+from app.jobs.worker_pool import export_pool
+from app.models import User, Company, ExportJob
+from app.services.export_service import ExportService
+from tests.conftest import TestingSessionLocal, auth_headers, make_segment, make_user
+
+@pytest.mark.asyncio
+async def test_company_export_streams_rows_in_chunks(client, db_session, monkeypatch):
+    monkeypatch.setattr("app.services.export_service.EXPORT_FETCH_ROWS", 7)
+    monkeypatch.setattr("app.utils.csv_export.STREAM_CHUNK_SIZE", 256)
+    headers = await auth_headers(client, db_session, "exporter@example.com", ["exports:companies"])
+    user = (await db_session.execute(select(User).where(User.email == "exporter@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Export Segment", user)
+    db_session.add_all(
+        Company(name=f"Exported {i}", website=f"https://exported{i}.com", segment_id=segment.id, created_by=user.id)
+        for i in range(30)
+    )
+    await db_session.commit()
+
+    response = await ExportService.export_companies(db_session)
+    chunks = [chunk async for chunk in response.body_iterator]
+    assert len(chunks) > 1
+
+    response = await client.get("/api/exports/companies", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == "".join(chunks)
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["ID", "Name", "Website", "Status", "Industry", "Created At"]
+    exported = {row[1]: row for row in rows[1:] if row[1].startswith("Exported ")}
+    assert len(exported) == 30
+    assert exported["Exported 3"][2:4] == ["https://exported3.com", "pending"]
+    assert "T" in exported["Exported 3"][5]
+
+    response = await client.get("/api/exports/contacts", headers=headers)
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_company_export_applies_list_filters_and_columns(client, db_session):
+    headers = await auth_headers(client, db_session, "filtered@example.com", ["exports:companies"])
+    user = (await db_session.execute(select(User).where(User.email == "filtered@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Filtered Segment", user)
+    db_session.add_all([
+        Company(name="Filtered Alpha", industry="Software", segment_id=segment.id, status="approved", created_by=user.id),
+        Company(name="Filtered Beta", industry="Retail", segment_id=segment.id, created_by=user.id),
+        Company(name="Filtered Gamma", segment_id=segment.id, status="approved", is_duplicate=True, created_by=user.id),
+        Company(name="Filtered Delta", segment_id=segment.id, status="approved", is_active=False, created_by=user.id),
+    ])
+    await db_session.commit()
+
+    params = {"segment_id": str(segment.id), "status": "approved", "columns": "name,segment_id,updated_at"}
+    response = await client.get("/api/exports/companies", headers=headers, params=params)
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["Name", "Segment ID", "Updated At"]
+    assert [row[:2] for row in rows[1:]] == [["Filtered Alpha", str(segment.id)]]
+    assert "T" in rows[1][2]
+
+    params = {"segment_id": str(segment.id), "is_duplicate": "true", "columns": "name"}
+    response = await client.get("/api/exports/companies", headers=headers, params=params)
+    assert response.text.splitlines() == ["Name", "Filtered Gamma"]
+
+    params = {"segment_id": str(segment.id), "search": "retail", "columns": "name"}
+    response = await client.get("/api/exports/companies", headers=headers, params=params)
+    assert response.text.splitlines() == ["Name", "Filtered Beta"]
+
+    response = await client.get("/api/exports/companies", headers=headers, params={"columns": "name,dedup_key"})
+    assert response.status_code == 422
+    assert "dedup_key" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_export_jobs_reuse_artifacts_until_the_data_changes(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "jobs@example.com", ["exports:companies"])
+    user = (await db_session.execute(select(User).where(User.email == "jobs@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Jobs Segment", user)
+    db_session.add_all(Company(name=f"Job {i}", segment_id=segment.id, created_by=user.id) for i in range(50))
+    await db_session.commit()
+    params = {"segment_id": str(segment.id), "columns": "name"}
+
+    response = await client.post("/api/exports/companies/jobs", headers=headers, params=params)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] == "pending"
+
+    response = await client.get(f"/api/exports/companies/jobs/{job_id}/download", headers=headers)
+    assert response.status_code == 409
+
+    job, args = export_pool.queue.get_nowait()
+    export_pool.queue.task_done()
+    await job(*args, session_factory=TestingSessionLocal)
+
+    data = (await client.get(f"/api/exports/companies/jobs/{job_id}", headers=headers)).json()
+    assert (data["status"], data["row_count"]) == ("completed", 50)
+
+    response = await client.get(f"/api/exports/companies/jobs/{job_id}/download", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    artifact = response.content
+    assert len(artifact) == data["file_size_bytes"]
+    lines = gzip.decompress(artifact).decode().splitlines()
+    assert lines[0] == "Name" and sorted(lines[1:]) == sorted(f"Job {i}" for i in range(50))
+
+    response = await client.get(
+        f"/api/exports/companies/jobs/{job_id}/download", headers={**headers, "Range": "bytes=10-"}
+    )
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-{len(artifact) - 1}/{len(artifact)}"
+    assert response.content == artifact[10:]
+    response = await client.get(
+        f"/api/exports/companies/jobs/{job_id}/download", headers={**headers, "Range": f"bytes={len(artifact)}-"}
+    )
+    assert response.status_code == 416
+
+    [path] = tmp_path.iterdir()
+    monkeypatch.setattr(settings, "EXPORT_ACCEL_REDIRECT_PREFIX", "/_exports/")
+    response = await client.get(f"/api/exports/companies/jobs/{job_id}/download", headers=headers)
+    assert response.headers["x-accel-redirect"] == f"/_exports/{path.name}"
+    assert response.content == b""
+
+    # Same filters and unchanged data reuse the job; a new matching row does not
+    response = await client.post("/api/exports/companies/jobs", headers=headers, params=params)
+    assert (response.status_code, response.json()["id"]) == (200, job_id)
+    assert export_pool.queue.empty()
+
+    db_session.add(Company(name="Job 50", segment_id=segment.id, created_by=user.id))
+    await db_session.commit()
+    response = await client.post("/api/exports/companies/jobs", headers=headers, params=params)
+    assert response.status_code == 202 and response.json()["id"] != job_id
+    export_pool.queue.get_nowait()
+    export_pool.queue.task_done()
+
+@pytest.mark.asyncio
+async def test_export_jobs_interrupted_by_a_restart_are_not_reused(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "export_restart@example.com", ["exports:companies"])
+    params = {"columns": "name", "search": "Restarted"}
+
+    response = await client.post("/api/exports/companies/jobs", headers=headers, params=params)
+    job_id = response.json()["id"]
+    # The queued job is lost with the process, along with a half-written file
+    export_pool.queue.get_nowait()
+    export_pool.queue.task_done()
+    (tmp_path / "abc.csv.gz.0123.part").write_bytes(b"partial")
+
+    await recover_exports(session_factory=TestingSessionLocal)
+    db_session.expire_all()
+
+    data = (await client.get(f"/api/exports/companies/jobs/{job_id}", headers=headers)).json()
+    assert (data["status"], data["error_message"]) == ("failed", "Export was interrupted by a server restart")
+    assert list(tmp_path.iterdir()) == []
+
+    response = await client.post("/api/exports/companies/jobs", headers=headers, params=params)
+    assert response.status_code == 202 and response.json()["id"] != job_id
+    export_pool.queue.get_nowait()
+    export_pool.queue.task_done()
+
+@pytest.mark.asyncio
+async def test_export_cleanup_keeps_artifacts_rewritten_by_a_newer_job(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    user = await make_user(db_session, "export_cleanup@example.com")
+    now = datetime.now(timezone.utc)
+    old, new = (
+        ExportJob(
+            entity_type="company", params={}, watermark="0:", cache_key="c" * 64, status="completed",
+            file_name=f"{'c' * 64}.csv.gz", requested_by=user.id, completed_at=completed_at
+        )
+        for completed_at in (now - timedelta(hours=settings.EXPORT_RETENTION_HOURS + 1), now)
+    )
+    db_session.add_all([old, new])
+    await db_session.commit()
+    artifact = tmp_path / old.file_name
+    artifact.write_bytes(b"artifact")
+
+    await run_export_cleanup(session_factory=TestingSessionLocal)
+    await db_session.refresh(old)
+    await db_session.refresh(new)
+    assert (old.status, new.status) == ("expired", "completed")
+    assert artifact.exists()
+
+    new.completed_at = now - timedelta(hours=settings.EXPORT_RETENTION_HOURS + 1)
+    await db_session.commit()
+    await run_export_cleanup(session_factory=TestingSessionLocal)
+    await db_session.refresh(new)
+    assert new.status == "expired"
+    assert not artifact.exists()
+
+@pytest.mark.asyncio
+async def test_exports_in_columnar_and_gzip_formats(client, db_session, monkeypatch):
+    monkeypatch.setattr("app.utils.columnar.COLUMNAR_BATCH_ROWS", 4)
+    headers = await auth_headers(client, db_session, "formats@example.com", ["exports:companies"])
+    user = (await db_session.execute(select(User).where(User.email == "formats@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Formats Segment", user)
+    db_session.add_all(
+        Company(name=f"Format {i}", founded_year=2000 + i, segment_id=segment.id, created_by=user.id) for i in range(10)
+    )
+    await db_session.commit()
+    params = {"segment_id": str(segment.id), "columns": "id,name,founded_year,is_active,created_at"}
+
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "format": "parquet"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith("companies_export.parquet")
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == ["id", "name", "founded_year", "is_active", "created_at"]
+    assert sorted(table.column("founded_year").to_pylist()) == list(range(2000, 2010))
+    assert set(table.column("is_active").to_pylist()) == {True}
+
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "format": "arrow"})
+    table = pa.ipc.open_file(io.BytesIO(response.content)).read_all()
+    assert table.num_rows == 10 and pa.types.is_timestamp(table.schema.field("created_at").type)
+
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "format": "csv.gz"})
+    assert response.headers["content-type"] == "application/gzip"
+    assert len(gzip.decompress(response.content).decode().splitlines()) == 11
+
+    params["columns"] = "name"
+    response = await client.get("/api/exports/companies", headers={**headers, "Accept-Encoding": "gzip"}, params=params)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 11
+    response = await client.get("/api/exports/companies", headers={**headers, "Accept-Encoding": "identity"}, params=params)
+    assert "content-encoding" not in response.headers
+    assert len(response.text.splitlines()) == 11
+
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "format": "xml"})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_delta_exports_return_rows_changed_since_the_sync_token(client, db_session, monkeypatch):
+    headers = await auth_headers(client, db_session, "delta@example.com", ["exports:companies"])
+    user = (await db_session.execute(select(User).where(User.email == "delta@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Delta Segment", user)
+    stamps = {"Delta A": datetime(2021, 3, 1), "Delta B": datetime(2021, 2, 1), "Delta C": datetime(2022, 1, 1)}
+    db_session.add_all(
+        Company(
+            name=name, segment_id=segment.id, created_by=user.id, updated_at=stamp,
+            is_active=name != "Delta B", is_duplicate=name == "Delta C"
+        )
+        for name, stamp in stamps.items()
+    )
+    await db_session.commit()
+    params = {"segment_id": str(segment.id), "columns": "name"}
+
+    # The lag puts the end of the first window in mid-2021
+    lag = datetime.utcnow() - datetime(2021, 7, 1)
+    monkeypatch.setattr(settings, "EXPORT_SYNC_LAG_SECONDS", int(lag.total_seconds()))
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "since": "2021-01-01T00:00:00Z"})
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["Name", "Updated At", "Is Active", "Is Duplicate"]
+    assert [(row[0], row[2]) for row in rows[1:]] == [("Delta B", "False"), ("Delta A", "True")]
+    token = response.headers["x-sync-token"]
+
+    monkeypatch.setattr(settings, "EXPORT_SYNC_LAG_SECONDS", 0)
+    # Rows flagged as duplicates after an earlier export still reach the sync
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "sync_token": token})
+    assert [(row[0], row[3]) for row in csv.reader(io.StringIO(response.text))][1:] == [("Delta C", "True")]
+    assert response.headers["x-sync-token"] != token
+
+    response = await client.get("/api/exports/companies", headers=headers, params={**params, "sync_token": "bogus"})
+    assert response.status_code == 400
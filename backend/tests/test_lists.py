@@ -0,0 +1,120 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select, text
+
+from app.config import settings
+from app.models import User, Company, Contact
+from app.utils.counts import count_cache
+from tests.conftest import auth_headers, make_segment
+
+async def fetch_all(client, headers, url: str, params: dict) -> list:
+    items, cursor = [], None
+    while True:
+        page = (await client.get(url, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return items
+
+@pytest.mark.asyncio
+async def test_list_pages_follow_created_at_and_id_across_ties(client, db_session):
+    headers = await auth_headers(client, db_session, "pages@example.com", ["companies:read", "contacts:read"])
+    user = (await db_session.execute(select(User).where(User.email == "pages@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Pages Segment", user)
+    # Three companies per timestamp, so page boundaries fall inside ties
+    companies = [
+        Company(name=f"Page {i}", segment_id=segment.id, created_by=user.id, created_at=datetime(2022, 1, 1 + i // 3))
+        for i in range(10)
+    ]
+    db_session.add_all(companies)
+    await db_session.flush()
+    db_session.add(Contact(
+        first_name="Paged", last_name="Contact", email="paged@example.com", company_id=companies[0].id,
+        segment_id=segment.id, assigned_sdr_id=user.id, created_by=user.id
+    ))
+    await db_session.commit()
+
+    params = {"segment_id": str(segment.id), "limit": 4}
+    first = (await client.get("/api/companies", headers=headers, params=params)).json()
+    assert len(first["items"]) == 4 and first["next_cursor"]
+
+    items = await fetch_all(client, headers, "/api/companies", params)
+    expected = sorted(companies, key=lambda c: (c.created_at, str(c.id).replace("-", "")), reverse=True)
+    assert [item["id"] for item in items] == [str(c.id) for c in expected]
+
+    response = await client.get("/api/companies", headers=headers, params={**params, "cursor": "bogus"})
+    assert response.status_code == 400
+
+    page = (await client.get("/api/contacts", headers=headers, params={"segment_id": str(segment.id)})).json()
+    assert [item["assigned_sdr"]["email"] for item in page["items"]] == ["pages@example.com"]
+    assert page["next_cursor"] is None
+
+@pytest.mark.asyncio
+async def test_list_totals_are_cached_until_a_write_commits(client, db_session, monkeypatch):
+    headers = await auth_headers(client, db_session, "totals@example.com", ["companies:read"])
+    user = (await db_session.execute(select(User).where(User.email == "totals@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Totals Segment", user)
+    db_session.add_all(Company(name=f"Total {i}", segment_id=segment.id, created_by=user.id) for i in range(5))
+    await db_session.commit()
+    params = {"segment_id": str(segment.id), "limit": 2, "include_total": "true"}
+
+    page = (await client.get("/api/companies", headers=headers, params=params)).json()
+    assert (len(page["items"]), page["total"], page["total_estimated"]) == (2, 5, False)
+    page = (await client.get("/api/companies", headers=headers, params={**params, "include_total": "false"})).json()
+    assert page["total"] is None
+
+    # Writes the session does not record leave the cached total in place
+    await db_session.execute(text("UPDATE companies SET is_active = false WHERE name = 'Total 0'"))
+    await db_session.commit()
+    assert (await client.get("/api/companies", headers=headers, params=params)).json()["total"] == 5
+
+    db_session.add_all(Company(name=f"Total {i}", segment_id=segment.id, created_by=user.id) for i in (5, 6))
+    await db_session.commit()
+    assert (await client.get("/api/companies", headers=headers, params=params)).json()["total"] == 6
+
+    if db_session.bind.dialect.name == "postgresql":
+        count_cache.invalidate("companies")
+        monkeypatch.setattr(settings, "COUNT_EXACT_MAX_ROWS", 0)
+        page = (await client.get("/api/companies", headers=headers, params=params)).json()
+        assert page["total_estimated"] and page["total"] >= 1
+
+@pytest.mark.asyncio
+async def test_search_matches_word_prefixes_best_first(client, db_session, monkeypatch):
+    headers = await auth_headers(client, db_session, "search@example.com", ["companies:read", "contacts:read"])
+    user = (await db_session.execute(select(User).where(User.email == "search@example.com"))).scalar_one()
+    segment = await make_segment(db_session, "Search Segment", user)
+    company = Company(name="Searchable Labs", industry="Software", segment_id=segment.id, created_by=user.id)
+    db_session.add_all([company, Company(name="Searchable", segment_id=segment.id, created_by=user.id)])
+    await db_session.flush()
+    people = [("Anna", "Smith", "anna.smith@acme.io"), ("Annabel", "Jones", "aj@smithfield.com"), ("Bob", "Annan", "bob@acme.io")]
+    db_session.add_all(
+        Contact(
+            first_name=first, last_name=last, email=email, company_id=company.id, segment_id=segment.id,
+            created_by=user.id, created_at=datetime(2022, 1, 1 + i)
+        )
+        for i, (first, last, email) in enumerate(people)
+    )
+    await db_session.commit()
+
+    async def names(url, search, **params):
+        params = {"segment_id": str(segment.id), "search": search, **params}
+        page = (await client.get(url, headers=headers, params=params)).json()
+        return [item.get("name") or item["email"] for item in page["items"]]
+
+    assert set(await names("/api/companies", "SEARCH")) == {"Searchable", "Searchable Labs"}
+    assert await names("/api/companies", "soft") == ["Searchable Labs"]
+    assert await names("/api/companies", "lab sea") == ["Searchable Labs"]
+    assert await names("/api/companies", "able") == []
+
+    # Whole-word matches rank above prefixes; email parts are words
+    found = await names("/api/contacts", "anna")
+    assert found[0] == "anna.smith@acme.io" and set(found[1:]) == {"aj@smithfield.com", "bob@acme.io"}
+    assert set(await names("/api/contacts", "ann")) == {"anna.smith@acme.io", "aj@smithfield.com", "bob@acme.io"}
+    assert await names("/api/contacts", "acme smith") == ["anna.smith@acme.io"]
+    assert await names("/api/contacts", "smithfield.c") == ["aj@smithfield.com"]
+
+    # Broad searches are listed newest first; either order pages through every match
+    for rank_max_rows in (10000, 0):
+        monkeypatch.setattr(settings, "SEARCH_RANK_MAX_ROWS", rank_max_rows)
+        items = await fetch_all(client, headers, "/api/contacts", {"segment_id": str(segment.id), "search": "ann", "limit": 1})
+        assert sorted(item["email"] for item in items) == sorted(email for _, _, email in people)
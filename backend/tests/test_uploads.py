@@ -0,0 +1,734 @@
+import csv
+import gzip
+import hashlib
+import io
+import zipfile
+import pytest
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from fastapi import HTTPException, UploadFile
+from openpyxl import Workbook
+from sqlalchemy import select, event
+
+from app.config import settings
+from app.jobs.import_job import recover_imports, run_upload_session_cleanup
+from app.jobs.worker_pool import import_pool
+from app.models import User, Role, Company, Contact, UploadError, UploadSession
+from app.schemas.company import CompanyCreate
+from app.services.company_service import CompanyService
+from app.services.csv_service import CSVService
+from app.services.upload_service import UploadService
+from app.utils.dedup import dedup_key
+from app.utils.process_pool import shutdown_process_pool
+from tests.conftest import TestingSessionLocal, auth_headers, make_segment, make_user
+from app.utils.csv_stream import CSVRowStream
+from app.utils.upload_spool import unpack_archive
+
+def make_upload(content, filename: str = "upload.csv") -> UploadFile:
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+def make_zip(entries: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+def make_xlsx(rows: list) -> bytes:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+@pytest.mark.asyncio
+async def test_row_stream_handles_multiline_fields_across_chunks():
+    content = 'Company Name,Company Description\nAcme,"line one\nline two"\nGlobex,plain\n'
+    stream = CSVRowStream(make_upload(content), max_bytes=1024, chunk_size=7)
+
+    rows = [row async for row in stream]
+
+    assert rows == [
+        ["Company Name", "Company Description"],
+        ["Acme", "line one\nline two"],
+        ["Globex", "plain"],
+    ]
+    assert stream.bytes_read == len(content.encode("utf-8"))
+
+@pytest.mark.asyncio
+async def test_row_stream_treats_quotes_inside_unquoted_fields_as_text():
+    content = 'a,b\n5 " inch,2\n3,"x\ny"\n7,8\n' + "9,10\n" * 200
+    stream = CSVRowStream(make_upload(content), max_bytes=len(content), chunk_size=16)
+
+    rows, read_at = [], {}
+    async for row in stream:
+        rows.append(row)
+        read_at[tuple(row)] = stream.bytes_read
+
+    assert rows == list(csv.reader(io.StringIO(content)))
+    assert rows[:4] == [["a", "b"], ["5 \" inch", "2"], ["3", "x\ny"], ["7", "8"]]
+    # Later rows are yielded while the file is still being read
+    assert read_at[("7", "8")] < len(content)
+
+    stream = CSVRowStream(make_upload('a,b\n1,"open\n' + "x\n" * 100000), max_bytes=1024 * 1024)
+    with pytest.raises(HTTPException) as exc:
+        [row async for row in stream]
+    assert "unterminated quoted field" in exc.value.detail
+
+@pytest.mark.asyncio
+async def test_row_stream_rejects_lines_longer_than_the_field_limit():
+    content = "a,b\r" + "1,2\r" * 100000
+    stream = CSVRowStream(make_upload(content), max_bytes=len(content), chunk_size=4096)
+
+    with pytest.raises(HTTPException) as exc:
+        [row async for row in stream]
+
+    assert "line 1" in exc.value.detail
+    assert "exceeds" in exc.value.detail
+    # Rejected as soon as the limit is passed, not at the end of the file
+    assert stream.bytes_read < len(content)
+
+@pytest.mark.asyncio
+async def test_row_stream_enforces_size_limit_while_reading():
+    stream = CSVRowStream(make_upload("a,b\n" * 100), max_bytes=64, chunk_size=16)
+
+    with pytest.raises(HTTPException) as exc:
+        [row async for row in stream]
+
+    assert exc.value.status_code == 422
+
+@pytest.mark.asyncio
+async def test_decompressed_limit_does_not_apply_to_plain_uploads(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_MB", 4)
+    monkeypatch.setattr(settings, "MAX_DECOMPRESSED_SIZE_MB", 1)
+    content = b"a,b\n" * (512 * 1024)
+
+    rows = [row async for row in CSVService.row_stream(make_upload(content))]
+    assert len(rows) == 512 * 1024
+
+    with pytest.raises(HTTPException) as exc:
+        [row async for row in CSVService.row_stream(make_upload(gzip.compress(content)))]
+    assert "Decompressed file exceeds 1MB" in exc.value.detail
+
+@pytest.mark.asyncio
+async def test_row_stream_decompresses_gzip_and_zip_uploads():
+    content = 'Company Name,Company Description\n' + "".join(f'Acme {i},"multi\nline"\n' for i in range(500))
+    expected = [["Company Name", "Company Description"]] + [[f"Acme {i}", "multi\nline"] for i in range(500)]
+
+    # Two concatenated gzip members read as one file
+    data = content.encode()
+    compressed = gzip.compress(data[:1000]) + gzip.compress(data[1000:])
+    stream = CSVRowStream(make_upload(compressed), max_bytes=len(compressed), chunk_size=256, max_decompressed_bytes=len(data))
+    assert [row async for row in stream] == expected
+    assert stream.bytes_read == len(compressed)
+
+    stream = CSVRowStream(make_upload(make_zip({"leads.csv": content})), max_bytes=1024 * 1024, chunk_size=256)
+    assert [row async for row in stream] == expected
+
+    # Finder adds resource forks next to the file
+    archive = make_zip({"leads/leads.csv": content, "__MACOSX/leads/._leads.csv": "junk", "leads/.DS_Store": "junk"})
+    stream = CSVRowStream(make_upload(archive), max_bytes=1024 * 1024, chunk_size=256)
+    assert [row async for row in stream] == expected
+
+def test_unpack_archive_checks_limits_before_filling_the_disk(tmp_path):
+    path = tmp_path / "group.upload"
+    path.write_bytes(make_zip({f"f{i}.csv": "a,b\n" for i in range(5)}))
+    with pytest.raises(HTTPException) as exc:
+        unpack_archive(str(path), 1024, 4, 1024 * 1024, 100)
+    assert "At most 4 files" in exc.value.detail
+    assert list(tmp_path.iterdir()) == [path]
+
+    # Each entry is under the per-file limit but together they are not
+    path.write_bytes(make_zip({f"f{i}.csv": "a,b\n" * 100000 for i in range(5)}))
+    with pytest.raises(HTTPException) as exc:
+        unpack_archive(str(path), 1024 * 1024, 50, 1024 * 1024, 10000)
+    assert "Decompressed files exceed 1MB" in exc.value.detail
+    assert list(tmp_path.iterdir()) == [path]
+
+    with pytest.raises(HTTPException) as exc:
+        unpack_archive(str(path), 1024 * 1024, 50, 100 * 1024 * 1024, 100)
+    assert "Compression ratio exceeds 100:1" in exc.value.detail
+    assert list(tmp_path.iterdir()) == [path]
+
+@pytest.mark.asyncio
+async def test_xlsx_upload_is_imported_from_the_first_sheet(db_session):
+    rows = [["Company Name", "Segment Name", "Founded Year", "Company Description"]]
+    rows += [[f"Sheet Co {i}", "Sheet Segment", 1990 + i % 30, None] for i in range(2500)]
+    rows += [[None, None, None, None], ["Dated Co", "Sheet Segment", 2001.0, datetime(2020, 5, 1)]]
+    data = make_xlsx(rows)
+
+    stream = CSVRowStream(make_upload(data, "vendors.xlsx"), max_bytes=len(data), max_decompressed_bytes=1024 * 1024)
+    read = [row async for row in stream]
+    assert read[:2] == [rows[0], ["Sheet Co 0", "Sheet Segment", "1990"]] # trailing empty cells are not padded
+    assert read[-1] == ["Dated Co", "Sheet Segment", "2001", "2020-05-01"]
+    assert len(read) == 2502 # the blank row is skipped
+    assert stream.bytes_read == len(data)
+
+    user = await make_user(db_session, "xlsx_upload@example.com")
+    await make_segment(db_session, "Sheet Segment", user)
+    batch = await CSVService.validate_and_import(make_upload(data, "vendors.xlsx"), "company", user.id, db_session)
+    assert (batch.total_rows, batch.valid_rows, batch.invalid_rows) == (2501, 2501, 0)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("payload, message", [
+    (gzip.compress(b"a,b\n" * 10)[:-12], "truncated"),
+    (make_zip({"one.csv": "a\n", "two.csv": "b\n"}), "exactly one"),
+    (gzip.compress(b"a,b\n" * 1024 * 1024), "Compression ratio"),
+    (gzip.compress(b"a,b\n" * 1024 * 1024), "Decompressed file exceeds"),
+])
+async def test_row_stream_rejects_bad_compressed_uploads(payload, message):
+    max_decompressed = 1024 * 1024 if message.startswith("Decompressed") else 64 * 1024 * 1024
+    stream = CSVRowStream(make_upload(payload), max_bytes=1024 * 1024, max_decompressed_bytes=max_decompressed, max_ratio=100)
+
+    with pytest.raises(HTTPException) as exc:
+        [row async for row in stream]
+
+    assert exc.value.status_code == 422
+    assert message in exc.value.detail
+
+@pytest.mark.asyncio
+async def test_company_import_counts_valid_and_invalid_rows(db_session):
+    user = await make_user(db_session, "company_upload@example.com")
+    await make_segment(db_session, "Upload Segment", user)
+
+    content = (
+        "Company Name,Segment Name,Company Website,Founded Year\n"
+        "Acme,Upload Segment,acme.com,1999\n"
+        "Globex,Missing Segment,,\n"
+        ",Upload Segment,,1700\n"
+    )
+    batch = await CSVService.validate_and_import(make_upload(content), "company", user.id, db_session)
+
+    assert batch.status == "completed"
+    assert (batch.total_rows, batch.valid_rows, batch.invalid_rows) == (3, 1, 2)
+    assert batch.file_size_bytes == len(content.encode("utf-8"))
+
+    companies = (await db_session.execute(select(Company).where(Company.batch_id == batch.id))).scalars().all()
+    assert [c.name for c in companies] == ["Acme"]
+
+    errors = (await db_session.execute(select(UploadError).where(UploadError.batch_id == batch.id))).scalars().all()
+    assert sorted((e.row_number, e.column_name) for e in errors) == [
+        (3, "Segment Name"), (4, "Company Name"), (4, "Founded Year")
+    ]
+
+@pytest.mark.asyncio
+async def test_import_flags_duplicates_of_existing_and_earlier_rows(db_session, monkeypatch):
+    user = await make_user(db_session, "dedup_upload@example.com")
+    segment = await make_segment(db_session, "Dedup Segment", user)
+    existing = await CompanyService.create_company(db_session, CompanyCreate(name="acme", website="acme.com", segment_id=segment.id), user.id)
+    assert not existing.is_duplicate
+    assert existing.dedup_key == dedup_key("Acme", "https://acme.com", segment.id)
+
+    # Small chunks so the repeat of Globex is found in an earlier chunk
+    monkeypatch.setattr("app.services.csv_service.IMPORT_FLUSH_ROWS", 2)
+    content = (
+        "Company Name,Segment Name,Company Website\n"
+        " ACME ,Dedup Segment,https://ACME.com\n"
+        "Globex,Dedup Segment,\n"
+        "Initech,Dedup Segment,initech.com\n"
+        "globex,Dedup Segment,\n"
+    )
+    batch = await CSVService.validate_and_import(make_upload(content), "company", user.id, db_session)
+
+    assert (batch.valid_rows, batch.duplicate_rows) == (4, 2)
+    companies = (await db_session.execute(
+        select(Company.name, Company.is_duplicate).where(Company.batch_id == batch.id).order_by(Company.name, Company.is_duplicate)
+    )).all()
+    assert companies == [("Acme", True), ("Globex", False), ("Globex", True), ("Initech", False)]
+
+    again = await CompanyService.create_company(db_session, CompanyCreate(name="Initech", website="initech.com", segment_id=segment.id), user.id)
+    assert again.is_duplicate
+
+@pytest.mark.asyncio
+async def test_contact_import_resolves_companies_without_per_row_queries(db_session):
+    user = await make_user(db_session, "contact_upload@example.com")
+    segment = await make_segment(db_session, "Contact Upload Segment", user)
+    db_session.add_all([
+        Company(name="Initech", segment_id=segment.id, status="approved", created_by=user.id),
+        Company(name="Hooli", segment_id=segment.id, status="pending", created_by=user.id),
+    ])
+    await db_session.commit()
+
+    lines = ["First Name,Last Name,Email,Company Name"]
+    lines += [f"Peter{i},Gibbons,peter{i}@initech.com,Initech" for i in range(50)]
+    lines += ["Gavin,Belson,gavin@hooli.com,Hooli"]
+
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", count)
+    try:
+        batch = await CSVService.validate_and_import(make_upload("\n".join(lines)), "contact", user.id, db_session)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", count)
+
+    assert (batch.total_rows, batch.valid_rows, batch.invalid_rows) == (51, 50, 1)
+    assert sum("FROM companies" in s for s in statements) == 1
+
+    contacts = (await db_session.execute(select(Contact).where(Contact.batch_id == batch.id))).scalars().all()
+    assert len(contacts) == 50
+    assert all(c.segment_id == segment.id for c in contacts)
+
+@pytest.mark.asyncio
+async def test_process_pool_validation_matches_inline_results(db_session, monkeypatch):
+    user = await make_user(db_session, "pool_upload@example.com")
+    await make_segment(db_session, "Pool Segment", user)
+    monkeypatch.setattr(settings, "IMPORT_PROCESS_WORKERS", 2)
+    monkeypatch.setattr("app.services.csv_service.IMPORT_FLUSH_ROWS", 10)
+
+    lines = ["Company Name,Segment Name"]
+    lines += [f"Company {i},{'Pool Segment' if i % 7 else 'Unknown'}" for i in range(95)]
+    try:
+        batch = await CSVService.validate_and_import(make_upload("\n".join(lines)), "company", user.id, db_session)
+    finally:
+        shutdown_process_pool()
+
+    assert (batch.total_rows, batch.valid_rows, batch.invalid_rows) == (95, 81, 14)
+    errors = (await db_session.execute(
+        select(UploadError.row_number).where(UploadError.batch_id == batch.id).order_by(UploadError.row_number)
+    )).scalars().all()
+    assert errors == [i + 2 for i in range(95) if i % 7 == 0]
+
+@pytest.mark.asyncio
+async def test_upload_is_accepted_and_imported_in_background(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "background@example.com", ["companies:upload_csv", "uploads:read"])
+    user = (await db_session.execute(select(User).where(User.email == "background@example.com"))).scalar_one()
+    await make_segment(db_session, "Background Segment", user)
+
+    content = "Company Name,Segment Name\nAcme,Background Segment\nGlobex,Nope\n"
+    response = await client.post("/api/uploads/companies", headers=headers, files={"file": ("c.csv", content, "text/csv")})
+
+    assert response.status_code == 202
+    batch_id = response.json()["id"]
+    assert response.json()["status"] == "processing"
+
+    job, args = import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+    await job(*args, session_factory=TestingSessionLocal)
+    db_session.expire_all()
+
+    response = await client.get(f"/api/uploads/batches/{batch_id}", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert (data["total_rows"], data["valid_rows"], data["invalid_rows"]) == (2, 1, 1)
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_repeated_uploads_return_the_existing_batch(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "repeat@example.com", ["companies:upload_csv", "contacts:upload_csv"])
+
+    content = "Company Name,Segment Name\nAcme,Repeat Segment\n"
+    first = await client.post("/api/uploads/companies", headers=headers, files={"file": ("c.csv", content, "text/csv")})
+    assert first.status_code == 202
+    import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+
+    # Same bytes under another name: no second import
+    again = await client.post("/api/uploads/companies", headers=headers, files={"file": ("copy.csv", content, "text/csv")})
+    assert again.json()["id"] == first.json()["id"]
+    assert again.json()["content_hash"] == first.json()["content_hash"]
+    assert import_pool.queue.empty()
+    assert len(list(tmp_path.iterdir())) == 1
+
+    keyed = {**headers, "Idempotency-Key": "repeat-1"}
+    other = "Company Name,Segment Name\nGlobex,Repeat Segment\n"
+    response = await client.post("/api/uploads/companies", headers=keyed, files={"file": ("c.csv", other, "text/csv")})
+    batch_id = response.json()["id"]
+    assert batch_id != first.json()["id"]
+    import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+
+    response = await client.post("/api/uploads/companies", headers=keyed, files={"file": ("retry.csv", other, "text/csv")})
+    assert response.json()["id"] == batch_id
+    assert import_pool.queue.empty()
+    # Another file under the same key is not mistaken for a retry
+    response = await client.post("/api/uploads/companies", headers=keyed, files={"file": ("c.csv", other + "Initech,Repeat Segment\n", "text/csv")})
+    assert response.status_code == 422
+    assert import_pool.queue.empty()
+    assert len(list(tmp_path.iterdir())) == 2
+    response = await client.post("/api/uploads/contacts", headers=keyed, files={"file": ("c.csv", other, "text/csv")})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_idempotency_key_race_returns_the_winning_batch(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_DEDUP_WINDOW_MINUTES", 0)
+    headers = await auth_headers(client, db_session, "race@example.com", ["companies:upload_csv"])
+    user = (await db_session.execute(select(User).where(User.email == "race@example.com"))).scalar_one()
+    content = "Company Name,Segment Name\nAcme,Race Segment\n"
+    winner = CSVService.new_batch("company", "c.csv", user.id, len(content))
+    winner.idempotency_key = "race-1"
+    winner.content_hash = hashlib.sha256(content.encode()).hexdigest()
+    db_session.add(winner)
+    await db_session.commit()
+
+    # The concurrent request commits between the lookup and the insert
+    find = UploadService._find_by_idempotency_key
+    calls = []
+    async def racing_find(db, uploader_id, key):
+        calls.append(key)
+        return None if len(calls) == 1 else await find(db, uploader_id, key)
+    monkeypatch.setattr(UploadService, "_find_by_idempotency_key", racing_find)
+
+    keyed = {**headers, "Idempotency-Key": "race-1"}
+    response = await client.post("/api/uploads/companies", headers=keyed, files={"file": ("c.csv", content, "text/csv")})
+    assert response.json()["id"] == str(winner.id)
+
+    calls.clear()
+    response = await client.post("/api/uploads/companies", headers=keyed, files={"file": ("c.csv", content + "Globex,Race Segment\n", "text/csv")})
+    assert response.status_code == 422
+    assert import_pool.queue.empty()
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_imports_interrupted_by_a_restart_are_failed_at_startup(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "restart@example.com", ["companies:upload_csv", "uploads:read"])
+
+    content = "Company Name,Segment Name\nAcme,Restart Segment\n"
+    first = await client.post("/api/uploads/companies", headers=headers, files={"file": ("c.csv", content, "text/csv")})
+    # The queued job is lost with the process
+    import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+    session = await client.post("/api/uploads/companies/sessions", headers=headers, json={"file_name": "big.csv", "total_size": 100})
+    await client.put(f"/api/uploads/sessions/{session.json()['id']}?offset=0", headers=headers, content=b"Company Name")
+
+    await recover_imports(session_factory=TestingSessionLocal)
+    db_session.expire_all()
+
+    batch = (await client.get(f"/api/uploads/batches/{first.json()['id']}", headers=headers)).json()
+    assert (batch["status"], batch["error_message"]) == ("failed", "Import was interrupted by a server restart")
+    assert [p.name for p in tmp_path.iterdir()] == [f"{session.json()['id']}.part"]
+
+    again = await client.post("/api/uploads/companies", headers=headers, files={"file": ("c.csv", content, "text/csv")})
+    assert again.json()["id"] != first.json()["id"]
+    import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+
+@pytest.mark.asyncio
+async def test_group_upload_imports_each_file_as_a_batch(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "group@example.com", ["companies:upload_csv", "uploads:read"])
+    user = (await db_session.execute(select(User).where(User.email == "group@example.com"))).scalar_one()
+    await make_segment(db_session, "Group Segment", user)
+
+    # Every file's header is checked before anything is queued
+    files = [
+        ("files", ("a.csv", "Company Name,Segment Name\nA1,Group Segment\n", "text/csv")),
+        ("files", ("b.csv", "Company Name\nB1\n", "text/csv")),
+    ]
+    response = await client.post("/api/uploads/companies/groups", headers=headers, files=files)
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("b.csv: Missing required columns")
+    assert import_pool.queue.empty()
+    assert list(tmp_path.iterdir()) == []
+
+    archive = make_zip({
+        f"week/{name}.csv": "Company Name,Segment Name\n" + "".join(f"{name} {i},{segment}\n" for i in range(count))
+        for name, segment, count in (("North", "Group Segment", 30), ("South", "Group Segment", 20), ("West", "Nope", 5))
+    } | {"__MACOSX/week/._North.csv": "junk"})
+    response = await client.post("/api/uploads/companies/groups", headers=headers, files={"files": ("week.zip", archive, "application/zip")})
+    assert response.status_code == 202
+    group = response.json()
+    assert (group["file_count"], group["status"]) == (3, "processing")
+    assert [b["file_name"] for b in group["batches"]] == ["North.csv", "South.csv", "West.csv"]
+
+    if db_session.bind.dialect.name == "sqlite":
+        # The test database is a single shared connection
+        monkeypatch.setattr(settings, "UPLOAD_GROUP_CONCURRENCY", 1)
+    job, args = import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+    await job(*args, session_factory=TestingSessionLocal)
+
+    group = (await client.get(f"/api/uploads/groups/{group['id']}", headers=headers)).json()
+    assert (group["status"], group["completed_files"], group["failed_files"]) == ("completed", 3, 0)
+    assert (group["total_rows"], group["valid_rows"], group["invalid_rows"]) == (55, 50, 5)
+    assert [b["valid_rows"] for b in group["batches"]] == [30, 20, 0]
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_upload_with_missing_columns_is_rejected_before_queueing(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "badheader@example.com", ["contacts:upload_csv"])
+
+    response = await client.post("/api/uploads/contacts", headers=headers, files={"file": ("c.csv", "Email\na@b.com\n", "text/csv")})
+
+    assert response.status_code == 422
+    assert import_pool.queue.empty()
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_chunked_upload_session_resumes_and_finalizes(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "chunked@example.com", ["companies:upload_csv", "uploads:read"])
+    user = (await db_session.execute(select(User).where(User.email == "chunked@example.com"))).scalar_one()
+    await make_segment(db_session, "Chunked Segment", user)
+
+    content = ("Company Name,Segment Name\n" + "".join(f"Company {i},Chunked Segment\n" for i in range(20))).encode()
+    response = await client.post("/api/uploads/companies/sessions", headers=headers, json={"file_name": "big.csv", "total_size": len(content)})
+    assert response.status_code == 201
+    session_id = response.json()["id"]
+
+    # First chunk, then a retry that starts before the end of what was received
+    response = await client.put(f"/api/uploads/sessions/{session_id}?offset=0", headers=headers, content=content[:100])
+    assert response.json()["received_bytes"] == 100
+    response = await client.put(f"/api/uploads/sessions/{session_id}?offset=300", headers=headers, content=content[300:])
+    assert response.status_code == 409
+    response = await client.put(f"/api/uploads/sessions/{session_id}?offset=80", headers=headers, content=content[80:])
+    assert response.json()["received_bytes"] == len(content)
+
+    response = await client.post(f"/api/uploads/sessions/{session_id}/finalize", headers=headers)
+    assert response.status_code == 202
+    batch_id = response.json()["id"]
+
+    job, args = import_pool.queue.get_nowait()
+    import_pool.queue.task_done()
+    await job(*args, session_factory=TestingSessionLocal)
+    db_session.expire_all()
+
+    data = (await client.get(f"/api/uploads/batches/{batch_id}", headers=headers)).json()
+    assert (data["status"], data["valid_rows"], data["file_size_bytes"]) == ("completed", 20, len(content))
+
+    response = await client.post(f"/api/uploads/sessions/{session_id}/finalize", headers=headers)
+    assert response.status_code == 409
+
+@pytest.mark.asyncio
+async def test_upload_sessions_check_permissions_and_keep_rejected_files(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "revoked@example.com", ["companies:upload_csv"])
+    bad = b"Name,Segment\nAcme,Revoked Segment\n"
+    response = await client.post("/api/uploads/companies/sessions", headers=headers, json={"file_name": "bad.csv", "total_size": len(bad)})
+    session_id = response.json()["id"]
+    await client.put(f"/api/uploads/sessions/{session_id}?offset=0", headers=headers, content=bad)
+
+    # A header the import rejects leaves the received bytes in the open session
+    response = await client.post(f"/api/uploads/sessions/{session_id}/finalize", headers=headers)
+    assert response.status_code == 422
+    data = (await client.get(f"/api/uploads/sessions/{session_id}", headers=headers)).json()
+    assert (data["status"], data["received_bytes"]) == ("open", len(bad))
+
+    role = (await db_session.execute(select(Role).where(Role.name == "role-revoked@example.com"))).scalar_one()
+    await db_session.refresh(role, ["permissions"])
+    role.permissions.clear()
+    await db_session.commit()
+
+    assert (await client.get(f"/api/uploads/sessions/{session_id}", headers=headers)).status_code == 403
+    response = await client.put(f"/api/uploads/sessions/{session_id}?offset=0", headers=headers, content=bad)
+    assert response.status_code == 403
+    assert (await client.post(f"/api/uploads/sessions/{session_id}/finalize", headers=headers)).status_code == 403
+    assert import_pool.queue.empty()
+
+@pytest.mark.asyncio
+async def test_abandoned_upload_sessions_expire_and_lose_their_files(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "abandoned@example.com", ["companies:upload_csv"])
+    response = await client.post("/api/uploads/companies/sessions", headers=headers, json={"file_name": "big.csv", "total_size": 100})
+    session_id = response.json()["id"]
+    await client.put(f"/api/uploads/sessions/{session_id}?offset=0", headers=headers, content=b"Company Name")
+
+    await run_upload_session_cleanup(session_factory=TestingSessionLocal)
+    assert (await client.get(f"/api/uploads/sessions/{session_id}", headers=headers)).status_code == 200
+    assert len(list(tmp_path.iterdir())) == 1
+
+    session = await db_session.get(UploadSession, UUID(session_id))
+    session.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    await db_session.commit()
+    response = await client.put(f"/api/uploads/sessions/{session_id}?offset=12", headers=headers, content=b",Segment Name")
+    assert response.status_code == 410
+
+    await run_upload_session_cleanup(session_factory=TestingSessionLocal)
+    db_session.expire_all()
+    assert (await db_session.get(UploadSession, UUID(session_id))).status == "expired"
+    assert list(tmp_path.iterdir()) == []
+    assert (await client.post(f"/api/uploads/sessions/{session_id}/finalize", headers=headers)).status_code == 410
+
+@pytest.mark.asyncio
+async def test_batch_errors_are_paginated_and_exported(client, db_session):
+    headers = await auth_headers(client, db_session, "errors@example.com", ["uploads:read"])
+    user = (await db_session.execute(select(User).where(User.email == "errors@example.com"))).scalar_one()
+
+    lines = ["Company Name,Segment Name"] + [f"Company {i},Nowhere" for i in range(25)]
+    batch = await CSVService.validate_and_import(make_upload("\n".join(lines)), "company", user.id, db_session)
+
+    rows, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get(f"/api/uploads/batches/{batch.id}/errors", headers=headers, params=params)).json()
+        rows += [e["row_number"] for e in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert rows == list(range(2, 27))
+
+    response = await client.get(f"/api/uploads/batches/{batch.id}/errors", headers=headers, params={"cursor": "bogus"})
+    assert response.status_code == 400
+
+    response = await client.get(f"/api/uploads/batches/{batch.id}/errors/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    exported = response.text.splitlines()
+    assert exported[0] == "Row,Column,Value,Error"
+    assert len(exported) == 26 and exported[1].startswith("2,Segment Name,Nowhere,")
+
+@pytest.mark.asyncio
+async def test_corrections_revalidate_only_the_submitted_rows(client, db_session):
+    headers = await auth_headers(client, db_session, "corrections@example.com", ["companies:upload_csv", "uploads:read"])
+    user = (await db_session.execute(select(User).where(User.email == "corrections@example.com"))).scalar_one()
+    await make_segment(db_session, "Fix Segment", user)
+
+    content = (
+        "Company Name,Segment Name,Founded Year\n"
+        "Acme,Fix Segment,1999\n"
+        "Globex,Typo Segment,2001\n"
+        "Initech,Fix Segment,1700\n"
+        "Hooli,Nope,\n"
+    )
+    batch = await CSVService.validate_and_import(make_upload(content), "company", user.id, db_session)
+    assert (batch.valid_rows, batch.invalid_rows) == (1, 3)
+
+    body = {"rows": [
+        {"row_number": 3, "values": {"Segment Name": "Fix Segment"}},
+        {"row_number": 4, "values": {"Founded Year": "1650"}},
+    ]}
+    response = await client.post(f"/api/uploads/batches/{batch.id}/corrections", headers=headers, json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["corrected_rows"] == 1
+    assert [(e["row_number"], e["column_name"]) for e in data["errors"]] == [(4, "Founded Year")]
+    assert (data["batch"]["valid_rows"], data["batch"]["invalid_rows"]) == (2, 2)
+
+    companies = (await db_session.execute(select(Company.name).where(Company.batch_id == batch.id))).scalars().all()
+    assert sorted(companies) == ["Acme", "Globex"]
+
+    page = (await client.get(f"/api/uploads/batches/{batch.id}/errors", headers=headers)).json()
+    assert [(e["row_number"], e["is_corrected"]) for e in page["items"]] == [(3, True), (4, False), (5, False)]
+
+    # A row whose errors were already corrected cannot be corrected again
+    response = await client.post(f"/api/uploads/batches/{batch.id}/corrections", headers=headers, json={"rows": [body["rows"][0]]})
+    assert response.status_code == 422
+
+    # Corrections import rows, so reading uploads is not enough
+    reader = await auth_headers(client, db_session, "corrections_reader@example.com", ["uploads:read", "contacts:upload_csv"])
+    response = await client.post(f"/api/uploads/batches/{batch.id}/corrections", headers=reader, json=body)
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_preview_validates_without_writing(client, db_session):
+    headers = await auth_headers(client, db_session, "preview@example.com", ["companies:upload_csv"])
+    user = (await db_session.execute(select(User).where(User.email == "preview@example.com"))).scalar_one()
+    await make_segment(db_session, "Preview Segment", user)
+
+    errors_before = len((await db_session.execute(select(UploadError))).scalars().all())
+    lines = ["Company Name,Segment Name,Founded Year"]
+    lines += [f"Preview Co {i},Preview Segment,{1700 if i % 2 else 1990}" for i in range(50)]
+    response = await client.post("/api/uploads/companies/preview", headers=headers, files={"file": ("c.csv", "\n".join(lines), "text/csv")})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total_rows"], data["valid_rows"], data["invalid_rows"], data["aborted"]) == (50, 25, 25, False)
+    assert data["errors_by_column"] == {"Founded Year": 25}
+    assert len(data["sample_errors"]) == 20 and data["sample_errors"][0]["row_number"] == 3
+
+    assert (await db_session.execute(select(Company).where(Company.name.like("Preview Co%")))).scalars().all() == []
+    assert len((await db_session.execute(select(UploadError))).scalars().all()) == errors_before
+
+@pytest.mark.asyncio
+async def test_import_aborts_early_when_most_rows_are_invalid(db_session, monkeypatch):
+    user = await make_user(db_session, "abort@example.com")
+    monkeypatch.setattr(settings, "IMPORT_ABORT_MIN_ROWS", 20)
+    monkeypatch.setattr("app.services.csv_service.IMPORT_FLUSH_ROWS", 10)
+
+    # Contact data uploaded as a company file: every segment lookup fails
+    lines = ["Company Name,Segment Name"] + [f"Jane{i},jane{i}@example.com" for i in range(100)]
+    preview = await CSVService.validate_and_import(make_upload("\n".join(lines)), "company", user.id, db_session, dry_run=True)
+    assert preview["aborted"] and preview["total_rows"] == 20
+
+    with pytest.raises(HTTPException) as exc:
+        await CSVService.validate_and_import(make_upload("\n".join(lines)), "company", user.id, db_session)
+    assert exc.value.status_code == 422
+    assert exc.value.detail.startswith("Aborted after 20 rows")
+
+def test_validation_plan_handles_short_rows_and_orders_errors():
+    keys = ["first name", "last name", "email", "company name", "job title"]
+    lookup = {"Initech": ("company-id", "segment-id")}
+    chunk = [
+        (2, ["Peter", "Gibbons", "PETER@INITECH.COM", "Initech", "Engineer"]),
+        (3, ["", "Smith", "not-an-email", "Nowhere"]),
+        (4, ["Milton", "Waddams", "milton@initech.com", "Initech"]),
+    ]
+
+    valid, errors, invalid = CSVService.validate_chunk("contact", keys, chunk, lookup, "user", "batch")
+
+    assert invalid == 1
+    assert [(v["email"], v["job_title"], v["company_id"]) for v in valid] == [
+        ("peter@initech.com", "Engineer", "company-id"), ("milton@initech.com", None, "company-id")
+    ]
+    assert [(e["row_number"], e["column_name"], e["error_message"]) for e in errors] == [
+        (3, "First Name", "Required"),
+        (3, "Email", "Invalid email format"),
+        (3, "Company Name", "Approved company 'Nowhere' not found"),
+    ]
+    assert errors[0]["row_data"] == {"first name": "", "last name": "Smith", "email": "not-an-email", "company name": "Nowhere"}
+
+@pytest.mark.asyncio
+async def test_sql_engine_requires_postgresql(client, db_session, tmp_path, monkeypatch):
+    if db_session.bind.dialect.name == "postgresql":
+        pytest.skip("engine is available on PostgreSQL")
+    monkeypatch.setattr(settings, "UPLOAD_TEMP_DIR", str(tmp_path))
+    headers = await auth_headers(client, db_session, "sqlengine@example.com", ["companies:upload_csv"])
+
+    response = await client.post(
+        "/api/uploads/companies?engine=sql", headers=headers,
+        files={"file": ("c.csv", "Company Name,Segment Name\nAcme,X\n", "text/csv")}
+    )
+
+    assert response.status_code == 422
+    assert import_pool.queue.empty()
+
+@pytest.mark.asyncio
+async def test_sql_engine_matches_python_engine(db_session):
+    if db_session.bind.dialect.name != "postgresql":
+        pytest.skip("the sql import engine needs PostgreSQL")
+    from app.services.sql_import_service import SQLImportService
+
+    user = await make_user(db_session, "sql_parity@example.com")
+    await make_segment(db_session, "Parity Segment", user)
+    content = (
+        "Company Name,Segment Name,Company Website,Founded Year,Extra\n"
+        "acme corp,Parity Segment,acme.io/About,1999,x\n"
+        "globex,Parity Segment,http://globex.io,\n"
+        ",Unknown,not a url,17x\n"
+        "initech,Parity Segment,,3000,y\n"
+        "3m company,Parity Segment,,,\n"
+        "ÉLAN o'neil,Parity Segment,,,\n"
+    )
+
+    results = []
+    for process_batch in (CSVService.process_batch, SQLImportService.process_batch):
+        batch = CSVService.new_batch("company", "parity.csv", user.id)
+        db_session.add(batch)
+        await db_session.flush()
+        batch = await process_batch(db_session, batch, make_upload(content))
+
+        companies = (await db_session.execute(
+            select(Company.name, Company.website, Company.industry, Company.dedup_key).where(Company.batch_id == batch.id).order_by(Company.name)
+        )).all()
+        errors = (await db_session.execute(
+            select(UploadError.row_number, UploadError.column_name, UploadError.error_message, UploadError.value, UploadError.row_data)
+            .where(UploadError.batch_id == batch.id).order_by(UploadError.row_number, UploadError.column_name, UploadError.error_message)
+        )).all()
+        results.append(((batch.total_rows, batch.valid_rows, batch.invalid_rows), companies, errors))
+
+    assert results[0] == results[1]
+    assert results[0][0] == (6, 4, 2)
+    assert [c.name for c in results[1][1]] == ["3M Company", "Acme Corp", "Globex", "Élan O'Neil"]
+    # The second engine imported the same companies again
+    assert batch.duplicate_rows == 4
@@ -2,8 +2,8 @@ import client from './client';
 import { Company, CompanyCreate, CompanyUpdate } from '../types/models';
 
 export const listCompanies = async (params?: any) => {
-  const response = await client.get<Company[]>('/api/companies', { params });
-  return response.data;
+  const response = await client.get<{ items: Company[]; next_cursor: string | null }>('/api/companies', { params });
+  return response.data.items;
 };
 
 export const createCompany = async (data: CompanyCreate) => {
@@ -32,6 +32,6 @@ export const rejectCompany = async (id: string, rejection_reason: string) => {
 };
 
 export const getApprovalQueueCompanies = async (params?: any) => {
-  const response = await client.get<Company[]>('/api/approval-queue/companies', { params });
-  return response.data;
+  const response = await client.get<{ items: Company[]; next_cursor: string | null }>('/api/approval-queue/companies', { params });
+  return response.data.items;
 };
@@ -2,8 +2,8 @@ import client from './client';
 import { Contact, ContactCreate, ContactUpdate } from '../types/models';
 
 export const listContacts = async (params?: any) => {
-  const response = await client.get<Contact[]>('/api/contacts', { params });
-  return response.data;
+  const response = await client.get<{ items: Contact[]; next_cursor: string | null }>('/api/contacts', { params });
+  return response.data.items;
 };
 
 export const createContact = async (data: ContactCreate) => {
@@ -37,6 +37,6 @@ export const scheduleMeeting = async (id: string) => {
 };
 
 export const getApprovalQueueContacts = async (params?: any) => {
-  const response = await client.get<Contact[]>('/api/approval-queue/contacts', { params });
-  return response.data;
+  const response = await client.get<{ items: Contact[]; next_cursor: string | null }>('/api/approval-queue/contacts', { params });
+  return response.data.items;
 };
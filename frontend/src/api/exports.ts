@@ -1,7 +1,8 @@
 import client from './client';
+import { ExportJob } from '../types/models';
 
-export const exportCompaniesCSV = async () => {
-  const response = await client.get('/api/exports/companies', { responseType: 'blob' });
+export const exportCompaniesCSV = async (params?: any) => {
+  const response = await client.get('/api/exports/companies', { params, responseType: 'blob' });
   const url = window.URL.createObjectURL(new Blob([response.data]));
   const link = document.createElement('a');
   link.href = url;
@@ -10,8 +11,8 @@ export const exportCompaniesCSV = async () => {
   link.click();
 };
 
-export const exportContactsCSV = async () => {
-  const response = await client.get('/api/exports/contacts', { responseType: 'blob' });
+export const exportContactsCSV = async (params?: any) => {
+  const response = await client.get('/api/exports/contacts', { params, responseType: 'blob' });
   const url = window.URL.createObjectURL(new Blob([response.data]));
   const link = document.createElement('a');
   link.href = url;
@@ -19,3 +20,26 @@ export const exportContactsCSV = async () => {
   document.body.appendChild(link);
   link.click();
 };
+
+export const requestExportJob = async (entity: 'companies' | 'contacts', params?: any) => {
+  const response = await client.post<ExportJob>(`/api/exports/${entity}/jobs`, null, { params });
+  return response.data;
+};
+
+export const getExportJob = async (entity: 'companies' | 'contacts', id: string) => {
+  const response = await client.get<ExportJob>(`/api/exports/${entity}/jobs/${id}`);
+  return response.data;
+};
+
+export const downloadExportJob = async (entity: 'companies' | 'contacts', id: string) => {
+  const response = await client.get(`/api/exports/${entity}/jobs/${id}/download`, { responseType: 'blob' });
+  // The API names the file after the job's format (.csv.gz, .parquet, .arrow)
+  const disposition: string = response.headers['content-disposition'] || '';
+  const match = disposition.match(/filename="?([^";]+)"?/);
+  const url = window.URL.createObjectURL(new Blob([response.data]));
+  const link = document.createElement('a');
+  link.href = url;
+  link.setAttribute('download', match ? match[1] : `${entity}_export.csv.gz`);
+  document.body.appendChild(link);
+  link.click();
+};
@@ -4,8 +4,8 @@ import { Segment, SegmentCreate, SegmentUpdate } from '../types/models';
 export const listSegments = async (status: string = 'active', search?: string) => {
   const params: any = { status };
   if (search) params.search = search;
-  const response = await client.get<Segment[]>('/api/segments', { params });
-  return response.data;
+  const response = await client.get<{ items: Segment[]; next_cursor: string | null }>('/api/segments', { params });
+  return response.data.items;
 };
 
 export const getSegment = async (id: string) => {
@@ -1,5 +1,8 @@
 import client from './client';
-import { UploadBatch, UploadError } from '../types/models';
+import { UploadBatch, UploadError, UploadGroup, UploadSession } from '../types/models';
+
+// Files above this size are sent through a resumable upload session
+export const CHUNK_SIZE = 8 * 1024 * 1024;
 
 export const uploadCompanyCSV = async (file: File) => {
   const formData = new FormData();
@@ -19,6 +22,56 @@ export const uploadContactCSV = async (file: File) => {
   return response.data;
 };
 
+// Several files, or one zip of files, imported concurrently as one group
+export const uploadCSVGroup = async (files: File[], entity: 'companies' | 'contacts') => {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+  const response = await client.post<UploadGroup>(`/api/uploads/${entity}/groups`, formData, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  });
+  return response.data;
+};
+
+export const getUploadGroup = async (id: string) => {
+  const response = await client.get<UploadGroup>(`/api/uploads/groups/${id}`);
+  return response.data;
+};
+
+export const uploadCSVInChunks = async (
+  file: File,
+  entityType: 'company' | 'contact',
+  onProgress?: (fraction: number) => void
+) => {
+  const base = entityType === 'company' ? '/api/uploads/companies' : '/api/uploads/contacts';
+  const { data: session } = await client.post<UploadSession>(`${base}/sessions`, {
+    file_name: file.name,
+    total_size: file.size
+  });
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    try {
+      const { data } = await client.put<UploadSession>(
+        `/api/uploads/sessions/${session.id}`,
+        file.slice(offset, offset + CHUNK_SIZE),
+        { params: { offset }, headers: { 'Content-Type': 'application/octet-stream' } }
+      );
+      offset = data.received_bytes;
+      failures = 0;
+    } catch (error) {
+      // Resume from whatever the server already has on disk
+      if (++failures > 3) throw error;
+      const { data } = await client.get<UploadSession>(`/api/uploads/sessions/${session.id}`);
+      offset = data.received_bytes;
+    }
+    onProgress?.(offset / file.size);
+  }
+
+  const response = await client.post<UploadBatch>(`/api/uploads/sessions/${session.id}/finalize`);
+  return response.data;
+};
+
 export const listBatches = async () => {
   const response = await client.get<UploadBatch[]>('/api/uploads/batches');
   return response.data;
@@ -29,7 +82,27 @@ export const getBatch = async (id: string) => {
   return response.data;
 };
 
-export const getBatchErrors = async (id: string) => {
-  const response = await client.get<UploadError[]>(`/api/uploads/batches/${id}/errors`);
+export const getBatchErrors = async (id: string, cursor?: string) => {
+  const response = await client.get<{ items: UploadError[]; next_cursor: string | null }>(
+    `/api/uploads/batches/${id}/errors`,
+    { params: { limit: 1000, cursor } }
+  );
+  return response.data.items;
+};
+
+export const correctBatchRows = async (id: string, rows: { row_number: number; values: Record<string, string> }[]) => {
+  const response = await client.post<{ batch: UploadBatch; corrected_rows: number; errors: UploadError[] }>(
+    `/api/uploads/batches/${id}/corrections`,
+    { rows }
+  );
+  return response.data;
+};
+
+export const previewCSV = async (file: File, entity: 'companies' | 'contacts') => {
+  const formData = new FormData();
+  formData.append('file', file);
+  const response = await client.post(`/api/uploads/${entity}/preview`, formData, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  });
   return response.data;
 };
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { uploadCompanyCSV, uploadContactCSV } from '../../api/uploads';
+import { uploadCompanyCSV, uploadContactCSV, uploadCSVInChunks, CHUNK_SIZE } from '../../api/uploads';
 
 const CSVUpload: React.FC = () => {
   const navigate = useNavigate();
@@ -20,9 +20,11 @@ const CSVUpload: React.FC = () => {
     setUploading(true);
     setProgress(45);
     try {
-      const batch = activeTab === 'company'
-        ? await uploadCompanyCSV(file)
-        : await uploadContactCSV(file);
+      const batch = file.size > CHUNK_SIZE
+        ? await uploadCSVInChunks(file, activeTab, (fraction) => setProgress(Math.round(fraction * 100)))
+        : activeTab === 'company'
+          ? await uploadCompanyCSV(file)
+          : await uploadContactCSV(file);
       navigate(`/uploads/batches/${batch.id}`);
     } catch (error) {
       console.error('Upload failed', error);
@@ -96,7 +98,7 @@ const CSVUpload: React.FC = () => {
               name="file-upload"
               type="file"
               className="sr-only"
-              accept=".csv"
+              accept=".csv,.gz,.zip,.xlsx"
               onChange={handleFileChange}
             />
           </div>
@@ -140,7 +142,7 @@ const CSVUpload: React.FC = () => {
               <div>
                 <h4 className="font-medium text-slate-700 mb-2">Format Rules</h4>
                 <ul className="list-disc list-inside space-y-1 text-slate-600 pl-1">
-                  <li>File format must be .csv</li>
+                  <li>File format must be .csv (optionally compressed as .csv.gz or a single-file .zip) or .xlsx; only the first sheet of a workbook is read</li>
                   <li>Encoding should be UTF-8</li>
                   <li>No duplicate names within segment</li>
                 </ul>
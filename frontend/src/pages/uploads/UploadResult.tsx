@@ -9,10 +9,15 @@ const UploadResult: React.FC = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
+    let timer: ReturnType<typeof setTimeout>;
     const fetchBatch = async () => {
       try {
         const data = await getBatch(id!);
         setBatch(data);
+        // Imports run in the background; poll until the batch settles
+        if (data.status === 'processing') {
+          timer = setTimeout(fetchBatch, 2000);
+        }
       } catch (error) {
         console.error('Failed to fetch batch summary', error);
       } finally {
@@ -20,6 +25,7 @@ const UploadResult: React.FC = () => {
       }
     };
     fetchBatch();
+    return () => clearTimeout(timer);
   }, [id]);
 
   if (loading) return <div className="p-8 text-center">Loading result...</div>;
@@ -57,6 +63,7 @@ const UploadResult: React.FC = () => {
               <p className="text-xs font-semibold text-green-600 uppercase tracking-wider">Valid Rows</p>
               <p className="text-2xl font-bold text-green-700 mt-1">{batch.valid_rows}</p>
               <p className="text-xs text-green-600 mt-1">Successfully imported</p>
+              {!!batch.duplicate_rows && <p className="text-xs text-amber-600 mt-1">{batch.duplicate_rows} flagged as duplicates</p>}
             </div>
             <div className={`${batch.invalid_rows > 0 ? 'bg-red-50 border-red-100' : 'bg-slate-50 border-slate-100'} p-4 rounded-lg border`}>
               <p className={`text-xs font-semibold ${batch.invalid_rows > 0 ? 'text-red-600' : 'text-slate-500'} uppercase tracking-wider`}>Invalid Rows</p>
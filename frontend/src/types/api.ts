@@ -6,5 +6,6 @@ export interface ApiResponse<T> {
 export interface PaginatedResponse<T> {
   items: T[];
   next_cursor: string | null;
-  total: number;
+  total?: number | null;
+  total_estimated?: boolean;
 }
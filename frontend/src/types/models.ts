@@ -96,13 +96,66 @@ export interface Contact {
   assigned_sdr_id?: string;
 }
 
+export interface UploadProgress {
+  bytes_processed: number;
+  bytes_total: number;
+  elapsed_seconds: number;
+  rows_per_second: number;
+  eta_seconds: number | null;
+}
+
 export interface UploadBatch {
   id: string;
   entity_type: 'company' | 'contact';
   file_name: string;
   status: 'processing' | 'completed' | 'failed';
   total_rows: number;
+  valid_rows: number;
+  invalid_rows: number;
+  duplicate_rows?: number;
+  error_message?: string | null;
+  progress?: UploadProgress | null;
+  group_id?: string | null;
+  created_at: string;
+}
+
+export interface UploadGroup {
+  id: string;
+  entity_type: 'company' | 'contact';
+  file_count: number;
+  status: 'processing' | 'completed' | 'failed';
+  completed_files: number;
+  failed_files: number;
+  total_rows: number;
+  valid_rows: number;
+  invalid_rows: number;
+  duplicate_rows: number;
+  progress: UploadProgress | null;
+  batches: UploadBatch[];
+  created_at: string;
+}
+
+export interface UploadSession {
+  id: string;
+  entity_type: 'company' | 'contact';
+  file_name: string;
+  total_size: number;
+  received_bytes: number;
+  status: 'open' | 'finalized' | 'expired';
+  batch_id: string | null;
+  created_at: string;
+}
+
+export interface ExportJob {
+  id: string;
+  entity_type: 'company' | 'contact';
+  status: 'pending' | 'running' | 'completed' | 'failed' | 'expired';
+  params: { format: 'csv.gz' | 'parquet' | 'arrow'; columns: string[]; filters: Record<string, any> };
+  row_count: number;
+  file_size_bytes: number | null;
+  error_message: string | null;
   created_at: string;
+  completed_at: string | null;
 }
 
 export interface AuditLog {